@@ -0,0 +1,522 @@
+# benchmarks/run_benchmarks.py
+
+"""
+録画・ライブビュー・同期撮影のスループット／レイテンシ計測ベンチマーク
+
+既定ではシミュレーションカメラ（FLIR_SIMULATION=1）でヘッドレス実行し、結果を JSON で出力する
+  python benchmarks/run_benchmarks.py --roi 640x480 1440x1080 --pixel-format Mono8 BGR8 \
+      --format fcr bmp --scenario record live sync --output results.json
+  python benchmarks/run_benchmarks.py --baseline results_old.json   # 前回結果との比較
+  python benchmarks/run_benchmarks.py --scenario unpack --pixel-format Mono12p Mono10p   # パック形式の展開速度
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+SCENARIOS = ('record', 'live', 'sync', 'sync_burst', 'unpack')
+# --pixel-format にパック形式が無いときの unpack シナリオの形式
+UNPACK_DEFAULT_FORMATS = ('Mono12p',)
+
+
+# =========================================================
+# 計測ユーティリティ
+# =========================================================
+
+
+class StageTimer:
+    """ステージごとの所要時間を集め、パーセンタイルに要約する"""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    def add(self, stage: str, seconds: float):
+        self.samples[stage].append(seconds)
+
+    def wrap(self, stage: str, func):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.samples[stage].append(time.perf_counter() - start)
+        return timed
+
+    def summary(self) -> dict:
+        result = {}
+        for stage, values in self.samples.items():
+            ms = np.asarray(values) * 1000.0
+            result[stage] = {
+                'count': int(ms.size),
+                'mean_ms': float(ms.mean()),
+                'p50_ms': float(np.percentile(ms, 50)),
+                'p90_ms': float(np.percentile(ms, 90)),
+                'p99_ms': float(np.percentile(ms, 99)),
+                'max_ms': float(ms.max()),
+            }
+        return result
+
+
+class ResourceMeter:
+    """CPU使用率（プロセス全体）とピークRSSを計測する"""
+
+    def __enter__(self):
+        self.wall_start = time.perf_counter()
+        self.cpu_start = time.process_time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.wall_sec = time.perf_counter() - self.wall_start
+        self.cpu_sec = time.process_time() - self.cpu_start
+
+    def result(self) -> dict:
+        from util.memory_info import peak_rss_bytes
+        rss = peak_rss_bytes()
+        return {
+            'wall_sec': self.wall_sec,
+            'cpu_sec': self.cpu_sec,
+            'cpu_percent': 100.0 * self.cpu_sec / self.wall_sec if self.wall_sec > 0 else 0.0,
+            'peak_rss_mb': rss / 2**20 if rss else None,
+        }
+
+
+def _parse_roi(text: str):
+    w, h = text.lower().split('x')
+    return int(w), int(h)
+
+
+def _camera_settings(args, roi, pixel_format, image_format, folder) -> dict:
+    return dict(
+        folder=folder,
+        fps=args.fps,
+        exposure_time=args.exposure,
+        gain_auto_mode='Off',
+        exposure_auto_mode='Off',
+        width=roi[0],
+        height=roi[1],
+        offset_x=0,
+        offset_y=0,
+        center_roi=True,
+        pixel_format=pixel_format,
+        extension=image_format,
+    )
+
+
+# =========================================================
+# シナリオ
+# =========================================================
+
+
+def bench_record(controller, args, roi, pixel_format, image_format, folder) -> dict:
+    """CameraController.record_cam1 の持続FPS・欠落・ステージ別レイテンシ"""
+    import cv2
+
+    controller.configure_cam1(**_camera_settings(args, roi, pixel_format, image_format, folder),
+                              writer_threads=args.writer_threads, writer_queue_size=args.writer_queue,
+                              compression=args.compression if image_format == 'fcr' else None,
+                              compression_level=args.compression_level)
+    cam = controller.cam1
+    timer = StageTimer()
+    cam.instrumentation.enabled = True
+    try:
+        with ResourceMeter() as meter:
+            stats = controller.record_cam1(args.duration, pacing=args.pacing, mode=args.mode)
+    finally:
+        cam.instrumentation.enabled = False
+
+    # エンコード単体の時間（画像形式のみ、最後のフレームを使う）
+    if image_format != 'fcr' and cam.frame_counter:
+        last = os.path.join(folder, f"frame_{cam.frame_counter - 1}.{image_format}")
+        sample = cv2.imread(last, cv2.IMREAD_UNCHANGED)
+        if sample is not None:
+            encode = timer.wrap('encode', cv2.imencode)
+            for _ in range(args.encode_samples):
+                encode(f".{image_format}", sample)
+
+    written = stats.get('written', stats.get('frames_received', 0))
+    res = meter.result()
+    return {
+        'sustained_fps': written / res['wall_sec'] if res['wall_sec'] > 0 else 0.0,
+        'camera_fps': stats.get('measured_fps', 0.0),
+        'expected_frames': stats.get('expected_frames', 0),
+        'frames_received': stats.get('frames_received', 0),
+        'frames_written': written,
+        'dropped_frames': len(stats.get('dropped_frame_ids', [])),
+        'incomplete': stats.get('incomplete', 0),
+        'writer_blocked': stats.get('blocked', 0),
+        'writer_dropped': stats.get('dropped', 0),
+        'max_queue_depth': stats.get('max_queue_depth', 0),
+        'compression': stats.get('compression'),
+        'stages': {**stats.get('instrumentation', {}).get('stages', {}), **timer.summary()},
+        **res,
+    }
+
+
+def bench_live(controller, args, roi, pixel_format, image_format, folder) -> dict:
+    """CameraLiveWorker → QImage（プールのバッファをそのまま参照）までの表示FPSとレイテンシ"""
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PySide6.QtGui import QGuiApplication
+    from camera_control.camera_live_worker import CameraLiveWorker
+    from ui.gl_image_widget import frame_to_qimage
+
+    app = QGuiApplication.instance() or QGuiApplication([])
+    cam = controller.cam1
+    cam.prime_for_live(width=roi[0], height=roi[1], pixel_format_name=pixel_format,
+                       exposure_time=args.exposure, fps=args.fps)
+
+    timer = StageTimer()
+    grabbed_at = {}
+    grab = cam.capture_frame_for_live
+
+    def timed_grab(*a, **kw):
+        frame = grab(*a, **kw)
+        if frame is not None:
+            grabbed_at[id(frame)] = time.perf_counter()
+        return frame
+
+    register = cam.register_image_events
+
+    def timed_register(on_frame, pool=None):
+        # イベント駆動（--live-events）ではコールバックでプールへ変換し終えた時刻を取得時刻にする
+        def timed(frame, info):
+            if frame is not None:
+                grabbed_at[id(frame)] = time.perf_counter()
+            on_frame(frame, info)
+        return register(timed, pool=pool)
+
+    cam.capture_frame_for_live = timed_grab
+    cam.register_image_events = timed_register
+    cam.instrumentation.enabled = True
+    displayed = [0]
+    shown = [None, None]  # ImageGLWidget と同じく「表示中」のフレームと QImage を保持
+
+    def on_frame(_img_np):
+        # main.py の update_liveview_cam1 → ImageGLWidget.setFrame と同じ処理（mailbox の最新フレームを表示）
+        t0 = time.perf_counter()
+        frame = worker.take_frame()
+        if frame is None:
+            return
+        grabbed = grabbed_at.pop(id(frame), None)
+        if grabbed is not None:
+            timer.add('latency', t0 - grabbed)
+        qimg = frame_to_qimage(frame)
+        t1 = time.perf_counter()
+        prev = shown[0]
+        shown[0], shown[1] = frame, qimg
+        if prev is not None and prev is not frame:
+            worker.frame_pool.release(prev)
+        t2 = time.perf_counter()
+        timer.add('convert', t1 - t0)
+        timer.add('display', t2 - t1)
+        worker.report_display_cost(t2 - t0)
+        displayed[0] += 1
+
+    worker = CameraLiveWorker(cam, fps=args.live_fps, use_events=args.live_events)
+    worker.instrumentation.enabled = True
+    worker.new_frame.connect(on_frame)
+    try:
+        with ResourceMeter() as meter:
+            worker.start()
+            deadline = time.perf_counter() + args.duration
+            while time.perf_counter() < deadline:
+                app.processEvents()
+                time.sleep(0.001)
+            worker.stop()
+            app.processEvents()
+    finally:
+        del cam.capture_frame_for_live
+        del cam.register_image_events
+        cam.instrumentation.enabled = False
+
+    res = meter.result()
+    live = worker.instrumentation.snapshot()
+    live_stats = worker.live_stats()
+    return {
+        'sustained_fps': displayed[0] / res['wall_sec'] if res['wall_sec'] > 0 else 0.0,
+        'frames_grabbed': live_stats['captured'],
+        'frames_displayed': displayed[0],
+        'dropped_frames': live_stats['captured'] - displayed[0],
+        'superseded_frames': live_stats['superseded'],
+        'display_busy': live_stats['display_busy'],
+        'pool_allocations': worker.frame_pool.allocations,
+        'stages': {**cam.instrumentation.snapshot()['stages'], **live['stages'], **timer.summary()},
+        **res,
+    }
+
+
+def bench_sync(controller, args, roi, pixel_format, image_format, folder) -> dict:
+    """
+    main.py の同期撮影と同じ手順（両カメラ設定 → capture_single_frame）を繰り返したときのレイテンシ
+    Cam2 は Line3 トリガで Cam1 の露光に同期する
+    """
+    settings = _camera_settings(args, roi, pixel_format, image_format, folder)
+    timer = StageTimer()
+    configure1 = timer.wrap('configure', controller.configure_cam1)
+    configure2 = timer.wrap('configure', controller.configure_cam2)
+    capture = timer.wrap('capture', controller.capture_single_frame)
+
+    cams = {'cam1': controller.cam1, 'cam2': controller.cam2}
+    for cam in cams.values():
+        cam.instrumentation.reset()
+        cam.instrumentation.enabled = True
+
+    completed = 0
+    try:
+        with ResourceMeter() as meter:
+            for i in range(args.sync_captures):
+                configure1(**settings)
+                configure2(**{**settings, 'folder': os.path.join(folder, 'cam2')})
+                f1, f2 = capture(f"sync_{i}.{image_format}", f"sync_{i}.{image_format}")
+                completed += f1 is not None and f2 is not None
+    finally:
+        for cam in cams.values():
+            cam.stop()
+            cam.instrumentation.enabled = False
+
+    stages = timer.summary()
+    for prefix, cam in cams.items():
+        for stage, summary in cam.instrumentation.snapshot()['stages'].items():
+            stages[f"{prefix}_{stage}"] = summary
+
+    res = meter.result()
+    return {
+        'sustained_fps': completed / res['wall_sec'] if res['wall_sec'] > 0 else 0.0,
+        'captures': args.sync_captures,
+        'completed': completed,
+        'dropped_frames': args.sync_captures - completed,
+        'stages': stages,
+        **res,
+    }
+
+
+def bench_sync_burst(controller, args, roi, pixel_format, image_format, folder) -> dict:
+    """
+    sync と同じ枚数を、待機状態（arm_sync_burst）を保ったまま1組ずつ撮影したときのレイテンシ
+    設定・arm は最初の1回だけ（'arm' ステージ）。保存しない（NumPy 配列のまま）
+    """
+    settings = _camera_settings(args, roi, pixel_format, image_format, folder)
+    timer = StageTimer()
+    arm = timer.wrap('arm', controller.arm_sync_burst)
+    capture = timer.wrap('capture', controller.capture_sync_burst)
+
+    completed = 0
+    try:
+        with ResourceMeter() as meter:
+            controller.configure_cam1(**settings)
+            controller.configure_cam2(**{**settings, 'folder': os.path.join(folder, 'cam2')})
+            arm()
+            for _ in range(args.sync_captures):
+                completed += capture(1)['captured']
+    finally:
+        controller.disarm_sync_burst()
+        controller.cam1.stop()
+        controller.cam2.stop()
+
+    res = meter.result()
+    return {
+        'sustained_fps': completed / res['wall_sec'] if res['wall_sec'] > 0 else 0.0,
+        'captures': args.sync_captures,
+        'completed': completed,
+        'dropped_frames': args.sync_captures - completed,
+        'stages': timer.summary(),
+        **res,
+    }
+
+
+def bench_unpack(controller, args, roi, pixel_format, image_format, folder) -> dict:
+    """
+    10/12bit パック形式 → uint16 展開（util.pixel_unpack.unpack）のスループット（カメラは使わない）
+    gb_per_sec_in はパック後のバイト数、gb_per_sec_out は展開後（uint16）のバイト数で数える
+    """
+    from util.pixel_format import pixel_format_info
+    from util.pixel_unpack import is_packed, pack, unpack
+
+    if not is_packed(pixel_format):
+        raise ValueError(f"Not a packed pixel format: {pixel_format}")
+    w, h = roi
+    bit_depth = pixel_format_info(pixel_format)[2]
+    rng = np.random.default_rng(0)
+    data = pack(rng.integers(0, 1 << bit_depth, size=(h, w), dtype=np.uint16), pixel_format)
+    out = np.empty((h, w), dtype=np.uint16)
+    timer = StageTimer()
+    run = timer.wrap('unpack', unpack)
+
+    frames = 0
+    with ResourceMeter() as meter:
+        deadline = time.perf_counter() + args.duration
+        while time.perf_counter() < deadline:
+            run(data, w, h, pixel_format, out=out)
+            frames += 1
+
+    res = meter.result()
+    unpack_sec = sum(timer.samples['unpack'])
+    return {
+        'sustained_fps': frames / res['wall_sec'] if res['wall_sec'] > 0 else 0.0,
+        'frames': frames,
+        'dropped_frames': 0,
+        'gb_per_sec_in': frames * data.nbytes / unpack_sec / 1e9 if unpack_sec else 0.0,
+        'gb_per_sec_out': frames * out.nbytes / unpack_sec / 1e9 if unpack_sec else 0.0,
+        'stages': timer.summary(),
+        **res,
+    }
+
+
+BENCHES = {
+    'record': bench_record,
+    'live': bench_live,
+    'sync': bench_sync,
+    'sync_burst': bench_sync_burst,
+    'unpack': bench_unpack,
+}
+
+
+# =========================================================
+# 実行・出力
+# =========================================================
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def _result_key(r: dict) -> tuple:
+    return r['scenario'], r['roi'], r['pixel_format'], r['image_format']
+
+
+def _print_result(r: dict, baseline: dict = None):
+    if 'error' in r:
+        print(f"[Bench] {r['scenario']:<6} {r['roi']:>9} {r['pixel_format']:<8} {r['image_format']:<4}  ERROR: {r['error']}")
+        return
+    stages = "  ".join(f"{name}={s['p50_ms']:.2f}/{s['p99_ms']:.2f}ms" for name, s in r['stages'].items())
+    line = (f"[Bench] {r['scenario']:<6} {r['roi']:>9} {r['pixel_format']:<8} {r['image_format']:<4}  "
+            f"fps={r['sustained_fps']:.1f}  dropped={r['dropped_frames']}  cpu={r['cpu_percent']:.0f}%  {stages}")
+    if r.get('compression'):
+        c = r['compression']
+        line += f"  {c['codec']}={c['ratio']:.2f}x@{c['throughput_mb_per_sec']:.0f}MB/s"
+    if 'gb_per_sec_in' in r:
+        line += f"  in={r['gb_per_sec_in']:.2f}GB/s  out={r['gb_per_sec_out']:.2f}GB/s"
+    base = (baseline or {}).get(_result_key(r))
+    if base and base.get('sustained_fps'):
+        delta = 100.0 * (r['sustained_fps'] - base['sustained_fps']) / base['sustained_fps']
+        line += f"  (vs baseline {delta:+.1f}%)"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="録画・ライブビュー・同期撮影のベンチマーク")
+    parser.add_argument('--scenario', nargs='+', default=list(SCENARIOS), choices=SCENARIOS)
+    parser.add_argument('--roi', nargs='+', default=['640x480', '1440x1080'], help="WxH")
+    parser.add_argument('--pixel-format', nargs='+', default=['Mono8'])
+    parser.add_argument('--format', nargs='+', default=['fcr', 'bmp'], help="image_format（録画拡張子）")
+    parser.add_argument('--fps', type=float, default=100.0)
+    parser.add_argument('--live-fps', type=float, default=20.0)
+    parser.add_argument('--exposure', type=float, default=2000.0, help="露光時間 [us]")
+    parser.add_argument('--duration', type=float, default=2.0, help="録画・ライブビューの計測時間 [s]")
+    parser.add_argument('--mode', default='stream', choices=['stream', 'ram_burst'])
+    parser.add_argument('--pacing', default='hardware', choices=['hardware', 'host', 'event'],
+                        help="録画の取得方式（event は ImageEventHandler のコールバック）")
+    parser.add_argument('--live-events', action='store_true', help="LiveView をイベント駆動で取得する")
+    parser.add_argument('--writer-threads', type=int, default=2)
+    parser.add_argument('--writer-queue', type=int, default=64)
+    parser.add_argument('--compression', default=None, help="fcr の可逆圧縮（auto / zstd / lz4 / zlib、省略時は非圧縮）")
+    parser.add_argument('--compression-level', type=int, default=None)
+    parser.add_argument('--sync-captures', type=int, default=20)
+    parser.add_argument('--encode-samples', type=int, default=20)
+    parser.add_argument('--serial1', default='00000001')
+    parser.add_argument('--serial2', default='00000002')
+    parser.add_argument('--hardware', action='store_true', help="シミュレーションではなく実機で計測する")
+    parser.add_argument('--output', default=None, help="結果の JSON ファイル")
+    parser.add_argument('--baseline', default=None, help="比較用の過去の結果 JSON")
+    parser.add_argument('--keep-files', action='store_true', help="録画ファイルを削除しない")
+    args = parser.parse_args()
+
+    if not args.hardware:
+        os.environ.setdefault('FLIR_SIMULATION', '1')
+    from util.spin_backend import PySpin, SIMULATION
+    from camera_control.camera_controller import CameraController
+    from util.pixel_unpack import is_packed
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = {_result_key(r): r for r in json.load(f)['results']}
+
+    system = PySpin.System.GetInstance()
+    controller = CameraController(system=system)
+    controller.initialize_cam1(args.serial1)
+    if {'sync', 'sync_burst'} & set(args.scenario):
+        controller.initialize_cam2(args.serial2)
+
+    work_dir = tempfile.mkdtemp(prefix='flir_bench_')
+    results = []
+    try:
+        for scenario in args.scenario:
+            pixel_formats = args.pixel_format
+            if scenario == 'unpack':
+                # 展開はパック形式だけが対象（Mono8 などは飛ばす）
+                pixel_formats = [f for f in pixel_formats if is_packed(f)] or list(UNPACK_DEFAULT_FORMATS)
+            for roi_text in args.roi:
+                for pixel_format in pixel_formats:
+                    for image_format in (args.format if scenario not in ('live', 'unpack') else ['-']):
+                        folder = os.path.join(work_dir, f"{scenario}_{roi_text}_{pixel_format}_{image_format}")
+                        os.makedirs(folder, exist_ok=True)
+                        entry = {
+                            'scenario': scenario,
+                            'roi': roi_text,
+                            'pixel_format': pixel_format,
+                            'image_format': image_format,
+                            'target_fps': args.fps,
+                        }
+                        try:
+                            entry.update(BENCHES[scenario](controller, args, _parse_roi(roi_text),
+                                                           pixel_format, image_format, folder))
+                        except Exception as e:
+                            entry['error'] = f"{type(e).__name__}: {e}"
+                        results.append(entry)
+                        _print_result(entry, baseline)
+                        if not args.keep_files:
+                            shutil.rmtree(folder, ignore_errors=True)
+    finally:
+        controller.release_cam1()
+        controller.release_cam2()
+        system.ReleaseInstance()
+        if not args.keep_files:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        'meta': {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'git_revision': _git_revision(),
+            'backend': 'simulation' if SIMULATION else 'hardware',
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'args': vars(args),
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"[Bench] Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
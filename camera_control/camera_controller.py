@@ -1,7 +1,10 @@
 import os
-import PySpin
+from util.spin_backend import PySpin
+from camera_control.clock_sync import calibrate_clock, format_clock_mapping
 from camera_control.primary_camera_gui import PrimaryCamera
+from camera_control.record_loop import DualStreamAcquisition, run_synchronized_recording
 from camera_control.secondary_camera_gui import SecondaryCamera
+from camera_control.sync_burst import SyncBurstCapture
 
 
 class CameraController:
@@ -9,6 +12,9 @@ class CameraController:
         self.system = system
         self.cam1 = None
         self.cam2 = None
+        self._clock_samples = {}
+        self._sync_acquisition = None
+        self._sync_burst = None
 
     # ---------------------------------------------------------
     # カメラ初期化
@@ -40,7 +46,15 @@ class CameraController:
                        reverse_y: bool = False,
                        white_balance_auto: str = "Off",
                        wb_red: float = 1.0,
-                       wb_blue: float = 1.0):
+                       wb_blue: float = 1.0,
+                       writer_threads: int = 2,
+                       writer_queue_size: int = 64,
+                       ram_budget_bytes: int = 4 * 2**30,
+                       stream_buffer_mode: str = 'OldestFirst',
+                       stream_buffer_count='auto',
+                       writer_latency_ms: float = 100.0,
+                       compression: str = None,
+                       compression_level: int = None):
         """Cam1設定（UIのRed/Blue両方対応）"""
         os.makedirs(folder, exist_ok=True)
 
@@ -63,6 +77,14 @@ class CameraController:
             white_balance_auto=white_balance_auto,
             wb_red=wb_red,
             wb_blue=wb_blue,
+            writer_threads=writer_threads,
+            writer_queue_size=writer_queue_size,
+            ram_budget_bytes=ram_budget_bytes,
+            stream_buffer_mode=stream_buffer_mode,
+            stream_buffer_count=stream_buffer_count,
+            writer_latency_ms=writer_latency_ms,
+            compression=compression,
+            compression_level=compression_level,
         )
 
     # ---------------------------------------------------------
@@ -86,7 +108,15 @@ class CameraController:
                        reverse_y: bool = False,
                        white_balance_auto: str = "Off",
                        wb_red: float = 1.0,
-                       wb_blue: float = 1.0):
+                       wb_blue: float = 1.0,
+                       writer_threads: int = 2,
+                       writer_queue_size: int = 64,
+                       ram_budget_bytes: int = 4 * 2**30,
+                       stream_buffer_mode: str = 'OldestFirst',
+                       stream_buffer_count='auto',
+                       writer_latency_ms: float = 100.0,
+                       compression: str = None,
+                       compression_level: int = None):
         """Cam2設定（UIのRed/Blue両方対応）"""
         os.makedirs(folder, exist_ok=True)
 
@@ -110,6 +140,14 @@ class CameraController:
             white_balance_auto=white_balance_auto,
             wb_red=wb_red,
             wb_blue=wb_blue,
+            writer_threads=writer_threads,
+            writer_queue_size=writer_queue_size,
+            ram_budget_bytes=ram_budget_bytes,
+            stream_buffer_mode=stream_buffer_mode,
+            stream_buffer_count=stream_buffer_count,
+            writer_latency_ms=writer_latency_ms,
+            compression=compression,
+            compression_level=compression_level,
         )
 
     # ---------------------------------------------------------
@@ -127,29 +165,130 @@ class CameraController:
 
         return frame1, frame2
 
+    # ---------------------------------------------------------
+    # 同期バースト（設定し直さずに同期撮影を繰り返す）
+    # ---------------------------------------------------------
+    @property
+    def sync_burst_armed(self) -> bool:
+        return self._sync_burst is not None and self._sync_burst.armed
+
+    def arm_sync_burst(self, timeout_ms: int = 1000):
+        """
+        configure_cam1/2 済みの両カメラを同期撮影の待機状態にする
+        Cam1 はソフトウェアトリガ、Cam2 は Line3 トリガで取得を開始したままにする
+        """
+        if self.cam1 is None or self.cam2 is None:
+            raise RuntimeError("カメラが初期化されていません")
+        if self._sync_burst is None or self._sync_burst.cam1 is not self.cam1 or self._sync_burst.cam2 is not self.cam2:
+            self._sync_burst = SyncBurstCapture(self.cam1, self.cam2, timeout_ms=timeout_ms)
+        self._sync_burst.timeout_ms = timeout_ms
+        self._sync_burst.arm()
+
+    def capture_sync_burst(self, count: int = 1, save: bool = False, filenames: tuple = None) -> dict:
+        """
+        count 組を同期撮影して NumPy 配列で返す（save=True のときだけ保存、filenames は SyncBurstCapture.capture と同じ）
+        待機状態でなければ arm_sync_burst() してから撮影する
+        """
+        if not self.sync_burst_armed:
+            self.arm_sync_burst()
+        return self._sync_burst.capture(count, save=save, filenames=filenames)
+
+    def disarm_sync_burst(self):
+        if self._sync_burst is not None:
+            if self._sync_burst.armed:
+                self._sync_burst.disarm()
+            self._sync_burst = None
+
     # ---------------------------------------------------------
     # 録画
     # ---------------------------------------------------------
-    def record_cam1(self, duration_sec: float):
+    def record_cam1(self, duration_sec: float, pacing: str = 'hardware', mode: str = 'stream'):
         if self.cam1 is None:
             raise RuntimeError("Camera 1 is not initialized")
-        self.cam1.record(duration_sec=duration_sec)
+        return self.cam1.record(duration_sec=duration_sec, pacing=pacing, mode=mode)
 
-    def record_cam2(self, duration_sec: float):
+    def record_cam2(self, duration_sec: float, pacing: str = 'hardware', mode: str = 'stream'):
         if self.cam2 is None:
             raise RuntimeError("Camera 2 is not initialized")
-        self.cam2.record(duration_sec=duration_sec)
+        return self.cam2.record(duration_sec=duration_sec, pacing=pacing, mode=mode)
+
+    def record_synchronized(self, duration_sec: float, tolerance_ms: float = None, calibrate: bool = True):
+        """
+        2台同時録画：タイムスタンプで組にしたフレームだけを両カメラで同じ番号で保存する
+        calibrate=True なら開始前に calibrate_clocks() を行い、ホスト時刻系で組にする
+        戻り値は {'cam1': 統計, 'cam2': 統計, 'sync': 組数・対応なし・ずれの統計}
+        """
+        if self.cam1 is None or self.cam2 is None:
+            raise RuntimeError("カメラが初期化されていません")
+        for cam in (self.cam1, self.cam2):
+            if not cam._primed:
+                raise RuntimeError(f"{cam.name} must be primed before recording")
+        if calibrate:
+            self.calibrate_clocks()
+        print(f"[CameraController] Start synchronized recording: {duration_sec:.1f}s at {self.cam1.framerate:.2f} FPS")
+        # 取得は1本のスレッドで両カメラを扱う（stop_synchronized() で途中停止できる）
+        self._sync_acquisition = DualStreamAcquisition((self.cam1, self.cam2))
+        try:
+            stats = run_synchronized_recording(self.cam1, self.cam2, duration_sec, tolerance_ms=tolerance_ms,
+                                               acquisition=self._sync_acquisition)
+        finally:
+            self._sync_acquisition = None
+        if calibrate:
+            # 録画前後のサンプルをまとめて当てはめ直し、次回のドリフト推定を正確にする
+            # （録画は済んでいるので、失敗しても結果は返す）
+            try:
+                self.calibrate_clocks(samples=16)
+            except Exception as e:
+                print(f"[CameraController] Clock recalibration failed: {e}")
+        return stats
+
+    def stop_synchronized(self):
+        """同時録画を途中で止める（別スレッドから呼べる。取得済みのフレームは組にして保存される）"""
+        acquisition = self._sync_acquisition
+        if acquisition is not None:
+            acquisition.stop()
+
+    # ---------------------------------------------------------
+    # クロック校正
+    # ---------------------------------------------------------
+    def calibrate_clocks(self, samples: int = 32, interval_sec: float = 0.005, accumulate: bool = True) -> dict:
+        """
+        両カメラのデバイスクロックを TimestampLatch でホスト時刻と突き合わせ、オフセットとドリフトを求める
+        結果は各カメラの clock_mapping に設定され、以降のフレームに host_timestamp が付く
+        accumulate=True なら前回までのサンプルとまとめて当てはめる（間隔が空くほどドリフトが正確になる）
+        ラッチできないカメラは clock_mapping を None にする（同時録画は先頭フレームからのオフセット推定で組にする）
+        """
+        if self.cam1 is None or self.cam2 is None:
+            raise RuntimeError("カメラが初期化されていません")
+        mappings = {}
+        for key, cam in (('cam1', self.cam1), ('cam2', self.cam2)):
+            previous = self._clock_samples.get(cam.serial_number) if accumulate else None
+            try:
+                mapping, self._clock_samples[cam.serial_number] = calibrate_clock(cam.camera, samples, interval_sec,
+                                                                                  previous=previous)
+            except (RuntimeError, PySpin.SpinnakerException) as e:
+                print(f"[CameraController] {cam.name} clock calibration skipped: {e}")
+                mapping = None
+            cam.clock_mapping = mapping
+            mappings[key] = mapping
+            if mapping is not None:
+                print(f"[CameraController] {cam.name} clock: {format_clock_mapping(mapping)}")
+        return mappings
 
     # ---------------------------------------------------------
     # リリース
     # ---------------------------------------------------------
     def release_cam1(self):
+        self._sync_burst = None
         if self.cam1:
+            self._clock_samples.pop(self.cam1.serial_number, None)
             self.cam1.release()
             self.cam1 = None
 
     def release_cam2(self):
+        self._sync_burst = None
         if self.cam2:
+            self._clock_samples.pop(self.cam2.serial_number, None)
             self.cam2.release()
             self.cam2 = None
 
@@ -1,24 +1,56 @@
 from PySide6.QtCore import QThread, Signal
+import threading
 import time
 
+from camera_control.image_events import IMAGE_EVENTS_DEFAULT
+from camera_control.instrumentation import Instrumentation
+from camera_control.latest_frame_mailbox import LatestFrameMailbox
+from camera_control.live_frame_pool import LiveFramePool
+
+# 表示にかかる時間（描画＋スロット処理）の何倍の間隔まで表示を間引くか（GUIスレッドの占有率 ≒ 1/HEADROOM）
+DISPLAY_HEADROOM = 2.0
+# 表示コストの指数移動平均の係数
+DISPLAY_COST_ALPHA = 0.2
+
+
 class CameraLiveWorker(QThread):
     """
     FLIRカメラのLiveView用画像取得ワーカー
-    別スレッドで実行され、一定間隔で画像を取得してSignalでGUIに渡す
+    別スレッドで実行され、一定間隔で画像を取得して mailbox（最新1枚）に置き、SignalでGUIに知らせる
+    GUI は take_frame() で最新フレームを受け取り、表示に使い終わったら frame_pool.release() で返す
+    通知は GUI が前のフレームを受け取り済みのときだけ、かつ表示コストに応じた間隔でしか行わない
+    use_events=True ではポーリングせず、ImageEventHandler のコールバック（ドライバのイベントスレッド）で
+    フレームを受け取る。このスレッドは開始・停止だけを行い、取得の間は眠っている
     """
     new_frame = Signal(object)  # NumPy配列（画像データ）を送信
 
-    def __init__(self, camera, fps=20, parent=None):
+    def __init__(self, camera, fps=20, parent=None, pool_slots: int = 3, max_display_fps: float = 60.0,
+                 use_events: bool = IMAGE_EVENTS_DEFAULT):
         super().__init__(parent)
         self.camera = camera
         self.interval = 1.0 / fps
+        self.use_events = use_events
         self._running = False
+        self._stop_event = threading.Event()
+        self.frame_pool = LiveFramePool(pool_slots)
+        self.mailbox = LatestFrameMailbox()
+        self.min_display_interval = 1.0 / max_display_fps
+        self.display_interval = self.min_display_interval
+        self._display_cost = 0.0
+        self._last_notify = 0.0
+        self.captured = 0
+        self.display_busy = 0
+        self._started = time.time()
+        # 取得～シグナル送出までの計測（カメラ側の grab_wait / get_ndarray は camera.instrumentation）
+        self.instrumentation = Instrumentation(f"{camera.name}-Live")
 
     def run(self):
         """
         スレッド実行：カメラから画像を取得し続ける
         """
         self._running = True
+        self._stop_event.clear()
+        self._started = time.time()
 
         try:
             self.camera.trigger()  # BeginAcquisition 相当
@@ -27,30 +59,139 @@ class CameraLiveWorker(QThread):
             print(f"[CameraLiveWorker] Trigger error: {e}")
             return
 
+        if self.use_events:
+            self._run_events()
+        else:
+            self._run_polling()
+
+        try:
+            self.camera.stop()  # EndAcquisition 相当
+        except Exception as e:
+            print(f"[CameraLiveWorker] Stop error: {e}")
+
+        leftover = self.mailbox.clear()
+        if leftover is not None:
+            self.frame_pool.release(leftover)
+
+    def _run_polling(self):
+        """ポーリング：一定間隔で capture_frame_for_live を呼ぶ"""
         while self._running:
             start = time.time()
+            inst = self.instrumentation
 
-            try:
-                frame = self.camera.capture_frame_for_live()
-                if frame is not None:
-                    self.new_frame.emit(frame)
-                else:
-                    print("[LiveWorker] Got None frame from camera.")
-            except Exception as e:
-                print(f"[CameraLiveWorker] Frame capture error: {e}")
+            if not self.frame_pool.has_free():
+                # 表示が追いついていない：取得せずに次の周期へ（NewestOnly なので古いフレームは溜まらない）
+                self.display_busy += 1
+                inst.count('display_busy')
+            else:
+                try:
+                    t0 = inst.start()
+                    frame = self.camera.capture_frame_for_live(self.frame_pool)
+                    t0 = inst.record('capture', t0)
+                    if frame is not None:
+                        self.captured += 1
+                        displaced = self.mailbox.post(frame)
+                        if displaced is not None:
+                            self.frame_pool.release(displaced)
+                        inst.record('post', t0)
+                        inst.count('frames')
+                    else:
+                        inst.count('none_frames')
+                        print("[LiveWorker] Got None frame from camera.")
+                except Exception as e:
+                    print(f"[CameraLiveWorker] Frame capture error: {e}")
+
+            self._notify_display()
 
             elapsed = time.time() - start
             sleep_time = max(0, self.interval - elapsed)
             time.sleep(sleep_time)
 
+    def _run_events(self):
+        """イベント駆動：コールバックが届いたフレームを処理するので、停止要求まで待つだけ"""
         try:
-            self.camera.stop()  # EndAcquisition 相当
+            self.camera.register_image_events(self._on_image_event, pool=self.frame_pool)
         except Exception as e:
-            print(f"[CameraLiveWorker] Stop error: {e}")
+            print(f"[CameraLiveWorker] Event registration error: {e}")
+            return
+        try:
+            self._stop_event.wait()
+        finally:
+            self.camera.unregister_image_events()
+
+    def _on_image_event(self, frame, info):
+        """ドライバのイベントスレッドから呼ばれる（frame はプールのバッファ、空きが無い・不完全なら None）"""
+        inst = self.instrumentation
+        if frame is None:
+            if info is not None and self.frame_pool.has_free():
+                inst.count('none_frames')
+            else:
+                # 表示が追いついていない：このフレームは捨てる
+                self.display_busy += 1
+                inst.count('display_busy')
+            return
+        t0 = inst.start()
+        self.captured += 1
+        displaced = self.mailbox.post(frame)
+        if displaced is not None:
+            self.frame_pool.release(displaced)
+        inst.record('post', t0)
+        inst.count('frames')
+        self._notify_display()
+
+    def _notify_display(self):
+        """GUI が前のフレームを受け取り済みで、表示間隔も空いていればシグナルを送る"""
+        now = time.time()
+        if now - self._last_notify < self.display_interval:
+            return
+        frame = self.mailbox.peek_unnotified()
+        if frame is None:
+            return
+        self._last_notify = now
+        t0 = self.instrumentation.start()
+        self.new_frame.emit(frame)
+        self.instrumentation.record('emit', t0)
+
+    # ---------------------------------------------------------
+    # GUI スレッドから呼ぶ
+    # ---------------------------------------------------------
+    def take_frame(self):
+        """表示する最新フレーム（既に取り出し済みなら None）"""
+        return self.mailbox.take()
+
+    def report_display_cost(self, seconds: float):
+        """1フレームの表示にかかった時間を伝え、通知間隔を調整する"""
+        if self._display_cost:
+            self._display_cost += DISPLAY_COST_ALPHA * (seconds - self._display_cost)
+        else:
+            self._display_cost = seconds
+        self.display_interval = max(self.min_display_interval, DISPLAY_HEADROOM * self._display_cost)
+
+    def live_stats(self) -> dict:
+        elapsed = max(time.time() - self._started, 1e-9)
+        return {
+            'captured': self.captured,
+            'displayed': self.mailbox.taken,
+            'superseded': self.mailbox.superseded,
+            'display_busy': self.display_busy,
+            'capture_fps': self.captured / elapsed,
+            'display_fps': self.mailbox.taken / elapsed,
+            'display_cost_ms': self._display_cost * 1e3,
+            'display_interval_ms': self.display_interval * 1e3,
+        }
 
     def stop(self):
         """
         スレッド終了要求（安全に止めるためのフラグと待機）
         """
         self._running = False
+        self._stop_event.set()
         self.wait()  # スレッドの終了を待つ（重要！）
+
+
+def format_live_stats(stats: dict) -> str:
+    """LiveView の取得数・表示数をログ出力用の1行に整形する"""
+    return (f"captured={stats['captured']} ({stats['capture_fps']:.1f} fps)  "
+            f"displayed={stats['displayed']} ({stats['display_fps']:.1f} fps)  "
+            f"superseded={stats['superseded']}  display_busy={stats['display_busy']}  "
+            f"display_cost={stats['display_cost_ms']:.2f}ms")
@@ -1,16 +1,22 @@
 from PySide6.QtCore import QObject, QThread, Signal
 import traceback
 
+from camera_control.image_events import DEFAULT_PACING
+
 
 class CameraWorker(QObject):
     finished = Signal()
     error_occurred = Signal(str)
+    record_stats = Signal(dict)  # 録画統計（書き込みプールのバックプレッシャー、RAMバーストのピークメモリ・書き出し速度など）
 
-    def __init__(self, camera_controller, duration_sec: float, cam_id: int = 1):
+    def __init__(self, camera_controller, duration_sec: float, cam_id: int = 1,
+                 pacing: str = DEFAULT_PACING, mode: str = 'stream'):
         super().__init__()
         self.controller = camera_controller
         self.duration_sec = duration_sec
         self.cam_id = cam_id
+        self.pacing = pacing  # 'hardware' / 'host' / 'event'
+        self.mode = mode  # 'stream' / 'ram_burst'
         self._is_running = True
 
     def run(self):
@@ -19,12 +25,15 @@ class CameraWorker(QObject):
                 return
 
             if self.cam_id == 1:
-                self.controller.record_cam1(self.duration_sec)
+                stats = self.controller.record_cam1(self.duration_sec, pacing=self.pacing, mode=self.mode)
             elif self.cam_id == 2:
-                self.controller.record_cam2(self.duration_sec)
+                stats = self.controller.record_cam2(self.duration_sec, pacing=self.pacing, mode=self.mode)
             else:
                 raise ValueError("Invalid cam_id provided to CameraWorker")
 
+            if stats:
+                self.record_stats.emit(stats)
+
         except Exception as e:
             tb = traceback.format_exc()
             self.error_occurred.emit(f"[CameraWorker] Error: {str(e)}\n{tb}")
@@ -33,3 +42,30 @@ class CameraWorker(QObject):
 
     def stop(self):
         self._is_running = False
+
+
+class SyncRecordWorker(QObject):
+    """2台同時録画（タイムスタンプで組にして保存）を1つのスレッドで行う"""
+    finished = Signal()
+    error_occurred = Signal(str)
+    record_stats = Signal(dict)  # {'cam1': 統計, 'cam2': 統計, 'sync': 組の統計}
+
+    def __init__(self, camera_controller, duration_sec: float, tolerance_ms: float = None):
+        super().__init__()
+        self.controller = camera_controller
+        self.duration_sec = duration_sec
+        self.tolerance_ms = tolerance_ms
+
+    def run(self):
+        try:
+            stats = self.controller.record_synchronized(self.duration_sec, tolerance_ms=self.tolerance_ms)
+            if stats:
+                self.record_stats.emit(stats)
+        except Exception as e:
+            tb = traceback.format_exc()
+            self.error_occurred.emit(f"[SyncRecordWorker] Error: {str(e)}\n{tb}")
+        finally:
+            self.finished.emit()
+
+    def stop(self):
+        self.controller.stop_synchronized()
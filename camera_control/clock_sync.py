@@ -0,0 +1,142 @@
+import time
+
+import numpy as np
+
+from util.spin_backend import PySpin
+
+# =========================================================
+# デバイスクロック → ホスト時刻の対応付け
+#
+# 各カメラの GetTimeStamp() はカメラごとに独立したクロックなので、そのままでは比較できない
+# TimestampLatch を何度も実行し、前後のホスト時刻（time.perf_counter_ns）との組から
+#   host_ns = host_ref + slope × (device_ns − device_ref)
+# を最小二乗で求める（slope − 1 がドリフト）。2台とも同じホスト時刻系に写せば、
+# フレームの組み合わせ・ずれの計算は引き算だけで済む
+# =========================================================
+
+# (ラッチコマンド, ラッチ値)。古い GigE 機種は Gev 付きの名前
+_LATCH_NODES = (
+    ('TimestampLatch', 'TimestampLatchValue'),
+    ('GevTimestampControlLatch', 'GevTimestampValue'),
+)
+
+
+# calibrate_clock で前回分とまとめて当てはめるサンプル数の上限（既定の 32 個ずつなら直近 8 回分）
+MAX_CLOCK_SAMPLES = 256
+
+
+class ClockMapping:
+    """デバイス時刻とホスト時刻（ns）の1次の対応"""
+
+    def __init__(self, device_ref: int, host_ref: int, slope: float = 1.0, residual_ns: float = 0.0,
+                 samples: int = 0):
+        self.device_ref = int(device_ref)
+        self.host_ref = int(host_ref)
+        self.slope = float(slope)
+        self.residual_ns = float(residual_ns)
+        self.samples = samples
+
+    @property
+    def drift_ppm(self) -> float:
+        """デバイスクロックの進み（ホスト時刻に対して、+ なら速い）"""
+        return (1.0 / self.slope - 1.0) * 1e6
+
+    def to_host(self, device_ns):
+        """デバイス時刻 → ホスト時刻（整数または int64 配列）"""
+        if isinstance(device_ns, np.ndarray):
+            return self.host_ref + np.rint((device_ns - self.device_ref) * self.slope).astype(np.int64)
+        return self.host_ref + int(round((device_ns - self.device_ref) * self.slope))
+
+    def to_device(self, host_ns: int) -> int:
+        return self.device_ref + int(round((host_ns - self.host_ref) / self.slope))
+
+    def to_dict(self) -> dict:
+        return {
+            'device_ref': self.device_ref,
+            'host_ref': self.host_ref,
+            'slope': self.slope,
+            'drift_ppm': self.drift_ppm,
+            'residual_ns': self.residual_ns,
+            'samples': self.samples,
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict) -> 'ClockMapping':
+        return cls(d['device_ref'], d['host_ref'], d.get('slope', 1.0), d.get('residual_ns', 0.0), d.get('samples', 0))
+
+
+def _latch_nodes(cam):
+    nodemap = cam.GetNodeMap()
+    for latch_name, value_name in _LATCH_NODES:
+        latch = PySpin.CCommandPtr(nodemap.GetNode(latch_name))
+        value = PySpin.CIntegerPtr(nodemap.GetNode(value_name))
+        if PySpin.IsAvailable(latch) and PySpin.IsWritable(latch) and PySpin.IsAvailable(value):
+            return latch, value
+    raise RuntimeError("Camera does not support timestamp latching")
+
+
+def latch_samples(cam, count: int = 32, interval_sec: float = 0.005) -> np.ndarray:
+    """
+    TimestampLatch を count 回実行し、(ホスト時刻, デバイス時刻, 往復時間) の int64 配列 (count, 3) を返す
+    ホスト時刻はラッチ前後の中点（cam は PySpin の CameraPtr）
+    """
+    latch, value = _latch_nodes(cam)
+    out = np.empty((count, 3), dtype=np.int64)
+    for i in range(count):
+        t0 = time.perf_counter_ns()
+        latch.Execute()
+        t1 = time.perf_counter_ns()
+        out[i] = ((t0 + t1) // 2, value.GetValue(), t1 - t0)
+        if interval_sec > 0 and i + 1 < count:
+            time.sleep(interval_sec)
+    return out
+
+
+def fit_clock(samples: np.ndarray, keep: float = 0.5) -> ClockMapping:
+    """
+    latch_samples の結果からホスト時刻への対応を求める
+    往復時間の短い keep の割合だけを使う（ラッチの遅れが小さく、ホスト時刻の不確かさが小さい）
+    """
+    if len(samples) == 0:
+        raise ValueError("No clock samples")
+    order = np.argsort(samples[:, 2], kind='stable')
+    used = samples[np.sort(order[:max(2, int(len(samples) * keep))])]
+    host, device = used[:, 0], used[:, 1]
+    device_ref, host_ref = int(device[0]), int(host[0])
+    x = (device - device_ref).astype(np.float64)
+    y = (host - host_ref).astype(np.float64)
+    if len(used) < 2 or np.ptp(x) == 0:
+        slope, intercept = 1.0, float(np.mean(y - x))
+    else:
+        slope, intercept = np.polyfit(x, y, 1)
+    residual = y - (slope * x + intercept)
+    return ClockMapping(device_ref, host_ref + int(round(intercept)), slope,
+                        float(np.sqrt(np.mean(residual ** 2))), len(used))
+
+
+def calibrate_clock(cam, count: int = 32, interval_sec: float = 0.005, previous: np.ndarray = None,
+                    max_samples: int = MAX_CLOCK_SAMPLES) -> tuple:
+    """
+    デバイスクロックを測って (ClockMapping, サンプル) を返す
+    previous に前回のサンプルを渡すとまとめて当てはめる（時間が離れるほどドリフトの推定が正確になる）
+    まとめたサンプルは新しい方から max_samples 個だけ残す（校正のたびに増え続けないように）
+    """
+    samples = latch_samples(cam, count, interval_sec)
+    if previous is not None and len(previous):
+        samples = np.concatenate([previous, samples])[-max_samples:]
+    return fit_clock(samples), samples
+
+
+def mapping_error_ns(cam, mapping: ClockMapping, count: int = 8) -> float:
+    """現在のデバイス時刻を mapping でホスト時刻に写したときの誤差の中央値（ns、ドリフトの確認用）"""
+    samples = latch_samples(cam, count, 0.0)
+    keep = samples[np.argsort(samples[:, 2])[:max(1, count // 2)]]
+    return float(np.median(mapping.to_host(keep[:, 1]) - keep[:, 0]))
+
+
+def format_clock_mapping(mapping: ClockMapping) -> str:
+    """クロック対応をログ出力用の1行に整形する"""
+    if mapping is None:
+        return "(not calibrated)"
+    return (f"drift={mapping.drift_ppm:+.2f}ppm  residual={mapping.residual_ns / 1e3:.1f}us  "
+            f"samples={mapping.samples}")
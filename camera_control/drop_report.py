@@ -0,0 +1,172 @@
+import json
+import os
+
+from util.spin_backend import PySpin
+
+DROP_REPORT_FILENAME = 'drop_report.json'
+
+# TLStream の統計ノード（カメラ・ドライバで無いものは読み飛ばす）
+STREAM_STAT_NODES = (
+    'StreamDeliveredFrameCount',
+    'StreamLostFrameCount',
+    'StreamDroppedFrameCount',
+    'StreamBufferUnderrunCount',
+    'StreamIncompleteFrameCount',
+)
+
+# 公称周期の何倍を超えたらタイムスタンプの欠落とみなすか
+GAP_TOLERANCE = 1.5
+
+
+def read_stream_stats(cam) -> dict:
+    """TLStream の統計ノードを読み出す（cam は PySpin の CameraPtr）"""
+    stats = {}
+    try:
+        nodemap = cam.GetTLStreamNodeMap()
+    except PySpin.SpinnakerException:
+        return stats
+    for name in STREAM_STAT_NODES:
+        node = PySpin.CIntegerPtr(nodemap.GetNode(name))
+        if PySpin.IsAvailable(node) and PySpin.IsReadable(node):
+            stats[name] = node.GetValue()
+    return stats
+
+
+def stream_stats_delta(before: dict, after: dict) -> dict:
+    """録画中に増えた分（BeginAcquisition でリセットされる実装もあるので、減っていれば after をそのまま使う）"""
+    delta = {}
+    for name, value in after.items():
+        prev = before.get(name, 0)
+        delta[name] = value - prev if value >= prev else value
+    return delta
+
+
+def _ranges(ids) -> list:
+    """[3, 4, 5, 9] → [[3, 5], [9, 9]]"""
+    ranges = []
+    for i in ids:
+        if ranges and i == ranges[-1][1] + 1:
+            ranges[-1][1] = i
+        else:
+            ranges.append([i, i])
+    return ranges
+
+
+class DropTracker:
+    """
+    取得したフレームのフレームID・タイムスタンプから欠落を検出する
+    - フレームIDの欠番：カメラ／ストリーム側で落ちたフレーム
+    - IDは連続しているのにタイムスタンプが公称周期より大きく空いている：トリガの取りこぼし（Line3 同期側など）
+    """
+
+    def __init__(self, framerate: float = None):
+        self.period_ns = int(1e9 / framerate) if framerate else None
+        self.first_frame_id = None
+        self.last_frame_id = None
+        self.first_timestamp = None
+        self.last_timestamp = None
+        self.received = 0
+        self.dropped_ids = []
+        self.incomplete_ids = []
+        self.id_gaps = []
+        self.timestamp_gaps = []
+        self.max_interval_ns = 0
+
+    def feed(self, frame_id: int, timestamp: int, incomplete: bool = False):
+        if self.first_frame_id is None:
+            self.first_frame_id = frame_id
+            self.first_timestamp = timestamp
+        else:
+            missing = frame_id - self.last_frame_id - 1
+            interval = timestamp - self.last_timestamp
+            self.max_interval_ns = max(self.max_interval_ns, interval)
+            if missing > 0:
+                self.dropped_ids.extend(range(self.last_frame_id + 1, frame_id))
+                self.id_gaps.append({
+                    'after_frame_id': self.last_frame_id,
+                    'missing': missing,
+                    'interval_ms': interval / 1e6,
+                })
+            elif self.period_ns and interval > GAP_TOLERANCE * self.period_ns:
+                self.timestamp_gaps.append({
+                    'after_frame_id': self.last_frame_id,
+                    'estimated_missing': max(1, round(interval / self.period_ns) - 1),
+                    'interval_ms': interval / 1e6,
+                })
+        self.last_frame_id = frame_id
+        self.last_timestamp = timestamp
+        if incomplete:
+            self.incomplete_ids.append(frame_id)
+            self.dropped_ids.append(frame_id)
+        else:
+            self.received += 1
+
+    def summary(self) -> dict:
+        """取得ループの統計に合流させる項目"""
+        return {
+            'dropped_frame_ids': list(self.dropped_ids),
+            'first_frame_id': self.first_frame_id,
+            'last_frame_id': self.last_frame_id,
+        }
+
+    def report(self) -> dict:
+        span = 0 if self.first_frame_id is None else self.last_frame_id - self.first_frame_id + 1
+        return {
+            'first_frame_id': self.first_frame_id,
+            'last_frame_id': self.last_frame_id,
+            'frame_id_span': span,
+            'frames_received': self.received,
+            'missing_frames': len(self.dropped_ids) - len(self.incomplete_ids),
+            'missing_ranges': _ranges(sorted(set(self.dropped_ids) - set(self.incomplete_ids))),
+            'incomplete_frames': len(self.incomplete_ids),
+            'incomplete_frame_ids': list(self.incomplete_ids),
+            'id_gaps': self.id_gaps,
+            'timestamp_gaps': self.timestamp_gaps,
+            'estimated_trigger_misses': sum(g['estimated_missing'] for g in self.timestamp_gaps),
+            'nominal_period_ms': self.period_ns / 1e6 if self.period_ns else None,
+            'max_interval_ms': self.max_interval_ns / 1e6,
+        }
+
+
+def build_drop_report(camera, tracker: DropTracker, stream_delta: dict, stats: dict) -> dict:
+    report = {
+        'camera': camera.name,
+        'serial': camera.serial_number,
+        'framerate': camera.framerate,
+        'pixel_format': camera.pixel_format_name,
+        'roi': camera.roi_info,
+        'expected_frames': stats.get('expected_frames'),
+        'timeouts': stats.get('timeouts', 0),
+        'writer_dropped': stats.get('dropped', 0),
+        'writer_blocked': stats.get('blocked', 0),
+        'max_queue_depth': stats.get('max_queue_depth', 0),
+        'stream_buffer_mode': camera.stream_buffer_mode,
+        'stream_buffer_count': camera.stream_buffer_count,
+        'stream': stream_delta,
+    }
+    report.update(tracker.report())
+    return report
+
+
+def write_drop_report(folder: str, report: dict) -> str:
+    path = os.path.join(folder, DROP_REPORT_FILENAME)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    return path
+
+
+def format_drop_report(report: dict) -> str:
+    """欠落レポートをログ出力用の1行に整形する"""
+    if not report:
+        return "(no report)"
+    stream = report.get('stream', {})
+    line = (f"missing={report.get('missing_frames', 0)}  incomplete={report.get('incomplete_frames', 0)}  "
+            f"trigger_gaps={len(report.get('timestamp_gaps', []))}  "
+            f"stream_lost={stream.get('StreamLostFrameCount', '-')}  "
+            f"underrun={stream.get('StreamBufferUnderrunCount', '-')}  "
+            f"max_interval={report.get('max_interval_ms', 0.0):.2f}ms")
+    ranges = report.get('missing_ranges', [])
+    if ranges:
+        head = ", ".join(f"{a}-{b}" if a != b else str(a) for a, b in ranges[:5])
+        line += f"  [{head}{', ...' if len(ranges) > 5 else ''}]"
+    return line
@@ -0,0 +1,136 @@
+import threading
+import zlib
+
+import numpy as np
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+# =========================================================
+# .fcr コンテナのフレーム圧縮（可逆）
+#
+# レコードヘッダの codec 欄に圧縮方式、filters 欄に前処理を記録する
+#   FILTER_SHUFFLE : 多バイト画素（uint16 など）をバイト位置ごとの面に並べ替えてから圧縮する
+#                    12bit 画像の上位バイトは 0–15 しか取らないので、まとめると大きく縮む
+# どのコーデックも圧縮中は GIL を解放するので、スレッドプールで複数コアを使える
+# =========================================================
+
+CODEC_RAW = 0
+CODEC_ZLIB = 1
+CODEC_LZ4 = 2
+CODEC_ZSTD = 3
+
+FILTER_NONE = 0
+FILTER_SHUFFLE = 1
+
+_local = threading.local()
+
+
+def _zstd_compressor(level: int):
+    # ZstdCompressor はスレッド間で共有できないので、スレッド・レベルごとに1つ持つ
+    cache = getattr(_local, 'zstd', None)
+    if cache is None:
+        cache = _local.zstd = {}
+    comp = cache.get(level)
+    if comp is None:
+        comp = cache[level] = zstandard.ZstdCompressor(level=level)
+    return comp
+
+
+def _zstd_decompress(data, raw_nbytes: int) -> bytes:
+    decomp = getattr(_local, 'zstd_d', None)
+    if decomp is None:
+        decomp = _local.zstd_d = zstandard.ZstdDecompressor()
+    return decomp.decompress(data, max_output_size=raw_nbytes)
+
+
+# name → (codec id, 既定レベル, レベル範囲, 利用可能か)
+CODECS = {
+    'zlib': (CODEC_ZLIB, 1, (0, 9), True),
+    'lz4': (CODEC_LZ4, 0, (0, 16), lz4_frame is not None),
+    'zstd': (CODEC_ZSTD, 3, (1, 22), zstandard is not None),
+}
+CODEC_NAMES = {codec_id: name for name, (codec_id, _, _, _) in CODECS.items()}
+CODEC_NAMES[CODEC_RAW] = 'raw'
+
+
+def available_codecs() -> list:
+    return [name for name, (_, _, _, ok) in CODECS.items() if ok]
+
+
+def default_codec() -> str:
+    """インストールされている中で最も速いもの（zstd → lz4 → zlib）"""
+    for name in ('zstd', 'lz4', 'zlib'):
+        if CODECS[name][3]:
+            return name
+    return 'zlib'
+
+
+def resolve_codec(name: str, level: int = None) -> tuple:
+    """コーデック名とレベルを検証して (name, codec_id, level) を返す（'auto' は default_codec()）"""
+    if name == 'auto':
+        name = default_codec()
+    if name not in CODECS:
+        raise ValueError(f"Unknown compression codec: {name} (choose from {', '.join(CODECS)})")
+    codec_id, default_level, (lo, hi), ok = CODECS[name]
+    if not ok:
+        raise ValueError(f"Compression codec '{name}' is not installed (available: {', '.join(available_codecs())})")
+    level = default_level if level is None else int(level)
+    if not lo <= level <= hi:
+        raise ValueError(f"{name} compression level must be {lo}–{hi}: {level}")
+    return name, codec_id, level
+
+
+def shuffle(img_np: np.ndarray) -> np.ndarray:
+    """画素のバイトをバイト位置ごとの面に並べ替えた uint8 配列（1バイト画素はそのまま）"""
+    flat = np.ascontiguousarray(img_np).reshape(-1)
+    if flat.itemsize == 1:
+        return flat.view(np.uint8)
+    return np.ascontiguousarray(flat.view(np.uint8).reshape(-1, flat.itemsize).T)
+
+
+def unshuffle(data: np.ndarray, itemsize: int) -> np.ndarray:
+    """shuffle の逆（uint8 配列を返す）"""
+    if itemsize == 1:
+        return data
+    return np.ascontiguousarray(data.reshape(itemsize, -1).T).reshape(-1)
+
+
+def compress_frame(img_np: np.ndarray, codec_id: int, level: int) -> tuple:
+    """1フレームを圧縮して (payload, filters) を返す"""
+    filters = FILTER_SHUFFLE if img_np.itemsize > 1 else FILTER_NONE
+    data = shuffle(img_np)
+    if codec_id == CODEC_ZSTD:
+        return _zstd_compressor(level).compress(data), filters
+    if codec_id == CODEC_LZ4:
+        return lz4_frame.compress(data, compression_level=level), filters
+    if codec_id == CODEC_ZLIB:
+        return zlib.compress(data, level), filters
+    raise ValueError(f"Unsupported codec {codec_id}")
+
+
+def decompress_frame(payload, codec_id: int, filters: int, raw_nbytes: int, itemsize: int) -> np.ndarray:
+    """compress_frame の逆（画素データの uint8 配列を返す）"""
+    if codec_id == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read this recording")
+        raw = _zstd_decompress(payload, raw_nbytes)
+    elif codec_id == CODEC_LZ4:
+        if lz4_frame is None:
+            raise RuntimeError("lz4 is required to read this recording")
+        raw = lz4_frame.decompress(payload)
+    elif codec_id == CODEC_ZLIB:
+        raw = zlib.decompress(payload, bufsize=raw_nbytes)
+    else:
+        raise ValueError(f"Unsupported codec {codec_id}")
+    data = np.frombuffer(raw, dtype=np.uint8)
+    if data.size != raw_nbytes:
+        raise ValueError(f"Decompressed size mismatch: {data.size} != {raw_nbytes}")
+    return unshuffle(data, itemsize) if filters & FILTER_SHUFFLE else data
@@ -0,0 +1,387 @@
+import glob
+import os
+import struct
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from camera_control.frame_codec import CODEC_RAW, FILTER_NONE, compress_frame, decompress_frame, resolve_codec
+
+# =========================================================
+# 録画コンテナ形式（.fcr）
+#
+#   [ファイルヘッダ 64B]
+#   [フレームレコード: レコードヘッダ 128B + 画素データ（64B境界にパディング）] x N
+#   [インデックス: (record_offset, frame_id, timestamp) x N]
+#   [トレーラ 32B: magic, index_offset, frame_count, reserved]
+#
+# 1ファイルが chunk_size_bytes を超えると次のチャンク（recording_00001.fcr …）へ切り替える
+# =========================================================
+
+CONTAINER_EXTENSION = 'fcr'
+
+FILE_MAGIC = b'FCRCHUNK'
+RECORD_MAGIC = b'FRM0'
+INDEX_MAGIC = b'FCRINDEX'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+
+# magic, version, record_header_size, chunk_index, created_unix_ns
+FILE_HEADER = struct.Struct('<8sHHIQ40x')
+# magic, frame_id, timestamp, offset_x, offset_y, width, height, channels, dtype, pixel_format,
+# codec(0 = 非圧縮, frame_codec.CODEC_*), filters(frame_codec.FILTER_*), payload_nbytes, raw_nbytes
+RECORD_HEADER = struct.Struct('<4sQQIIIIH2s16sHHQQ52x')
+# magic, index_offset, frame_count
+TRAILER = struct.Struct('<8sQQ8x')
+INDEX_DTYPE = np.dtype([('offset', '<u8'), ('frame_id', '<u8'), ('timestamp', '<u8')])
+
+
+def _align(n: int) -> int:
+    return (n + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def chunk_paths(folder: str, prefix: str = 'recording') -> list:
+    """フォルダ内の prefix_00000.fcr 形式のチャンク（録画）を番号順に返す"""
+    pattern = f"{glob.escape(prefix)}_{'[0-9]' * 5}.{CONTAINER_EXTENSION}"
+    return sorted(glob.glob(os.path.join(glob.escape(folder), pattern)))
+
+
+def _dtype_code(dtype) -> bytes:
+    dtype = np.dtype(dtype)
+    return f"{dtype.kind}{dtype.itemsize}".encode('ascii')
+
+
+class FrameContainerWriter:
+    """
+    フレームを大きなチャンクファイルへ追記する録画シンク
+    追記は順番通りに行う必要があるため、1スレッドから呼び出すこと
+    """
+
+    def __init__(self, folder: str, prefix: str = 'recording', roi: dict = None,
+                 pixel_format: str = '', chunk_size_bytes: int = 2**30, clear_stale: bool = True):
+        self.folder = folder
+        self.prefix = prefix
+        self.roi = roi or {}
+        self.pixel_format = pixel_format
+        self.chunk_size_bytes = chunk_size_bytes
+        self.chunk_index = -1
+        self.frame_count = 0
+        self.bytes_written = 0
+        self._file = None
+        self._index = []
+        os.makedirs(folder, exist_ok=True)
+        # 同じフォルダの前回の録画のチャンクを消す（残っていると新しい録画の後ろに読み込まれる）
+        if clear_stale:
+            for stale in chunk_paths(folder, prefix):
+                os.remove(stale)
+
+    # ---------------------------------------------------------
+    # チャンク管理
+    # ---------------------------------------------------------
+    def _chunk_path(self, index: int) -> str:
+        return os.path.join(self.folder, f"{self.prefix}_{index:05d}.{CONTAINER_EXTENSION}")
+
+    def _open_next_chunk(self):
+        self._close_chunk()
+        self.chunk_index += 1
+        self._file = open(self._chunk_path(self.chunk_index), 'wb')
+        self._file.write(FILE_HEADER.pack(FILE_MAGIC, FORMAT_VERSION, RECORD_HEADER.size,
+                                          self.chunk_index, time.time_ns()))
+        self._index = []
+
+    def _close_chunk(self):
+        if self._file is None:
+            return
+        index_offset = self._file.tell()
+        index = np.array(self._index, dtype=INDEX_DTYPE)
+        self._file.write(index.tobytes())
+        self._file.write(TRAILER.pack(INDEX_MAGIC, index_offset, len(self._index)))
+        self._file.close()
+        self._file = None
+
+    # ---------------------------------------------------------
+    # 追記
+    # ---------------------------------------------------------
+    def append(self, img_np: np.ndarray, info: dict = None, payload: bytes = None,
+               codec: int = CODEC_RAW, filters: int = FILTER_NONE):
+        """
+        1フレームを追記する
+        payload を渡した場合は画素データの代わりにそのバイト列を保存する（圧縮済みデータ用）
+        img_np は形状・dtype をヘッダに書くためにだけ使う
+        """
+        info = info or {}
+        img_np = np.ascontiguousarray(img_np)
+        data = memoryview(img_np).cast('B') if payload is None else payload
+        record_size = _align(RECORD_HEADER.size + len(data))
+
+        if self._file is None or (self._file.tell() + record_size > self.chunk_size_bytes and self._index):
+            self._open_next_chunk()
+
+        height, width = img_np.shape[:2]
+        channels = img_np.shape[2] if img_np.ndim == 3 else 1
+        offset = self._file.tell()
+        header = RECORD_HEADER.pack(
+            RECORD_MAGIC,
+            info.get('frame_id', self.frame_count),
+            info.get('timestamp', 0),
+            self.roi.get('x_min', 0),
+            self.roi.get('y_min', 0),
+            width,
+            height,
+            channels,
+            _dtype_code(img_np.dtype),
+            self.pixel_format.encode('ascii')[:16],
+            codec,
+            filters,
+            len(data),
+            img_np.nbytes,
+        )
+        self._file.write(header)
+        self._file.write(data)
+        padding = record_size - RECORD_HEADER.size - len(data)
+        if padding:
+            self._file.write(b'\0' * padding)
+
+        self._index.append((offset, info.get('frame_id', self.frame_count), info.get('timestamp', 0)))
+        self.frame_count += 1
+        self.bytes_written += record_size
+
+    def close(self):
+        self._close_chunk()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ContainerSink:
+    """FrameWriterPool 用のコンテナ書き込みシンク（順序維持のため1スレッドで使う）"""
+
+    parallel = False
+
+    def __init__(self, folder: str, roi: dict = None, pixel_format: str = '',
+                 chunk_size_bytes: int = 2**30):
+        self.writer = FrameContainerWriter(folder, roi=roi, pixel_format=pixel_format,
+                                           chunk_size_bytes=chunk_size_bytes)
+
+    def write(self, index: int, img_np, info: dict):
+        self.writer.append(img_np, info)
+
+    def close(self):
+        self.writer.close()
+
+
+class CompressedContainerSink:
+    """
+    FrameWriterPool 用の可逆圧縮コンテナシンク
+    write() は書き込みスレッド1本から呼ばれ、圧縮だけを workers 本のスレッドプールで並列に行い、
+    終わったものから取得順にコンテナへ追記する（未完了の圧縮が workers * 2 を超えると write() が待つ）
+    """
+
+    parallel = False
+
+    def __init__(self, folder: str, roi: dict = None, pixel_format: str = '', codec: str = 'auto',
+                 level: int = None, workers: int = 2, chunk_size_bytes: int = 2**30):
+        self.codec, self.codec_id, self.level = resolve_codec(codec, level)
+        self.writer = FrameContainerWriter(folder, roi=roi, pixel_format=pixel_format,
+                                           chunk_size_bytes=chunk_size_bytes)
+        self.workers = max(1, int(workers))
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='fcr-compress')
+        self._pending = deque()
+        self._lock = threading.Lock()
+        self._stats = {
+            'frames': 0,
+            'raw_bytes': 0,
+            'compressed_bytes': 0,
+            'compress_time_sec': 0.0,
+        }
+        self._started = None
+
+    def _compress(self, img_np: np.ndarray):
+        start = time.perf_counter()
+        payload, filters = compress_frame(img_np, self.codec_id, self.level)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._stats['compress_time_sec'] += elapsed
+        return payload, filters
+
+    def write(self, index: int, img_np, info: dict):
+        if self._started is None:
+            self._started = time.perf_counter()
+        self._pending.append((self._pool.submit(self._compress, img_np), img_np, info))
+        while len(self._pending) > self.workers * 2:
+            self._append_oldest()
+
+    def _append_oldest(self):
+        future, img_np, info = self._pending.popleft()
+        payload, filters = future.result()
+        self.writer.append(img_np, info, payload=payload, codec=self.codec_id, filters=filters)
+        self._stats['frames'] += 1
+        self._stats['raw_bytes'] += img_np.nbytes
+        self._stats['compressed_bytes'] += len(payload)
+
+    def close(self):
+        try:
+            while self._pending:
+                self._append_oldest()
+        finally:
+            self._pool.shutdown(wait=True)
+            self.writer.close()
+        if self._started is not None:
+            self._stats['elapsed_sec'] = time.perf_counter() - self._started
+
+    @property
+    def stats(self) -> dict:
+        """圧縮率・スループット（raw_bytes は非圧縮のバイト数）"""
+        stats = dict(self._stats)
+        stats['codec'] = self.codec
+        stats['level'] = self.level
+        stats['workers'] = self.workers
+        raw, packed = stats['raw_bytes'], stats['compressed_bytes']
+        stats['ratio'] = raw / packed if packed else 0.0
+        cpu = stats['compress_time_sec']
+        # 1スレッドあたりの圧縮速度と、セッション全体（workers 本合計）の処理速度
+        stats['compress_mb_per_sec'] = raw / 1e6 / cpu if cpu > 0 else 0.0
+        elapsed = stats.get('elapsed_sec', 0.0)
+        stats['throughput_mb_per_sec'] = raw / 1e6 / elapsed if elapsed > 0 else 0.0
+        return stats
+
+
+def format_compression_stats(stats: dict) -> str:
+    """圧縮シンクの統計をログ出力用の1行に整形する"""
+    if not stats:
+        return "(no stats)"
+    return (f"codec={stats['codec']} (level {stats['level']}, {stats['workers']} threads)  "
+            f"ratio={stats['ratio']:.2f}x  {stats['raw_bytes'] / 2**20:.1f} MiB -> {stats['compressed_bytes'] / 2**20:.1f} MiB  "
+            f"compress={stats['compress_mb_per_sec']:.0f} MB/s/thread  throughput={stats['throughput_mb_per_sec']:.0f} MB/s")
+
+
+def write_single_frame_container(filename: str, img_np: np.ndarray, info: dict = None,
+                                 roi: dict = None, pixel_format: str = ''):
+    """1フレームだけのコンテナファイルを書き出す（単発撮影用）"""
+    folder = os.path.dirname(filename) or '.'
+    prefix = os.path.splitext(os.path.basename(filename))[0]
+    writer = FrameContainerWriter(folder, prefix=prefix, roi=roi, pixel_format=pixel_format, clear_stale=False)
+    writer.append(img_np, info)
+    writer.close()
+    # 単発撮影では連番を付けず指定ファイル名にする
+    os.replace(writer._chunk_path(0), filename)
+    return filename
+
+
+class FrameContainerReader:
+    """
+    コンテナ（フォルダ内の全チャンク、または単一ファイル）をメモリマップで開き、
+    任意のフレームを O(1) でゼロコピー参照するリーダ
+    """
+
+    def __init__(self, path: str, prefix: str = 'recording'):
+        if os.path.isdir(path):
+            # フォルダなら prefix_00000.fcr 形式のチャンクだけを読む（単発撮影の frame_N.fcr は含めない）
+            self.paths = chunk_paths(path, prefix)
+        else:
+            self.paths = [path]
+        if not self.paths:
+            raise FileNotFoundError(f"No .{CONTAINER_EXTENSION} chunks found: {path}")
+
+        self._maps = []
+        chunk_ids = []
+        indices = []
+        for chunk_no, p in enumerate(self.paths):
+            mm = np.memmap(p, dtype=np.uint8, mode='r')
+            magic, version, header_size, _, _ = FILE_HEADER.unpack_from(mm, 0)
+            if magic != FILE_MAGIC:
+                raise ValueError(f"Not a frame container: {p}")
+            if version != FORMAT_VERSION or header_size != RECORD_HEADER.size:
+                raise ValueError(f"Unsupported container version {version}: {p}")
+            index = self._read_index(mm)
+            self._maps.append(mm)
+            indices.append(index)
+            chunk_ids.append(np.full(len(index), chunk_no, dtype=np.int32))
+
+        self.index = np.concatenate(indices) if indices else np.empty(0, INDEX_DTYPE)
+        self.chunk_ids = np.concatenate(chunk_ids) if chunk_ids else np.empty(0, np.int32)
+
+    @staticmethod
+    def _read_index(mm) -> np.ndarray:
+        if len(mm) >= FILE_HEADER.size + TRAILER.size:
+            magic, index_offset, count = TRAILER.unpack_from(mm, len(mm) - TRAILER.size)
+            if magic == INDEX_MAGIC:
+                return np.frombuffer(mm, dtype=INDEX_DTYPE, count=count, offset=index_offset)
+        # インデックスが無い（録画中断など）場合はレコードを先頭から走査して復元する
+        entries = []
+        offset = FILE_HEADER.size
+        while offset + RECORD_HEADER.size <= len(mm):
+            fields = RECORD_HEADER.unpack_from(mm, offset)
+            if fields[0] != RECORD_MAGIC or offset + RECORD_HEADER.size + fields[12] > len(mm):
+                break
+            entries.append((offset, fields[1], fields[2]))
+            offset += _align(RECORD_HEADER.size + fields[12])
+        return np.array(entries, dtype=INDEX_DTYPE)
+
+    def __len__(self):
+        return len(self.index)
+
+    @property
+    def frame_ids(self) -> np.ndarray:
+        return self.index['frame_id']
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self.index['timestamp']
+
+    def header(self, i: int) -> dict:
+        mm = self._maps[self.chunk_ids[i]]
+        fields = RECORD_HEADER.unpack_from(mm, int(self.index['offset'][i]))
+        (_, frame_id, timestamp, offset_x, offset_y, width, height, channels,
+         dtype, pixel_format, codec, filters, payload_nbytes, raw_nbytes) = fields
+        return {
+            'frame_id': frame_id,
+            'timestamp': timestamp,
+            'offset_x': offset_x,
+            'offset_y': offset_y,
+            'width': width,
+            'height': height,
+            'channels': channels,
+            'dtype': np.dtype('<' + dtype.decode('ascii')),
+            'pixel_format': pixel_format.rstrip(b'\0').decode('ascii'),
+            'codec': codec,
+            'filters': filters,
+            'payload_nbytes': payload_nbytes,
+            'raw_nbytes': raw_nbytes,
+        }
+
+    def payload(self, i: int) -> np.ndarray:
+        """i 番目のフレームの保存データ（uint8 のメモリマップビュー）"""
+        mm = self._maps[self.chunk_ids[i]]
+        start = int(self.index['offset'][i]) + RECORD_HEADER.size
+        nbytes = RECORD_HEADER.unpack_from(mm, start - RECORD_HEADER.size)[12]
+        return mm[start:start + nbytes]
+
+    def frame(self, i: int) -> np.ndarray:
+        """i 番目のフレームを返す（非圧縮ならメモリマップ上のゼロコピービュー、圧縮済みなら展開したコピー）"""
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        h = self.header(i)
+        shape = (h['height'], h['width']) if h['channels'] == 1 else (h['height'], h['width'], h['channels'])
+        data = self.payload(i)
+        if h['codec'] != CODEC_RAW:
+            data = decompress_frame(data, h['codec'], h['filters'], h['raw_nbytes'], h['dtype'].itemsize)
+        return data.view(h['dtype']).reshape(shape)
+
+    def __getitem__(self, i: int) -> np.ndarray:
+        return self.frame(i)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.frame(i)
+
+    def close(self):
+        self._maps = []
@@ -0,0 +1,134 @@
+import collections
+
+import numpy as np
+
+PAIRS_FILENAME = 'pairs.csv'
+
+
+class FramePairer:
+    """
+    2台のカメラ（0 = Cam1, 1 = Cam2）のフレームをタイムスタンプで対応付ける
+    Cam2 の時刻から offset_ns を引いて Cam1 の時刻系に合わせ、差が tolerance_ns 以内なら1組にする
+    - offset_ns=None : 両カメラの先頭 init_frames 枚から、最も多くのフレームが揃うオフセットを推定する
+                       （先頭フレームが欠けると周期単位でずれうるので、分かっているなら渡す）
+    - track=True     : 対応付いた組の差でオフセットを少しずつ補正する（デバイスクロックのドリフト対策）
+    相手のいないフレームは、相手側にそれより新しいフレームが届いた時点で「対応なし」として返す
+    """
+
+    def __init__(self, tolerance_ns: int, offset_ns: int = None, track: bool = True,
+                 track_alpha: float = 0.05, init_frames: int = 8, max_pending: int = 256):
+        self.tolerance_ns = int(tolerance_ns)
+        self.offset_ns = offset_ns
+        self.track = track
+        self.track_alpha = track_alpha
+        self.init_frames = init_frames
+        self.max_pending = max_pending
+        self.sequence = 0
+        self.unmatched = [0, 0]
+        self._pending = (collections.deque(), collections.deque())
+        self._skews = []
+
+    def push(self, cam: int, timestamp: int, item) -> list:
+        """
+        フレームを1枚渡し、確定した結果のリストを返す
+        各要素は (sequence, item1, item2, skew_ns)。対応なしのフレームは (None, item, None, None) / (None, None, item, None)
+        """
+        self._pending[cam].append((int(timestamp), item))
+        return self._match()
+
+    def flush(self) -> list:
+        """録画終了時：対応付けられるものを対応付け、残りはすべて対応なしとして返す"""
+        out = self._match(final=True)
+        for cam, queue in enumerate(self._pending):
+            while queue:
+                out.append(self._drop(cam))
+        return out
+
+    def _drop(self, cam: int):
+        _, item = self._pending[cam].popleft()
+        self.unmatched[cam] += 1
+        return (None, item, None, None) if cam == 0 else (None, None, item, None)
+
+    def _estimate_offset(self, final: bool) -> bool:
+        q1, q2 = self._pending
+        if not q1 or not q2:
+            return False
+        if not final and (len(q1) < self.init_frames or len(q2) < self.init_frames):
+            return False
+        t1 = np.array([t for t, _ in q1], dtype=np.int64)
+        t2 = np.array([t for t, _ in q2], dtype=np.int64)
+        # 先頭どうし・片側の先頭と相手の各フレームの差を候補にし、許容範囲内で揃う枚数が最大のものを選ぶ
+        # 一定間隔のフレームでは周期の整数倍ずれた候補も同点になるので、先頭どうしの差に近いものを優先する
+        head = int(t2[0] - t1[0])
+        candidates = np.unique(np.concatenate([t2 - t1[0], t2[0] - t1]))
+        best, best_key = head, None
+        for offset in candidates:
+            diff = (t2 - offset)[:, None] - t1[None, :]
+            score = int((np.abs(diff) <= self.tolerance_ns).any(axis=1).sum())
+            key = (score, -abs(int(offset) - head))
+            if best_key is None or key > best_key:
+                best, best_key = int(offset), key
+        self.offset_ns = best
+        return True
+
+    def _match(self, final: bool = False) -> list:
+        out = []
+        if self.offset_ns is not None or self._estimate_offset(final):
+            self._pair(out)
+        # 片方のカメラが止まった場合に溜め続けない（オフセット推定前も含む）
+        for cam, queue in enumerate(self._pending):
+            while len(queue) > self.max_pending:
+                out.append(self._drop(cam))
+        return out
+
+    def _pair(self, out: list):
+        q1, q2 = self._pending
+        while q1 and q2:
+            t1, a = q1[0]
+            t2, b = q2[0]
+            skew = t2 - self.offset_ns - t1
+            if abs(skew) <= self.tolerance_ns:
+                q1.popleft()
+                q2.popleft()
+                out.append((self.sequence, a, b, skew))
+                self.sequence += 1
+                self._skews.append(skew)
+                if self.track:
+                    self.offset_ns += int(self.track_alpha * skew)
+            elif skew < 0:
+                out.append(self._drop(1))
+            else:
+                out.append(self._drop(0))
+
+    def stats(self) -> dict:
+        """組数・対応なしの枚数と、組になったフレーム間のずれ（Cam2 − Cam1、マイクロ秒）"""
+        stats = {
+            'pairs': self.sequence,
+            'unmatched_cam1': self.unmatched[0],
+            'unmatched_cam2': self.unmatched[1],
+            'offset_ns': self.offset_ns,
+            'tolerance_us': self.tolerance_ns / 1e3,
+        }
+        if self._skews:
+            skew_us = np.asarray(self._skews, dtype=np.float64) / 1e3
+            stats['skew_us'] = {
+                'mean': float(skew_us.mean()),
+                'std': float(skew_us.std()),
+                'p50_abs': float(np.percentile(np.abs(skew_us), 50)),
+                'p99_abs': float(np.percentile(np.abs(skew_us), 99)),
+                'max_abs': float(np.abs(skew_us).max()),
+            }
+        return stats
+
+
+def format_pairing_stats(stats: dict) -> str:
+    """フレーム対応付けの統計をログ出力用の1行に整形する"""
+    if not stats:
+        return "(no stats)"
+    line = (f"pairs={stats['pairs']}  unmatched cam1={stats['unmatched_cam1']} cam2={stats['unmatched_cam2']}  "
+            f"tolerance={stats['tolerance_us']:.0f}us")
+    skew = stats.get('skew_us')
+    if skew:
+        line += (f"  skew mean={skew['mean']:.1f}us std={skew['std']:.1f}us "
+                 f"p99={skew['p99_abs']:.1f}us max={skew['max_abs']:.1f}us")
+    return line
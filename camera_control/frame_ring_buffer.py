@@ -0,0 +1,99 @@
+import numpy as np
+
+
+class FrameRingBuffer:
+    """
+    RAMバースト録画用の事前確保リングバッファ
+    フレームは (capacity, frame_nbytes) の連続 uint8 配列のスロットへコピーされ、
+    容量を超えた場合は最も古いフレームから上書きされる
+    """
+
+    def __init__(self, capacity: int, frame_nbytes: int, prefault: bool = True):
+        self.capacity = max(1, int(capacity))
+        self.frame_nbytes = int(frame_nbytes)
+        self.buffer = np.empty((self.capacity, self.frame_nbytes), dtype=np.uint8)
+        if prefault:
+            # 録画中のページフォルトを避けるため、先に全ページを触っておく
+            self.buffer.fill(0)
+        self.infos = [None] * self.capacity
+        self.shape = None
+        self.dtype = None
+        self.count = 0        # これまでに書き込んだ総フレーム数
+        self.overwritten = 0  # 容量超過で上書きされたフレーム数
+
+    @property
+    def nbytes(self) -> int:
+        return self.buffer.nbytes
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def slot(self, shape, dtype) -> np.ndarray:
+        """
+        次のスロットを shape / dtype の配列ビューとして返す（取得スレッドから呼ぶ）
+        ドライバのバッファから直接ここへ書き込み、commit() で確定する（commit するまでは何度呼んでも同じスロット）
+        """
+        shape, dtype = tuple(shape), np.dtype(dtype)
+        if self.shape is None:
+            nbytes = int(np.prod(shape)) * dtype.itemsize
+            if nbytes > self.frame_nbytes:
+                raise ValueError(f"Frame size {nbytes} exceeds slot size {self.frame_nbytes}")
+            self.shape = shape
+            self.dtype = dtype
+        elif shape != self.shape or dtype != self.dtype:
+            raise ValueError(f"Frame layout changed: {shape}/{dtype} != {self.shape}/{self.dtype}")
+        nbytes = int(np.prod(self.shape)) * self.dtype.itemsize
+        return self.buffer[self.count % self.capacity, :nbytes].view(self.dtype).reshape(self.shape)
+
+    def commit(self, info: dict = None):
+        """slot() に書き込んだフレームを確定する"""
+        slot = self.count % self.capacity
+        if self.count >= self.capacity:
+            self.overwritten += 1
+        self.infos[slot] = info
+        self.count += 1
+
+    def push(self, img_np: np.ndarray, info: dict = None):
+        """フレームを次のスロットへコピーする（取得スレッドから呼ぶ）"""
+        np.copyto(self.slot(img_np.shape, img_np.dtype), img_np)
+        self.commit(info)
+
+    def frame(self, index: int) -> np.ndarray:
+        """古い順で index 番目のフレームをゼロコピーのビューとして返す"""
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        start = self.count - len(self)
+        slot = (start + index) % self.capacity
+        nbytes = int(np.prod(self.shape)) * self.dtype.itemsize
+        return self.buffer[slot, :nbytes].view(self.dtype).reshape(self.shape)
+
+    def info(self, index: int) -> dict:
+        start = self.count - len(self)
+        return self.infos[(start + index) % self.capacity]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.frame(i), self.info(i)
+
+
+def estimate_burst_bytes(width: int, height: int, pixel_format: str, framerate: float,
+                         duration_sec: float, margin_frames: int = 8):
+    """ROI・PixelFormat・録画時間からリングバッファのサイズを見積もる → (capacity, frame_nbytes, total_bytes)"""
+    from util.pixel_format import frame_nbytes
+
+    nbytes = frame_nbytes(width, height, pixel_format)
+    capacity = int(np.ceil(duration_sec * framerate)) + margin_frames
+    return capacity, nbytes, capacity * nbytes
+
+
+def format_burst_stats(stats: dict) -> str:
+    """RAMバースト録画の統計をログ出力用の1行に整形する"""
+    if not stats or 'ram_buffer_bytes' not in stats:
+        return "(no stats)"
+    line = (f"buffer={stats['ram_buffer_bytes'] / 2**20:.1f} MiB  frames={stats.get('buffered_frames', 0)}  "
+            f"overwritten={stats.get('overwritten', 0)}  "
+            f"flush={stats.get('flush_fps', 0.0):.1f} fps / {stats.get('flush_mb_per_sec', 0.0):.1f} MB/s "
+            f"({stats.get('flush_time_sec', 0.0):.2f}s)")
+    if stats.get('peak_rss_bytes'):
+        line += f"  peak_rss={stats['peak_rss_bytes'] / 2**20:.1f} MiB"
+    return line
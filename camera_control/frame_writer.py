@@ -0,0 +1,176 @@
+import csv
+import os
+import queue
+import threading
+import time
+
+import cv2
+
+
+def write_image_file(filename: str, img_np):
+    """cv2.imwrite のラッパー（失敗時は例外にする）"""
+    if not cv2.imwrite(filename, img_np):
+        raise IOError(f"cv2.imwrite failed: {filename}")
+
+
+FRAME_INDEX_FILENAME = 'frames.csv'
+
+
+class ImageFileSink:
+    """
+    FrameWriterPool 用の画像ファイル書き込みシンク（frame_{n}.{ext} を並列に保存）
+    終了時にフレーム番号・フレームID・タイムスタンプの一覧を frames.csv に書き出す
+    """
+
+    parallel = True
+
+    def __init__(self, folder: str, image_format: str):
+        self.folder = folder
+        self.image_format = image_format
+        self._entries = []
+
+    def write(self, index: int, img_np, info: dict):
+        filename = f"frame_{index}.{self.image_format}"
+        write_image_file(os.path.join(self.folder, filename), img_np)
+        info = info or {}
+        self._entries.append((index, info.get('frame_id', index), info.get('timestamp', 0), filename))
+
+    def close(self):
+        if not self._entries:
+            return
+        self._entries.sort()
+        with open(os.path.join(self.folder, FRAME_INDEX_FILENAME), 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['index', 'frame_id', 'timestamp', 'filename'])
+            writer.writerows(self._entries)
+
+
+class FrameWriterPool:
+    """
+    取得スレッドから受け取ったフレームを別スレッド群でエンコード・保存する書き込みプール
+    キューは上限付きで、満杯時は取得側をブロック（またはドロップ）し、その状況を統計として公開する
+    """
+
+    _STOP = object()
+
+    def __init__(self, write_func, num_workers: int = 2, max_queue: int = 64,
+                 drop_when_full: bool = False, name: str = "Writer"):
+        self.write_func = write_func
+        self.num_workers = max(1, int(num_workers))
+        self.max_queue = max(1, int(max_queue))
+        self.drop_when_full = drop_when_full
+        self.name = name
+        self._queue = queue.Queue(maxsize=self.max_queue)
+        self._threads = []
+        self._lock = threading.Lock()
+        self._stats = {
+            'submitted': 0,
+            'written': 0,
+            'failed': 0,
+            'dropped': 0,
+            'blocked': 0,
+            'blocked_time_sec': 0.0,
+            'write_time_sec': 0.0,
+            'max_queue_depth': 0,
+        }
+        self.last_error = None
+
+    # ---------------------------------------------------------
+    # 開始／終了
+    # ---------------------------------------------------------
+    def start(self):
+        for i in range(self.num_workers):
+            t = threading.Thread(target=self._worker_loop, name=f"{self.name}-writer-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def close(self):
+        """キューに残ったフレームをすべて書き出してからスレッドを終了する"""
+        for _ in self._threads:
+            self._queue.put(self._STOP)
+        for t in self._threads:
+            t.join()
+        self._threads = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # ---------------------------------------------------------
+    # 投入（取得スレッド側）
+    # ---------------------------------------------------------
+    def submit(self, *args) -> bool:
+        """
+        書き込みジョブを投入する（args は write_func にそのまま渡す）
+        キューが満杯の場合、drop_when_full=True なら破棄して False を返す
+        """
+        try:
+            self._queue.put_nowait(args)
+        except queue.Full:
+            if self.drop_when_full:
+                with self._lock:
+                    self._stats['dropped'] += 1
+                return False
+            start = time.perf_counter()
+            self._queue.put(args)
+            with self._lock:
+                self._stats['blocked'] += 1
+                self._stats['blocked_time_sec'] += time.perf_counter() - start
+
+        depth = self._queue.qsize()
+        with self._lock:
+            self._stats['submitted'] += 1
+            if depth > self._stats['max_queue_depth']:
+                self._stats['max_queue_depth'] = depth
+        return True
+
+    # ---------------------------------------------------------
+    # 書き込みスレッド
+    # ---------------------------------------------------------
+    def _worker_loop(self):
+        while True:
+            job = self._queue.get()
+            if job is self._STOP:
+                break
+            start = time.perf_counter()
+            try:
+                self.write_func(*job)
+                ok = True
+            except Exception as e:
+                self.last_error = e
+                print(f"[{self.name}] Write error: {e}")
+                ok = False
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._stats['written' if ok else 'failed'] += 1
+                self._stats['write_time_sec'] += elapsed
+
+    # ---------------------------------------------------------
+    # 統計
+    # ---------------------------------------------------------
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    @property
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats['queue_depth'] = self._queue.qsize()
+        stats['max_queue'] = self.max_queue
+        stats['num_workers'] = self.num_workers
+        return stats
+
+
+def format_writer_stats(stats: dict) -> str:
+    """書き込みプール統計をログ出力用の1行に整形する"""
+    if not stats:
+        return "(no stats)"
+    return (f"written={stats.get('written', 0)}/{stats.get('submitted', 0)}  "
+            f"failed={stats.get('failed', 0)}  dropped={stats.get('dropped', 0)}  "
+            f"blocked={stats.get('blocked', 0)} ({stats.get('blocked_time_sec', 0.0):.3f}s)  "
+            f"max_queue={stats.get('max_queue_depth', 0)}/{stats.get('max_queue', 0)}  "
+            f"workers={stats.get('num_workers', 0)}")
@@ -0,0 +1,56 @@
+import os
+
+from util.spin_backend import PySpin
+
+# =========================================================
+# Spinnaker の画像イベント（ImageEventHandler）による取得
+#
+# RegisterEventHandler したハンドラの OnImageEvent がドライバのイベントスレッドから
+# フレームごとに呼ばれる。GetNextImage のタイムアウト待ち・sleep によるポーリングが不要になり、
+# フレーム到着から処理までの遅れと空振りの起床がなくなる
+# image はコールバックから戻るとドライバに返されるので、コールバック内でコピー・変換する
+#
+# FLIR_IMAGE_EVENTS=1 で LiveView・録画（pacing='event'）の既定をイベント駆動にする
+# =========================================================
+
+IMAGE_EVENTS_DEFAULT = os.environ.get('FLIR_IMAGE_EVENTS', '0').lower() in ('1', 'true', 'yes')
+DEFAULT_PACING = 'event' if IMAGE_EVENTS_DEFAULT else 'hardware'
+
+
+class FrameEventHandler(PySpin.ImageEventHandler):
+    """
+    OnImageEvent で convert(image) を呼んでコピー・変換し、on_frame(data, info) に渡す
+    不完全画像は on_frame(None, info)。info は grab_frame と同じ形式（clock_mapping があれば host_timestamp 付き）
+    """
+
+    def __init__(self, convert, on_frame, clock_mapping=None, instrumentation=None):
+        super().__init__()
+        self.convert = convert
+        self.on_frame = on_frame
+        self.clock_mapping = clock_mapping
+        self.instrumentation = instrumentation
+        self.events = 0
+
+    def OnImageEvent(self, image):
+        self.events += 1
+        inst = self.instrumentation
+        t0 = inst.start() if inst else 0
+        try:
+            info = {
+                'frame_id': image.GetFrameID(),
+                'timestamp': image.GetTimeStamp(),
+            }
+            if self.clock_mapping is not None:
+                info['host_timestamp'] = self.clock_mapping.to_host(info['timestamp'])
+            if image.IsIncomplete():
+                if inst:
+                    inst.count('incomplete')
+                self.on_frame(None, info)
+                return
+            data = self.convert(image)
+            if inst:
+                inst.record('event_convert', t0)
+            self.on_frame(data, info)
+        except Exception as e:
+            # イベントスレッドで例外を投げるとドライバ側で握りつぶされるので、ここでログに出す
+            print(f"[FrameEventHandler] Error: {e}")
@@ -0,0 +1,153 @@
+import json
+import os
+import time
+
+# 既定の有効／無効（FLIR_INSTRUMENTATION=1 で起動時から有効）
+INSTRUMENTATION_DEFAULT = os.environ.get('FLIR_INSTRUMENTATION', '0').lower() in ('1', 'true', 'yes')
+
+# 対数-線形ヒストグラム（HDR Histogram 方式）：2のべき乗ごとに 2**_SUB_BITS 個のサブバケット
+_SUB_BITS = 4
+_SUB_COUNT = 1 << _SUB_BITS
+_SUB_MASK = _SUB_COUNT - 1
+_NUM_BUCKETS = 64 << _SUB_BITS
+
+
+def _bucket_index(ns: int) -> int:
+    if ns < _SUB_COUNT:
+        return max(ns, 0)
+    exp = ns.bit_length() - 1 - _SUB_BITS
+    return ((exp + 1) << _SUB_BITS) | ((ns >> exp) & _SUB_MASK)
+
+
+def _bucket_bounds(index: int):
+    """バケットが表す範囲 [lower, upper) [ns]"""
+    if index < _SUB_COUNT:
+        return index, index + 1
+    exp = (index >> _SUB_BITS) - 1
+    mantissa = _SUB_COUNT | (index & _SUB_MASK)
+    return mantissa << exp, (mantissa + 1) << exp
+
+
+class _Stage:
+    __slots__ = ('count', 'total_ns', 'max_ns', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.buckets = [0] * _NUM_BUCKETS
+
+    def percentile_ns(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        target = q / 100.0 * self.count
+        seen = 0
+        for index, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= target:
+                lower, upper = _bucket_bounds(index)
+                return min((lower + upper) / 2.0, self.max_ns)
+        return float(self.max_ns)
+
+
+class Instrumentation:
+    """
+    取得・保存・表示のホットパス用のステージ別計測
+    ステージごとに件数・合計・最大と対数ヒストグラム（p50/p90/p99 用）を持ち、カウンタも記録できる
+    ロックは取らない（複数スレッドから同時に記録すると稀に1件落ちる程度の近似値）
+    無効時は start() が 0 を返し record() は即座に戻るので、ほぼコストはかからない
+
+        t0 = inst.start()
+        image_result = camera.GetNextImage()
+        inst.record('grab_wait', t0)
+    """
+
+    def __init__(self, name: str = '', enabled: bool = None):
+        self.name = name
+        self.enabled = INSTRUMENTATION_DEFAULT if enabled is None else enabled
+        self._stages = {}
+        self._counters = {}
+        self._started = time.time()
+
+    # ---------------------------------------------------------
+    # 記録（ホットパス）
+    # ---------------------------------------------------------
+    def start(self) -> int:
+        return time.perf_counter_ns() if self.enabled else 0
+
+    def record(self, stage: str, start_ns: int) -> int:
+        """start() からの経過時間を stage に記録し、次のステージ用の現在時刻を返す"""
+        if not start_ns:
+            return 0
+        now = time.perf_counter_ns()
+        elapsed = now - start_ns
+        s = self._stages.get(stage)
+        if s is None:
+            s = self._stages.setdefault(stage, _Stage())
+        s.count += 1
+        s.total_ns += elapsed
+        if elapsed > s.max_ns:
+            s.max_ns = elapsed
+        s.buckets[_bucket_index(elapsed)] += 1
+        return now
+
+    def count(self, name: str, n: int = 1):
+        if self.enabled:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def wrap(self, stage: str, func):
+        """func の呼び出し時間を stage として記録する関数を返す（無効時は func そのもの）"""
+        if not self.enabled:
+            return func
+
+        def timed(*args, **kwargs):
+            t0 = time.perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record(stage, t0)
+        return timed
+
+    # ---------------------------------------------------------
+    # 参照・出力
+    # ---------------------------------------------------------
+    def reset(self):
+        self._stages = {}
+        self._counters = {}
+        self._started = time.time()
+
+    def snapshot(self) -> dict:
+        stages = {}
+        for stage, s in list(self._stages.items()):
+            if not s.count:
+                continue
+            stages[stage] = {
+                'count': s.count,
+                'mean_ms': s.total_ns / s.count / 1e6,
+                'p50_ms': s.percentile_ns(50) / 1e6,
+                'p90_ms': s.percentile_ns(90) / 1e6,
+                'p99_ms': s.percentile_ns(99) / 1e6,
+                'max_ms': s.max_ns / 1e6,
+            }
+        return {
+            'name': self.name,
+            'since': self._started,
+            'elapsed_sec': time.time() - self._started,
+            'stages': stages,
+            'counters': dict(self._counters),
+        }
+
+    def dump(self, path: str) -> str:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, indent=2)
+        return path
+
+
+def format_instrumentation(snapshot: dict) -> str:
+    """計測結果をログ出力用の1行（ステージ=p50/p99）に整形する"""
+    if not snapshot or not snapshot.get('stages'):
+        return "(no samples)"
+    parts = [f"{stage}={s['p50_ms']:.2f}/{s['p99_ms']:.2f}ms"
+             for stage, s in snapshot['stages'].items()]
+    parts += [f"{name}={n}" for name, n in snapshot.get('counters', {}).items()]
+    return "  ".join(parts)
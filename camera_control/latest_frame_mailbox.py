@@ -0,0 +1,54 @@
+import threading
+
+
+class LatestFrameMailbox:
+    """
+    取得スレッド → GUI の受け渡し口（1枠・最新フレーム優先）
+    - post() は未表示のフレームを上書きし、押し出したフレームを返す（呼び出し側がプールへ返却する）
+    - GUI への通知（シグナル送出）は、前回の通知分を GUI が take() し終えているときだけ行う
+    GUI が遅くてもキューに溜まるのは常に最新の1枚なので、表示の遅延は1フレーム分を超えない
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._frame = None
+        self._pending = False
+        self.posted = 0
+        self.taken = 0
+        self.superseded = 0
+
+    def post(self, frame):
+        """frame を置き、押し出した未表示フレーム（無ければ None）を返す"""
+        with self._lock:
+            displaced = self._frame
+            self._frame = frame
+            self.posted += 1
+            if displaced is not None:
+                self.superseded += 1
+            return displaced
+
+    def peek_unnotified(self):
+        """GUI にまだ通知していない未表示フレームがあれば、通知済みにしてそれを返す（無ければ None）"""
+        with self._lock:
+            if self._frame is None or self._pending:
+                return None
+            self._pending = True
+            return self._frame
+
+    def take(self):
+        """最新フレームを取り出す（無ければ None）"""
+        with self._lock:
+            frame = self._frame
+            self._frame = None
+            self._pending = False
+            if frame is not None:
+                self.taken += 1
+            return frame
+
+    def clear(self):
+        """残っているフレームを取り出して返す（停止時のプール返却用）"""
+        with self._lock:
+            frame = self._frame
+            self._frame = None
+            self._pending = False
+            return frame
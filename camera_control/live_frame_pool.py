@@ -0,0 +1,86 @@
+import threading
+
+import numpy as np
+
+from util.demosaic import demosaic_half, half_shape, is_bayer
+from util.pixel_format import pixel_format_info
+from util.pixel_unpack import image_to_ndarray, is_packed, scale_to_16bit
+
+
+class LiveFramePool:
+    """
+    LiveView 用の使い回しフレームバッファ（取得スレッド → GUI スレッドの受け渡し用）
+    - 取得側は acquire() で空きバッファを受け取り、ドライバのバッファからそこへ1回だけコピーする
+    - 表示側は描画に使い終わったら release() で返す（ImageGLWidget.setFrame が前フレームを返却する）
+    - 空きが無い＝表示が追いついていないので、取得側はそのフレームを捨てる（シグナルのキューを溜めない）
+    ROI・PixelFormat が変わったときはそのスロットだけ確保し直す
+    """
+
+    def __init__(self, slots: int = 3):
+        if slots < 1:
+            raise ValueError(f"LiveFramePool needs at least 1 slot: {slots}")
+        self._buffers = [None] * slots
+        self._busy = [False] * slots
+        self._lock = threading.Lock()
+        self.allocations = 0
+
+    def has_free(self) -> bool:
+        with self._lock:
+            return not all(self._busy)
+
+    def acquire(self, shape, dtype) -> np.ndarray:
+        """空きスロットのバッファを返す（無ければ None）"""
+        with self._lock:
+            for i, busy in enumerate(self._busy):
+                if busy:
+                    continue
+                buf = self._buffers[i]
+                if buf is None or buf.shape != tuple(shape) or buf.dtype != dtype:
+                    buf = np.empty(shape, dtype=dtype)
+                    self._buffers[i] = buf
+                    self.allocations += 1
+                self._busy[i] = True
+                return buf
+        return None
+
+    def release(self, buf: np.ndarray):
+        """表示側が使い終わったバッファを返す（このプールのもの以外は無視）"""
+        with self._lock:
+            for i, b in enumerate(self._buffers):
+                if b is buf:
+                    self._busy[i] = False
+                    return
+
+
+def copy_live_frame(image_result, pixel_format: str, pool: LiveFramePool = None):
+    """
+    ドライバのバッファから LiveView 用のフレームを作る（Release() 前に呼ぶこと）
+    - パック形式は GetData() をバッファへ直接 uint16 に展開し、その場で 16bit の全範囲に広げる
+      （10/12bit のままだと Grayscale16 / LUMINANCE16 でほぼ黒になる）
+    - Bayer は demosaic_half で縦横 1/2 の 8bit BGR にする（フル解像度の補間は書き出し時だけ）
+    pool を渡すとそのバッファへ書き込み、空きが無ければ None を返す
+    """
+    h, w = image_result.GetHeight(), image_result.GetWidth()
+    if is_bayer(pixel_format):
+        raw = image_to_ndarray(image_result, pixel_format)
+        shape, dtype = half_shape(h, w), np.uint8
+    elif is_packed(pixel_format):
+        shape, dtype = (h, w), np.uint16
+    else:
+        raw = image_result.GetNDArray()
+        shape, dtype = raw.shape, raw.dtype
+
+    if pool is None:
+        frame = np.empty(shape, dtype=dtype)
+    else:
+        frame = pool.acquire(shape, dtype)
+        if frame is None:
+            return None
+    if is_bayer(pixel_format):
+        demosaic_half(raw, pixel_format, out=frame, to_8bit=True)
+    elif is_packed(pixel_format):
+        image_to_ndarray(image_result, pixel_format, out=frame)
+        scale_to_16bit(frame, pixel_format_info(pixel_format)[2])
+    else:
+        np.copyto(frame, raw)
+    return frame
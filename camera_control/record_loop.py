@@ -0,0 +1,553 @@
+import csv
+import json
+import os
+import threading
+import time
+
+from camera_control.clock_sync import mapping_error_ns
+from camera_control.drop_report import (DROP_REPORT_FILENAME, DropTracker, build_drop_report,
+                                        read_stream_stats, stream_stats_delta, write_drop_report)
+from camera_control.frame_ring_buffer import FrameRingBuffer, estimate_burst_bytes
+from camera_control.frame_container import (CONTAINER_EXTENSION, CompressedContainerSink, ContainerSink,
+                                            format_compression_stats)
+from camera_control.frame_pairing import PAIRS_FILENAME, FramePairer, format_pairing_stats
+from camera_control.frame_writer import FrameWriterPool, ImageFileSink
+from camera_control.video_sink import VideoSink, format_video_stats, is_video_format
+from util.memory_info import peak_rss_bytes
+
+INSTRUMENTATION_FILENAME = 'instrumentation.json'
+COMPRESSION_REPORT_FILENAME = 'compression.json'
+SYNC_REPORT_FILENAME = 'sync_report.json'
+
+
+class StreamProgress:
+    """
+    1台分のハードウェアペース取得の統計と終了判定（record_hardware_paced・DualStreamAcquisition 共通）
+    終了判定はカメラのフレームID（欠番込み）かタイムスタンプの経過で行い、ホスト時刻は上限にだけ使う
+    """
+
+    def __init__(self, camera, duration_sec: float, timeout_ms: int = 1000, grace_sec: float = 2.0,
+                 tracker: DropTracker = None):
+        self.camera = camera
+        self.tracker = tracker or DropTracker(camera.framerate)
+        self.expected_frames = max(1, int(duration_sec * camera.framerate))
+        self.duration_ns = int(duration_sec * 1e9)
+        # トリガが来ない場合にハングしないためのホスト側の上限
+        self.host_deadline = time.perf_counter() + duration_sec + grace_sec + timeout_ms / 1000.0
+        self.done = False
+        self.stats = {
+            'pacing': 'hardware',
+            'expected_frames': self.expected_frames,
+            'frames_received': 0,
+            'incomplete': 0,
+            'timeouts': 0,
+            'camera_elapsed_sec': 0.0,
+            'measured_fps': 0.0,
+        }
+
+    def feed(self, img_np, info) -> bool:
+        """grab_frame の結果を1つ反映し、on_frame に渡すべき完全なフレームなら True"""
+        if info is None:
+            self.stats['timeouts'] += 1
+            return False
+        tracker = self.tracker
+        # フレームIDの欠番・タイムスタンプの空きは tracker が記録する
+        tracker.feed(info['frame_id'], info['timestamp'], incomplete=img_np is None)
+        if img_np is None:
+            self.stats['incomplete'] += 1
+        else:
+            self.stats['frames_received'] += 1
+
+        # 終了判定：フレームIDの進み（欠番込み）か、カメラ時刻の経過で判断
+        span = tracker.last_frame_id - tracker.first_frame_id + 1
+        if span >= self.expected_frames or tracker.last_timestamp - tracker.first_timestamp >= self.duration_ns:
+            self.done = True
+        return img_np is not None
+
+    def expired(self, now: float = None) -> bool:
+        return (time.perf_counter() if now is None else now) >= self.host_deadline
+
+    def summary(self) -> dict:
+        stats = dict(self.stats)
+        stats.update(self.tracker.summary())
+        tracker = self.tracker
+        if tracker.first_timestamp is not None:
+            stats['camera_elapsed_sec'] = (tracker.last_timestamp - tracker.first_timestamp) / 1e9
+            if stats['camera_elapsed_sec'] > 0:
+                stats['measured_fps'] = (stats['frames_received'] - 1) / stats['camera_elapsed_sec']
+        return stats
+
+
+def record_hardware_paced(camera, duration_sec: float, on_frame, timeout_ms: int = 1000,
+                          grace_sec: float = 2.0, tracker: DropTracker = None, out=None) -> dict:
+    """
+    カメラ側のフレームレート（またはLine3トリガ）に任せて録画するループ
+    ホスト側では sleep せず GetNextImage(timeout) でブロックするだけで、
+    終了判定はカメラのフレームID・タイムスタンプから行う
+
+    camera : PrimaryCamera / SecondaryCamera（grab_frame(timeout_ms) を持つもの）
+    on_frame(img_np, info) : 完全なフレームを受け取るたびに呼ばれる
+    tracker : フレームID・タイムスタンプの欠落検出（省略時は内部で作る）
+    out : grab_frame に渡すコピー先（out(shape, dtype)、RAMバースト用）
+    """
+    progress = StreamProgress(camera, duration_sec, timeout_ms, grace_sec, tracker)
+    while not progress.done and not progress.expired():
+        img_np, info = camera.grab_frame(timeout_ms=timeout_ms, out=out)
+        if progress.feed(img_np, info):
+            on_frame(img_np, info)
+    return progress.summary()
+
+
+class DualStreamAcquisition:
+    """
+    2台のカメラを1本のスレッドから取得する（同時録画用）
+    各カメラを待ち時間 0 で順に確認し、どちらにもフレームが無いときだけ短いタイムアウトで待つ
+    取得スレッドが1本なので、2本のスレッドが GIL を取り合うことがなく、組み合わせ・書き込みの
+    バックプレッシャー（on_frame がブロックすれば両カメラとも取得が止まりカメラ側のバッファで吸収）・
+    停止も1か所で扱える
+    """
+
+    def __init__(self, cameras, poll_timeout_ms: int = 2, max_drain: int = 4):
+        self.cameras = tuple(cameras)
+        self.poll_timeout_ms = poll_timeout_ms
+        self.max_drain = max_drain  # 1台から続けて取り出す最大枚数（片方だけが取得され続けないように）
+        self._stop_requested = False
+        self.stats = {'polls': 0, 'idle_waits': 0}
+
+    def stop(self):
+        """別スレッドからの停止要求（取得中のフレームを処理してから run が戻る）"""
+        self._stop_requested = True
+
+    def run(self, duration_sec: float, on_frame, trackers=None, timeout_ms: int = 1000,
+            grace_sec: float = 2.0) -> list:
+        """
+        全カメラが duration_sec 分を取得するまで回し、カメラごとの統計（record_hardware_paced と同じ形式）を返す
+        on_frame(k, img_np, info) : k 番目のカメラの完全なフレームを受け取るたびに呼ばれる
+        """
+        trackers = trackers or [None] * len(self.cameras)
+        progress = [StreamProgress(cam, duration_sec, timeout_ms, grace_sec, tracker)
+                    for cam, tracker in zip(self.cameras, trackers)]
+        idle_turn = 0
+        while not self._stop_requested:
+            now = time.perf_counter()
+            active = [k for k, p in enumerate(progress) if not p.done and not p.expired(now)]
+            if not active:
+                break
+            got = False
+            for k in active:
+                for _ in range(self.max_drain):
+                    img_np, info = self.cameras[k].grab_frame(timeout_ms=0)
+                    self.stats['polls'] += 1
+                    if info is None:
+                        break
+                    got = True
+                    if progress[k].feed(img_np, info):
+                        on_frame(k, img_np, info)
+                    if progress[k].done:
+                        break
+            if got:
+                continue
+            # どちらにもフレームが無い：1台ずつ交代で短く待つ（タイムアウトは統計に数えない）
+            k = active[idle_turn % len(active)]
+            idle_turn += 1
+            self.stats['idle_waits'] += 1
+            img_np, info = self.cameras[k].grab_frame(timeout_ms=self.poll_timeout_ms)
+            if info is not None and progress[k].feed(img_np, info):
+                on_frame(k, img_np, info)
+        return [p.summary() for p in progress]
+
+
+def record_event_driven(camera, duration_sec: float, on_frame, timeout_ms: int = 1000,
+                        grace_sec: float = 2.0, tracker: DropTracker = None, out=None) -> dict:
+    """
+    ImageEventHandler のコールバックでフレームを受け取る録画（ポーリング・タイムアウト待ちなし）
+    on_frame はドライバのイベントスレッドから呼ばれ、呼び出し元のスレッドは終了を待つだけ
+    終了判定は record_hardware_paced と同じくカメラのフレームID・タイムスタンプで行う
+    """
+    progress = StreamProgress(camera, duration_sec, timeout_ms, grace_sec, tracker)
+    finished = threading.Event()
+
+    def on_event(img_np, info):
+        if finished.is_set():
+            return
+        if progress.feed(img_np, info):
+            on_frame(img_np, info)
+        if progress.done:
+            finished.set()
+
+    camera.register_image_events(on_event, out=out)
+    try:
+        finished.wait(max(0.0, progress.host_deadline - time.perf_counter()))
+    finally:
+        # 実行中のコールバックが終わってから統計をまとめる
+        camera.unregister_image_events()
+    stats = progress.summary()
+    stats['pacing'] = 'event'
+    return stats
+
+
+def record_host_paced(camera, duration_sec: float, on_frame, tracker: DropTracker = None, out=None) -> dict:
+    """
+    従来方式：ホスト側で理論時刻まで sleep しながら決まった回数だけ取得する
+    """
+    tracker = tracker or DropTracker(camera.framerate)
+    total_frames = int(duration_sec * camera.framerate)
+    interval = 1.0 / camera.framerate
+
+    stats = {
+        'pacing': 'host',
+        'expected_frames': total_frames,
+        'frames_received': 0,
+        'incomplete': 0,
+        'timeouts': 0,
+    }
+
+    start_time = time.perf_counter()  # 高精度タイマー使用
+    for i in range(total_frames):
+        img_np, info = camera.grab_frame(out=out)
+        if info is not None:
+            tracker.feed(info['frame_id'], info['timestamp'], incomplete=img_np is None)
+        if img_np is not None:
+            on_frame(img_np, info)
+            stats['frames_received'] += 1
+        elif info is not None:
+            stats['incomplete'] += 1
+        else:
+            stats['timeouts'] += 1
+
+        # 次に撮影すべき理論上の時間
+        next_time = start_time + (i + 1) * interval
+        sleep_time = next_time - time.perf_counter()
+        if sleep_time > 0:
+            time.sleep(sleep_time)
+    stats.update(tracker.summary())
+    return stats
+
+
+def run_recording(camera, duration_sec: float, pacing: str = 'hardware', mode: str = 'stream') -> dict:
+    """
+    PrimaryCamera / SecondaryCamera 共通の録画処理
+    mode='stream'    : 取得したフレームを書き込みプールへ流しながら保存する
+    mode='ram_burst' : 事前確保したリングバッファにだけコピーし、EndAcquisition 後にまとめて保存する
+    """
+    if mode == 'ram_burst':
+        return _run_ram_burst(camera, duration_sec, pacing)
+
+    tag = camera.__class__.__name__
+    inst = camera.instrumentation
+    inst.reset()
+
+    # 取得スレッドは GetNextImage だけを行い、エンコード・保存は書き込みプールに任せる
+    sink = create_sink(camera)
+    writer = _create_writer(camera, sink)
+
+    def on_frame(img_np, info):
+        t0 = inst.start()
+        writer.submit(camera.frame_counter, img_np, info)
+        inst.record('submit', t0)
+        camera.frame_counter += 1
+
+    loop_stats = {}
+    tracker = DropTracker(camera.framerate)
+    _begin_acquisition(camera)
+    stream_before = read_stream_stats(camera.camera)
+    stream_after = {}
+    try:
+        loop_stats = _run_loop(camera, duration_sec, pacing, on_frame, tracker)
+    except Exception as e:
+        print(f"[{tag}] Recording error: {e}")
+    finally:
+        stream_after = read_stream_stats(camera.camera)
+        camera.stop()
+        writer.close()  # キューに残ったフレームを書き切る
+        sink.close()
+        stats = {**loop_stats, **writer.stats}
+        _attach_sink_stats(camera, sink, stats)
+        _attach_drop_report(camera, tracker, stream_stats_delta(stream_before, stream_after), stats)
+        _attach_instrumentation(camera, stats)
+        print(f"[{tag}] Recording finished. {stats['written']} frames saved.")
+    return stats
+
+
+def _run_ram_burst(camera, duration_sec: float, pacing: str) -> dict:
+    tag = camera.__class__.__name__
+    camera.instrumentation.reset()
+    roi = camera.roi_info
+    capacity, nbytes, total_bytes = estimate_burst_bytes(
+        roi['x_max'] - roi['x_min'], roi['y_max'] - roi['y_min'],
+        camera.pixel_format_name, camera.framerate, duration_sec)
+
+    if total_bytes > camera.ram_budget_bytes:
+        raise ValueError(f"RAM burst buffer {total_bytes / 2**20:.1f} MiB exceeds budget "
+                         f"{camera.ram_budget_bytes / 2**20:.1f} MiB")
+
+    ring = FrameRingBuffer(capacity, nbytes)
+    print(f"[{tag}] RAM burst buffer: {capacity} frames x {nbytes} bytes = {ring.nbytes / 2**20:.1f} MiB")
+
+    loop_stats = {}
+    tracker = DropTracker(camera.framerate)
+    _begin_acquisition(camera)
+    stream_before = read_stream_stats(camera.camera)
+    stream_after = {}
+    try:
+        # ドライバのバッファからリングのスロットへ直接コピーし（録画中の確保・二重コピーなし）、届いたら確定する
+        loop_stats = _run_loop(camera, duration_sec, pacing, lambda img_np, info: ring.commit(info), tracker,
+                               out=ring.slot)
+    except Exception as e:
+        print(f"[{tag}] Recording error: {e}")
+    finally:
+        stream_after = read_stream_stats(camera.camera)
+        camera.stop()
+
+    # EndAcquisition 後にまとめてディスクへ書き出す
+    sink = create_sink(camera)
+    writer = _create_writer(camera, sink)
+    flush_start = time.perf_counter()
+    flushed_bytes = 0
+    for img_np, info in ring:
+        writer.submit(camera.frame_counter, img_np, info)
+        camera.frame_counter += 1
+        flushed_bytes += img_np.nbytes
+    writer.close()
+    sink.close()
+    flush_time = time.perf_counter() - flush_start
+
+    stats = {**loop_stats, **writer.stats}
+    _attach_sink_stats(camera, sink, stats)
+    stats.update({
+        'ram_buffer_bytes': ring.nbytes,
+        'buffered_frames': len(ring),
+        'overwritten': ring.overwritten,
+        'peak_rss_bytes': peak_rss_bytes(),
+        'flush_time_sec': flush_time,
+        'flush_fps': len(ring) / flush_time if flush_time > 0 else 0.0,
+        'flush_mb_per_sec': flushed_bytes / 1e6 / flush_time if flush_time > 0 else 0.0,
+    })
+    _attach_drop_report(camera, tracker, stream_stats_delta(stream_before, stream_after), stats)
+    _attach_instrumentation(camera, stats)
+    print(f"[{tag}] RAM burst flushed: {stats['written']} frames in {flush_time:.2f}s")
+    return stats
+
+
+def run_synchronized_recording(cam1, cam2, duration_sec: float, tolerance_ms: float = None,
+                               offset_ns: int = None, acquisition: 'DualStreamAcquisition' = None) -> dict:
+    """
+    2台同時録画：Cam1 / Cam2 を1本の取得ループ（DualStreamAcquisition）で受け取り、
+    タイムスタンプで組にしてから保存する
+    組になったフレームは両カメラとも同じ連番で保存し、対応表を Cam1 のフォルダの pairs.csv に書く
+    相手のいないフレームもそのカメラにだけ自分の連番で保存し、pairs.csv の相手側の列を空にする
+    （frame_id は sync_report.json にも残す）
+    tolerance_ms : 組にするずれの上限（省略時は Cam1 のフレーム間隔の 1/4）
+    offset_ns    : Cam2 − Cam1 のデバイス時刻の差（省略時は先頭フレームから推定）
+    両カメラに clock_mapping（CameraController.calibrate_clocks）があれば、ホスト時刻に写したタイムスタンプで
+    オフセット 0 のまま組にする（推定・追従は行わない）
+    acquisition : 途中で止めたい場合に呼び出し側で作って渡す（stop() で停止）
+    """
+    cameras = (cam1, cam2)
+    if tolerance_ms is None:
+        tolerance_ms = 250.0 / cam1.framerate
+    mapped = all(cam.clock_mapping is not None for cam in cameras)
+    if mapped:
+        pairer = FramePairer(int(tolerance_ms * 1e6), offset_ns=0, track=False)
+    else:
+        pairer = FramePairer(int(tolerance_ms * 1e6), offset_ns=offset_ns)
+    time_key = 'host_timestamp' if mapped else 'timestamp'
+
+    acquisition = acquisition or DualStreamAcquisition(cameras)
+    trackers = [DropTracker(cam.framerate) for cam in cameras]
+    loop_stats = [{}, {}]
+
+    sinks, writers = [], []
+    pairs_file = None
+    unmatched_ids = ([], [])
+    rows = 0
+    stream_before, stream_after = [{}, {}], [{}, {}]
+
+    def handle(results):
+        # 組・相手のいないフレームとも1行ずつ連番を振る（相手のいないフレームもそのカメラには保存する）
+        nonlocal rows
+        for seq, a, b, skew in results:
+            index = base_index + rows
+            rows += 1
+            for writer, frame in zip(writers, (a, b)):
+                if frame is not None:
+                    writer.submit(index, *frame)
+            if seq is None:
+                k, (_, info) = (0, a) if a is not None else (1, b)
+                unmatched_ids[k].append(info['frame_id'])
+            row = [index]
+            for frame in (a, b):
+                row += [frame[1]['frame_id'], frame[1]['timestamp']] if frame is not None else ['', '']
+            row.append(skew if skew is not None else '')
+            row += [frame[1].get('host_timestamp', '') if frame is not None else '' for frame in (a, b)]
+            pairs_csv.writerow(row)
+
+    try:
+        for cam in cameras:
+            cam.instrumentation.reset()
+            sinks.append(create_sink(cam))
+            writers.append(_create_writer(cam, sinks[-1]))
+        # 両カメラのファイル番号を揃える
+        base_index = max(cam.frame_counter for cam in cameras)
+
+        pairs_file = open(os.path.join(cam1.folder, PAIRS_FILENAME), 'w', newline='')
+        pairs_csv = csv.writer(pairs_file)
+        pairs_csv.writerow(['index', 'cam1_frame_id', 'cam1_timestamp', 'cam2_frame_id', 'cam2_timestamp', 'skew_ns',
+                            'cam1_host_timestamp', 'cam2_host_timestamp'])
+
+        # Cam2 は Cam1 の Line3 トリガ待ちなので先に開始する（Cam1 は開始と同時に撮り始める）
+        for cam in (cam2, cam1):
+            _begin_acquisition(cam)
+        for k, cam in enumerate(cameras):
+            stream_before[k] = read_stream_stats(cam.camera)
+
+        try:
+            # 組にしたフレームはその場で書き込みプールへ渡す（プールが満杯なら両カメラとも取得を待つ）
+            loop_stats = acquisition.run(duration_sec,
+                                         lambda k, img_np, info: handle(pairer.push(k, info[time_key], (img_np, info))),
+                                         trackers=trackers)
+        except Exception as e:
+            print(f"[Sync] Recording error: {e}")
+        handle(pairer.flush())
+        for k in (0, 1):
+            stream_after[k] = read_stream_stats(cameras[k].camera)
+    finally:
+        # Cam1 を先に止め、Cam2 へのトリガを止めてから Cam2 を止める
+        for cam in cameras:
+            cam.stop()
+        if pairs_file is not None:
+            pairs_file.close()
+        for writer in writers:
+            writer.close()  # キューに残ったフレームを書き切る
+        for sink in sinks:
+            sink.close()
+
+    sync = pairer.stats()
+    sync['unmatched_frame_ids'] = {'cam1': unmatched_ids[0], 'cam2': unmatched_ids[1]}
+    sync['timebase'] = 'host' if mapped else 'cam1_device'
+    sync['acquisition'] = dict(acquisition.stats)
+    if mapped:
+        # 録画後にもう一度ラッチし、録画中のドリフトで対応がどれだけずれたかを残す
+        sync['clock'] = {}
+        for k, cam in enumerate(cameras):
+            clock = cam.clock_mapping.to_dict()
+            try:
+                clock['error_after_us'] = mapping_error_ns(cam.camera, cam.clock_mapping) / 1e3
+            except Exception as e:
+                print(f"[{cam.__class__.__name__}] Clock check failed: {e}")
+            sync['clock'][f"cam{k + 1}"] = clock
+    result = {'sync': sync}
+    for k, cam in enumerate(cameras):
+        cam.frame_counter = base_index + rows
+        stats = {**loop_stats[k], **writers[k].stats}
+        _attach_sink_stats(cam, sinks[k], stats)
+        _attach_drop_report(cam, trackers[k], stream_stats_delta(stream_before[k], stream_after[k]), stats)
+        _attach_instrumentation(cam, stats)
+        result[f"cam{k + 1}"] = stats
+
+    try:
+        with open(os.path.join(cam1.folder, SYNC_REPORT_FILENAME), 'w', encoding='utf-8') as f:
+            json.dump(sync, f, indent=2)
+    except OSError as e:
+        print(f"[{cam1.__class__.__name__}] Sync report write failed: {e}")
+    print(f"[Sync] Recording finished. {format_pairing_stats(sync)}")
+    return result
+
+
+def create_sink(camera):
+    """camera.image_format に応じた書き込みシンクを作る"""
+    if camera.image_format == CONTAINER_EXTENSION:
+        if camera.compression:
+            # 圧縮は書き込みスレッドとは別に writer_threads 本で並列に行う
+            return CompressedContainerSink(camera.folder, roi=camera.roi_info, pixel_format=camera.pixel_format_name,
+                                           codec=camera.compression, level=camera.compression_level,
+                                           workers=camera.writer_threads)
+        return ContainerSink(camera.folder, roi=camera.roi_info, pixel_format=camera.pixel_format_name)
+    if is_video_format(camera.image_format):
+        # 1本の動画ファイルへ書き込みスレッド1本でエンコードする（タイムスタンプは CSV に残す）
+        return VideoSink(camera.folder, camera.image_format, camera.framerate, pixel_format=camera.pixel_format_name)
+    return ImageFileSink(camera.folder, camera.image_format)
+
+
+def _create_writer(camera, sink) -> FrameWriterPool:
+    # 順序が必要なシンク（コンテナ等）は書き込みスレッドを1本に固定する
+    return FrameWriterPool(
+        camera.instrumentation.wrap('write', sink.write),
+        num_workers=camera.writer_threads if sink.parallel else 1,
+        max_queue=camera.writer_queue_size,
+        name=camera.name,
+    ).start()
+
+
+def _attach_drop_report(camera, tracker: DropTracker, stream_delta: dict, stats: dict):
+    # 欠落レポートを統計に含め、録画フォルダに drop_report.json として保存する
+    report = build_drop_report(camera, tracker, stream_delta, stats)
+    stats['drop_report'] = report
+    stats['stream_stats'] = stream_delta
+    try:
+        write_drop_report(camera.folder, report)
+    except OSError as e:
+        print(f"[{camera.__class__.__name__}] Drop report write failed: {e}")
+    if report['missing_frames'] or report['incomplete_frames'] or report['timestamp_gaps']:
+        print(f"[{camera.__class__.__name__}] Frames missing: {report['missing_frames']}, "
+              f"incomplete: {report['incomplete_frames']}, trigger gaps: {len(report['timestamp_gaps'])} "
+              f"(see {DROP_REPORT_FILENAME})")
+
+
+def _attach_sink_stats(camera, sink, stats: dict):
+    # 動画シンクはファイルサイズ、圧縮シンクは圧縮率・スループットを統計に含める（後者は compression.json にも保存）
+    if isinstance(sink, VideoSink):
+        stats['video'] = sink.stats
+        print(f"[{camera.__class__.__name__}] Video: {format_video_stats(stats['video'])}")
+        return
+    if not isinstance(sink, CompressedContainerSink):
+        return
+    stats['compression'] = sink.stats
+    print(f"[{camera.__class__.__name__}] Compression: {format_compression_stats(stats['compression'])}")
+    try:
+        with open(os.path.join(camera.folder, COMPRESSION_REPORT_FILENAME), 'w', encoding='utf-8') as f:
+            json.dump(stats['compression'], f, indent=2)
+    except OSError as e:
+        print(f"[{camera.__class__.__name__}] Compression report write failed: {e}")
+
+
+def _attach_instrumentation(camera, stats: dict):
+    # 計測が有効なら統計に含め、録画フォルダにも書き出す
+    inst = camera.instrumentation
+    if not inst.enabled:
+        return
+    stats['instrumentation'] = inst.snapshot()
+    try:
+        inst.dump(os.path.join(camera.folder, INSTRUMENTATION_FILENAME))
+    except OSError as e:
+        print(f"[{camera.__class__.__name__}] Instrumentation dump failed: {e}")
+
+
+def _begin_acquisition(camera):
+    camera.camera.BeginAcquisition()
+    camera.trigger_event = True
+
+
+def _run_loop(camera, duration_sec: float, pacing: str, on_frame, tracker: DropTracker = None, out=None) -> dict:
+    if pacing == 'host':
+        return record_host_paced(camera, duration_sec, on_frame, tracker=tracker, out=out)
+    if pacing == 'event':
+        return record_event_driven(camera, duration_sec, on_frame, tracker=tracker, out=out)
+    return record_hardware_paced(camera, duration_sec, on_frame, tracker=tracker, out=out)
+
+
+def format_record_stats(stats: dict) -> str:
+    """取得ループ統計をログ出力用の1行に整形する"""
+    if not stats or 'pacing' not in stats:
+        return "(no stats)"
+    line = (f"pacing={stats['pacing']}  frames={stats.get('frames_received', 0)}/{stats.get('expected_frames', 0)}  "
+            f"incomplete={stats.get('incomplete', 0)}  timeouts={stats.get('timeouts', 0)}")
+    if 'dropped_frame_ids' in stats:
+        dropped = stats['dropped_frame_ids']
+        line += f"  dropped={len(dropped)}"
+        if dropped:
+            head = ", ".join(str(i) for i in dropped[:10])
+            line += f" [{head}{', ...' if len(dropped) > 10 else ''}]"
+    if stats.get('measured_fps'):
+        line += f"  fps={stats['measured_fps']:.2f}"
+    return line
@@ -1,9 +1,18 @@
 import os
-import PySpin
+from util.spin_backend import PySpin
 import numpy as np
 import time
 import cv2
 
+from camera_control.frame_container import CONTAINER_EXTENSION, write_single_frame_container
+from camera_control.image_events import FrameEventHandler
+from camera_control.instrumentation import Instrumentation
+from camera_control.live_frame_pool import copy_live_frame
+from camera_control.record_loop import run_recording
+from camera_control.stream_buffers import configure_stream_buffers, resolve_buffer_count
+from camera_control.video_sink import is_video_format
+from util.pixel_unpack import image_to_ndarray
+
 
 class SecondaryCamera:
     def __init__(self, system, serial_number: int = None, name="Camera"):
@@ -12,6 +21,7 @@ class SecondaryCamera:
         self.camera = self.cam_list.GetBySerial(str(serial_number))
         self.camera.Init()
         self.name = name
+        self.serial_number = str(serial_number)
         self.folder = None
         self.frame_counter = 0
         self._primed = False
@@ -22,6 +32,18 @@ class SecondaryCamera:
         self.white_balance_auto = "Off"
         self.wb_red = 1.0
         self.wb_blue = 1.0
+        self.writer_threads = 2
+        self.writer_queue_size = 64
+        self.last_record_stats = None
+        self.pixel_format_name = 'Mono8'
+        self.ram_budget_bytes = 4 * 2**30
+        self.compression = None
+        self.compression_level = None
+        self.clock_mapping = None  # デバイス時刻 → ホスト時刻（CameraController.calibrate_clocks で設定）
+        self._event_handler = None
+        self.instrumentation = Instrumentation(name)
+        self.stream_buffer_mode = None
+        self.stream_buffer_count = None
 
     def prime(
         self,
@@ -43,7 +65,15 @@ class SecondaryCamera:
         reverse_y: bool = False,
         white_balance_auto: str = "Off",             
         wb_red: float = 1.0,
-        wb_blue: float = 1.0
+        wb_blue: float = 1.0,
+        writer_threads: int = 2,
+        writer_queue_size: int = 64,
+        ram_budget_bytes: int = 4 * 2**30,
+        stream_buffer_mode: str = 'OldestFirst',
+        stream_buffer_count='auto',
+        writer_latency_ms: float = 100.0,
+        compression: str = None,
+        compression_level: int = None
     ):
 
         if self.camera.IsStreaming():
@@ -64,6 +94,13 @@ class SecondaryCamera:
         self.white_balance_auto = white_balance_auto
         self.wb_red = wb_red
         self.wb_blue = wb_blue
+        self.writer_threads = writer_threads
+        self.writer_queue_size = writer_queue_size
+        self.pixel_format_name = pixel_format_name
+        self.ram_budget_bytes = ram_budget_bytes
+        # image_format='fcr' のときの可逆圧縮（None なら非圧縮、'auto' / 'zstd' / 'lz4' / 'zlib'）
+        self.compression = compression
+        self.compression_level = compression_level
 
         nodemap = self.camera.GetNodeMap()
 
@@ -101,17 +138,13 @@ class SecondaryCamera:
         x_node = PySpin.CIntegerPtr(nodemap.GetNode("OffsetX"))
         y_node = PySpin.CIntegerPtr(nodemap.GetNode("OffsetY"))
 
-        original_offset_x = x_node.GetValue()  # 元の OffsetX を保存
-        original_offset_y = y_node.GetValue()  # 元の OffsetY を保存
-
         if PySpin.IsWritable(x_node): x_node.SetValue(0)  # 最大サイズ取得のため OffsetX = 0
         if PySpin.IsWritable(y_node): y_node.SetValue(0)  # 最大サイズ取得のため OffsetY = 0
 
         max_w = w_node.GetMax()  # 真の最大幅を取得
         max_h = h_node.GetMax()  # 真の最大高さを取得
 
-        if PySpin.IsWritable(x_node): x_node.SetValue(original_offset_x)  # 元の OffsetX に戻す
-        if PySpin.IsWritable(y_node): y_node.SetValue(original_offset_y)  # 元の OffsetY に戻す
+        # Offset は幅・高さを設定した後で設定する（先に戻すと前回より大きい ROI が設定できない）
 
         roi_w = width if width not in (None, 0) else max_w  # 実際に設定する幅
         roi_h = height if height not in (None, 0) else max_h  # 実際に設定する高さ
@@ -181,7 +214,8 @@ class SecondaryCamera:
             print(f"[{self.__class__.__name__}] White Balance 設定エラー: {e}")
         
         # Stream mode
-        self.camera.TLStream.StreamBufferHandlingMode.SetValue(PySpin.StreamBufferHandlingMode_OldestFirst)
+        self._apply_stream_buffers(stream_buffer_mode, stream_buffer_count, self.framerate,
+                                   roi_w, roi_h, pixel_format_name, writer_latency_ms)
         self.camera.TriggerMode.SetValue(PySpin.TriggerMode_Off)
 
         if trigger_mode == 'Off':
@@ -209,46 +243,101 @@ class SecondaryCamera:
             raise RuntimeError("Camera is not primed")
         self.camera.BeginAcquisition()
 
-    def record(self, duration_sec: float):
-        if not self._primed:
-            raise RuntimeError("Camera must be primed before recording")
+    def grab_frame(self, timeout_ms: int = None, out=None):
+        """
+        録画用：フレームを取得してNumPyコピーとメタ情報を返すだけ（保存は書き込みプール側で行う）
+        戻り値: (img_np, info)  不完全画像は (None, info)、タイムアウト・エラーは (None, None)
+        out(shape, dtype) を渡すと、コピーの代わりにその戻り値（RAMバーストのリングバッファのスロットなど）へ直接書き込む
+        """
+        inst = self.instrumentation
+        t0 = inst.start()
+        try:
+            if timeout_ms is None:
+                image_result = self.camera.GetNextImage()
+            else:
+                image_result = self.camera.GetNextImage(timeout_ms)
+        except PySpin.SpinnakerException:
+            inst.record('grab_timeout', t0)
+            return None, None
+        t0 = inst.record('grab_wait', t0)
 
-        total_frames = int(duration_sec * self.framerate)
-        interval = 1.0 / self.framerate
+        try:
+            info = {
+                'frame_id': image_result.GetFrameID(),
+                'timestamp': image_result.GetTimeStamp(),
+            }
+            if self.clock_mapping is not None:
+                # 2台共通のホスト時刻系でのタイムスタンプ
+                info['host_timestamp'] = self.clock_mapping.to_host(info['timestamp'])
+            # 不完全画像は個別にログ出力せず、録画後の欠落レポート（drop_report.json）に記録される
+            if image_result.IsIncomplete():
+                inst.count('incomplete')
+                return None, info
 
-        print(f"[SecondaryCamera] Start recording: {total_frames} frames at {self.framerate} FPS")
+            # Release 後もバッファを使うためコピーを取る（パック形式はここで uint16 に展開される）
+            img_np = image_to_ndarray(image_result, self.pixel_format_name, out=out, copy=True)
+            inst.record('get_ndarray', t0)
+            return img_np, info
+        except PySpin.SpinnakerException as e:
+            print(f"[SecondaryCamera] Grab error: {e}")
+            return None, None
+        finally:
+            image_result.Release()
 
-        self.camera.BeginAcquisition()
+    def register_image_events(self, on_frame, pool=None, out=None):
+        """
+        イベント駆動の取得：フレームが届くたびにドライバのイベントスレッドから on_frame(img_np, info) を呼ぶ
+        pool（LiveFramePool）を渡すと LiveView 用に変換し（capture_frame_for_live と同じ）、省略時は録画用にコピーする
+        out は grab_frame と同じ（録画用のコピー先）
+        """
+        if self._event_handler is not None:
+            raise RuntimeError("Image event handler is already registered")
+        pixel_format = self.pixel_format_name
+        if pool is None:
+            convert = lambda image: image_to_ndarray(image, pixel_format, out=out, copy=True)
+        else:
+            convert = lambda image: copy_live_frame(image, pixel_format, pool)
+        handler = FrameEventHandler(convert, on_frame, self.clock_mapping, self.instrumentation)
+        self.camera.RegisterEventHandler(handler)
+        self._event_handler = handler
+
+    def unregister_image_events(self):
+        """イベントハンドラを外す（実行中のコールバックの終了を待つ）"""
+        handler, self._event_handler = self._event_handler, None
+        if handler is not None:
+            self.camera.UnregisterEventHandler(handler)
+
+    def record(self, duration_sec: float, pacing: str = 'hardware', mode: str = 'stream'):
+        """
+        録画を実行する
+        pacing='hardware' : カメラのフレームレート／トリガに任せ、GetNextImage(timeout) だけでブロック（既定）
+        pacing='event'    : ImageEventHandler のコールバックでフレームを受け取る（ポーリングなし）
+        pacing='host'     : 従来通りホスト側で sleep してペースを作る
+        mode='stream'     : 取得と並行して書き込みプールで保存（既定）
+        mode='ram_burst'  : 事前確保したRAMリングバッファに溜め、EndAcquisition 後に保存
+        """
+        if not self._primed:
+            raise RuntimeError("Camera must be primed before recording")
 
-        start_time = time.perf_counter()  # 高精度タイマーで開始時刻を記録
-        try:
-            for i in range(total_frames):
-                self.capture_frame()
-
-                # 次のフレームを撮るべき理論時刻
-                next_frame_time = start_time + (i + 1) * interval
-                # 残り時間を計算してsleep
-                sleep_time = next_frame_time - time.perf_counter()
-                if sleep_time > 0:
-                    time.sleep(sleep_time)
-        except Exception as e:
-            print(f"[SecondaryCamera] Recording error: {e}")
-        finally:
-            self.stop()
-            print(f"[SecondaryCamera] Recording finished. {self.frame_counter} frames saved.")
+        print(f"[SecondaryCamera] Start recording: {int(duration_sec * self.framerate)} frames at {self.framerate} FPS ({pacing} pacing, {mode})")
+
+        self.last_record_stats = run_recording(self, duration_sec, pacing=pacing, mode=mode)
+        return self.last_record_stats
 
     def capture_frame(self, return_numpy=False, custom_filename: str = None):
-        print(f"[SecondaryCamera] Capturing frame {self.frame_counter}")
         try:
+            inst = self.instrumentation
+            t0 = inst.start()
             image_result = self.camera.GetNextImage()
+            t0 = inst.record('grab_wait', t0)
             if image_result.IsIncomplete():
                 print("[SecondaryCamera] Incomplete image")
                 return None
 
             timestamp = image_result.GetTimeStamp()
-            print(f"[{self.name}] Timestamp = {timestamp}")
-        
-            img_np = image_result.GetNDArray()
+            # Release 後に返す場合はドライバのバッファから切り離す（パック形式は常に展開済みのコピー）
+            img_np = image_to_ndarray(image_result, self.pixel_format_name, copy=return_numpy)
+            t0 = inst.record('get_ndarray', t0)
 
             if return_numpy:
                 image_result.Release()
@@ -258,7 +347,18 @@ class SecondaryCamera:
                     filename = os.path.join(self.folder, custom_filename)
                 else:
                     filename = os.path.join(self.folder, f"frame_{self.frame_counter}.{self.image_format}")
-                cv2.imwrite(filename, img_np)
+                if is_video_format(self.image_format):
+                    # 動画形式は録画専用なので、単発撮影は PNG で保存する
+                    filename = os.path.splitext(filename)[0] + '.png'
+                if self.image_format == CONTAINER_EXTENSION:
+                    info = {'frame_id': image_result.GetFrameID(), 'timestamp': timestamp}
+                    if self.clock_mapping is not None:
+                        info['host_timestamp'] = self.clock_mapping.to_host(timestamp)
+                    write_single_frame_container(filename, img_np, info,
+                                                 roi=self.roi_info, pixel_format=self.pixel_format_name)
+                else:
+                    cv2.imwrite(filename, img_np)
+                inst.record('write', t0)
                 self.frame_counter += 1
                 image_result.Release()
                 return filename
@@ -269,28 +369,38 @@ class SecondaryCamera:
     def stop(self):
         if self.camera.IsStreaming():
             self.camera.EndAcquisition()
+        self.unregister_image_events()
         # self.trigger_event = False
         self._primed = False
 
 
-    def capture_frame_for_live(self):
+    def capture_frame_for_live(self, pool=None):
         """
-        LiveView専用：PixelFormat_Mono8 前提で直接NumPy取得（最も安定）
+        LiveView専用：直接NumPy取得
+        pool（LiveFramePool）を渡すとそのバッファへコピーして返す（空きが無ければ None）
+        ドライバのバッファは Release() で再利用されるので、Release 前に必ずコピーする
         """
+        inst = self.instrumentation
         try:
+            t0 = inst.start()
             image_result = self.camera.GetNextImage(100)
+            t0 = inst.record('grab_wait', t0)
             # print(f"[LiveCapture] image_result type: {type(image_result)}")
 
             if image_result.IsIncomplete():
                 print("[LiveCapture] Incomplete image")
+                inst.count('incomplete')
                 image_result.Release()
                 return None
 
-            arr = image_result.GetNDArray()
+            # パック形式の展開・Bayer の半分解能デモザイクもここで行う（GUI スレッドには載せない）
+            frame = copy_live_frame(image_result, self.pixel_format_name, pool)
+            if frame is None:
+                inst.count('display_busy')
             image_result.Release()
-            arr = np.ascontiguousarray(arr)
+            inst.record('convert', t0)
 
-            return arr
+            return frame
 
         except Exception as e:
             print(f"[LiveCapture] Error: {e}")
@@ -312,7 +422,9 @@ class SecondaryCamera:
         fps: float = None,
         white_balance_auto: str = 'Off',   
         wb_red: float = 1.0,
-        wb_blue: float = 1.0
+        wb_blue: float = 1.0,
+        stream_buffer_mode: str = 'NewestOnly',
+        stream_buffer_count=None
     ):
         if self.camera.IsStreaming():
             self.camera.EndAcquisition()
@@ -394,6 +506,8 @@ class SecondaryCamera:
             entry = fmt_node.GetEntryByName(pixel_format_name)
             if PySpin.IsAvailable(entry) and PySpin.IsReadable(entry):
                 fmt_node.SetIntValue(entry.GetValue())
+        # LiveView のフレーム変換（パック形式の展開・Bayer の半分解能デモザイク）に使う
+        self.pixel_format_name = pixel_format_name
 
         # ReverseX/Y
         reverse_x_node = PySpin.CBooleanPtr(nodemap.GetNode("ReverseX"))
@@ -425,9 +539,11 @@ class SecondaryCamera:
                 ratio_node.SetValue(wb_blue)
 
         # Stream mode for LiveView
-        self.camera.TLStream.StreamBufferHandlingMode.SetValue(PySpin.StreamBufferHandlingMode_NewestOnly)
+        self._apply_stream_buffers(stream_buffer_mode, stream_buffer_count,
+                                   self.camera.AcquisitionFrameRate.GetValue(), roi_w, roi_h, pixel_format_name)
 
         self._primed = True
+        self.instrumentation.reset()
 
         self.roi_info = {
             'x_min': offset_x,
@@ -436,6 +552,15 @@ class SecondaryCamera:
             'y_max': offset_y + roi_h
         }
 
+    def _apply_stream_buffers(self, mode: str, count, fps: float, width: int, height: int,
+                              pixel_format_name: str, writer_latency_ms: float = 100.0):
+        """ストリームバッファのハンドリングモードと本数を設定する（count: None / 'auto' / 本数）"""
+        buffers = resolve_buffer_count(count, fps, width, height, pixel_format_name, writer_latency_ms)
+        self.stream_buffer_count = configure_stream_buffers(self.camera, mode, buffers)
+        self.stream_buffer_mode = mode
+        print(f"[DEBUG] {self.__class__.__name__} Stream buffers: mode={mode}, "
+              f"count={self.stream_buffer_count if self.stream_buffer_count is not None else 'Auto'}")
+
     def release(self):
         try:
             if self.camera is not None:
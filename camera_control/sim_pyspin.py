@@ -0,0 +1,765 @@
+"""
+PySpin 互換のシミュレーションバックエンド（実機なしでの動作確認・ベンチマーク用）
+
+camera_control / util が使っている PySpin の API（System, CameraList, Camera, NodeMap,
+CEnumerationPtr などのノード、ImageResult, TLStream）と同じ呼び出し方で使える。
+環境変数 FLIR_SIMULATION=1 を設定すると util.spin_backend 経由でこのモジュールが PySpin として読み込まれる。
+
+- 指定したフレームレート・PixelFormat・ROI で合成画像を生成（タイミングにはジッタを付与）
+- TriggerMode=On / TriggerSource=Line3 のカメラは、同じ System 内のフリーランカメラの露光に同期して撮影
+- 不完全画像・ストールの注入、ストリームバッファ（数・ハンドリングモード）と欠落統計の再現
+- カメラごとに独立したデバイスクロック（オフセット・ドリフト）と TimestampLatch
+- ImageEventHandler（RegisterEventHandler）によるイベント駆動の取得（カメラごとのイベントスレッドから呼ぶ）
+"""
+
+import collections
+import random
+import threading
+import time
+
+import numpy as np
+
+from util.pixel_unpack import is_packed, pack
+
+# =========================================================
+# 例外・定数
+# =========================================================
+
+
+class SpinnakerException(Exception):
+    def __init__(self, message: str, errorcode: int = -1001):
+        super().__init__(f"Spinnaker: {message} [{errorcode}]")
+        self.message = message
+        self.errorcode = errorcode
+
+
+SPINNAKER_ERR_TIMEOUT = -1011
+EVENT_TIMEOUT_INFINITE = 0xFFFFFFFFFFFFFFFF
+
+_ENUMS = {
+    'GainAuto': ['Off', 'Once', 'Continuous'],
+    'ExposureAuto': ['Off', 'Once', 'Continuous'],
+    'BalanceWhiteAuto': ['Off', 'Once', 'Continuous'],
+    'BalanceRatioSelector': ['Red', 'Blue'],
+    'TriggerMode': ['Off', 'On'],
+    'TriggerSelector': ['FrameStart', 'AcquisitionStart'],
+    'TriggerSource': ['Line0', 'Line1', 'Line2', 'Line3', 'Software'],
+    'TriggerOverlap': ['Off', 'ReadOut', 'PreviousFrame'],
+    'TriggerActivation': ['RisingEdge', 'FallingEdge'],
+    'AcquisitionMode': ['Continuous', 'SingleFrame', 'MultiFrame'],
+    'PixelFormat': [
+        'Mono8', 'BGR8', 'BGRa8', 'Mono16', 'RGB8Packed', 'BayerGR8', 'BayerGR16',
+        'Mono10Packed', 'BayerGR10Packed', 'Mono12Packed', 'BayerGR12Packed',
+        'YUV411Packed', 'YUV422Packed', 'YUV444Packed', 'Mono10p', 'BayerGR10p',
+        'Mono12p', 'BayerGR12p', 'YCbCr8', 'YCbCr422_8', 'YCbCr411_8',
+    ],
+    'StreamBufferHandlingMode': ['OldestFirst', 'OldestFirstOverwrite', 'NewestOnly', 'NewestFirst'],
+    'StreamBufferCountMode': ['Manual', 'Auto'],
+}
+
+# PySpin と同じ名前の列挙定数（例: TriggerMode_On, StreamBufferHandlingMode_NewestOnly）
+for _enum_name, _entries in _ENUMS.items():
+    for _value, _entry in enumerate(_entries):
+        globals()[f"{_enum_name}_{_entry}"] = _value
+PixelFormat_Mono8 = _ENUMS['PixelFormat'].index('Mono8')
+
+# PixelFormat → (チャンネル数, dtype, 有効ビット深度)
+_SIM_PIXEL_LAYOUT = {
+    'Mono8': (1, np.uint8, 8), 'BayerGR8': (1, np.uint8, 8),
+    'Mono16': (1, np.uint16, 16), 'BayerGR16': (1, np.uint16, 16),
+    'Mono10Packed': (1, np.uint16, 10), 'BayerGR10Packed': (1, np.uint16, 10),
+    'Mono12Packed': (1, np.uint16, 12), 'BayerGR12Packed': (1, np.uint16, 12),
+    'Mono10p': (1, np.uint16, 10), 'BayerGR10p': (1, np.uint16, 10),
+    'Mono12p': (1, np.uint16, 12), 'BayerGR12p': (1, np.uint16, 12),
+    'BGR8': (3, np.uint8, 8), 'RGB8Packed': (3, np.uint8, 8), 'BGRa8': (4, np.uint8, 8),
+    'YUV411Packed': (1, np.uint8, 8), 'YUV422Packed': (2, np.uint8, 8), 'YUV444Packed': (3, np.uint8, 8),
+    'YCbCr8': (3, np.uint8, 8), 'YCbCr422_8': (2, np.uint8, 8), 'YCbCr411_8': (1, np.uint8, 8),
+}
+
+# =========================================================
+# シミュレーション設定
+# =========================================================
+
+DEFAULT_CAMERA_CONFIG = {
+    'sensor_width': 1440,
+    'sensor_height': 1080,
+    'max_fps': 200.0,             # フルセンサ時の最大FPS（ROIの高さに反比例して上がる）
+    'max_fps_limit': 2000.0,
+    'jitter_us': 50.0,            # 撮影タイミングのジッタ（標準偏差）
+    'incomplete_rate': 0.0,       # 不完全画像になる確率
+    'stall_rate': 0.0,            # 1フレームごとのストール発生確率
+    'stall_ms': 50.0,             # ストール時間
+    'line_latency_us': 5.0,       # Line3 トリガの伝搬遅延
+    'clock_offset_ns': None,      # デバイスクロックのオフセット（None = ランダム）
+    'clock_drift_ppm': None,      # デバイスクロックのドリフト（None = ランダム）
+    'default_buffer_count': 10,
+}
+
+_sim_config = {
+    'cameras': [{'serial': '00000001'}, {'serial': '00000002'}],
+    'defaults': {},
+}
+
+
+def configure(cameras=None, **defaults):
+    """
+    シミュレーションするカメラ構成を設定する（System.GetInstance() より前に呼ぶ）
+    cameras : [{'serial': '...', 'sensor_width': ..., ...}, ...]
+    defaults: 全カメラ共通の DEFAULT_CAMERA_CONFIG の上書き
+    """
+    if cameras is not None:
+        _sim_config['cameras'] = [dict(c) for c in cameras]
+    _sim_config['defaults'] = dict(defaults)
+    if System._instance is not None:
+        System._instance._build_devices()
+
+
+# =========================================================
+# ノード
+# =========================================================
+
+
+class _Node:
+    def __init__(self, name: str, readable: bool = True, writable: bool = True):
+        self.name = name
+        self.readable = readable
+        self.writable = writable
+
+
+class _EnumEntry:
+    def __init__(self, name: str, value: int):
+        self.name = name
+        self.value = value
+
+    def GetValue(self):
+        return self.value
+
+    def GetSymbolic(self):
+        return self.name
+
+    def GetName(self):
+        return f"EnumEntry_{self.name}"
+
+
+class _EnumNode(_Node):
+    def __init__(self, name, entries, value=0, **kwargs):
+        super().__init__(name, **kwargs)
+        self.entries = [_EnumEntry(e, i) for i, e in enumerate(entries)]
+        self.value = value
+
+    def GetEntryByName(self, name: str):
+        for entry in self.entries:
+            if entry.name == name:
+                return entry
+        return None
+
+    def GetEntries(self):
+        return list(self.entries)
+
+    def GetIntValue(self):
+        return self.value
+
+    def GetValue(self):
+        return self.value
+
+    def SetIntValue(self, value: int):
+        if not self.writable:
+            raise SpinnakerException(f"{self.name} is not writable", -1006)
+        if not 0 <= value < len(self.entries):
+            raise SpinnakerException(f"{self.name}: invalid entry {value}", -1009)
+        self.value = value
+
+    SetValue = SetIntValue
+
+    def GetCurrentEntry(self):
+        return self.entries[self.value]
+
+    @property
+    def symbolic(self) -> str:
+        return self.entries[self.value].name
+
+
+class _IntNode(_Node):
+    def __init__(self, name, value=0, vmin=0, vmax=2**31, inc=1, **kwargs):
+        super().__init__(name, **kwargs)
+        self.value = value
+        self.vmin = vmin
+        self.vmax = vmax
+        self.inc = inc
+
+    def GetValue(self):
+        return self.value
+
+    def SetValue(self, value: int):
+        if not self.writable:
+            raise SpinnakerException(f"{self.name} is not writable", -1006)
+        if not self.GetMin() <= value <= self.GetMax():
+            raise SpinnakerException(f"{self.name}: {value} out of range [{self.GetMin()}, {self.GetMax()}]", -1009)
+        self.value = int(value)
+
+    def GetMin(self):
+        return self.vmin() if callable(self.vmin) else self.vmin
+
+    def GetMax(self):
+        return self.vmax() if callable(self.vmax) else self.vmax
+
+    def GetInc(self):
+        return self.inc
+
+
+class _FloatNode(_Node):
+    def __init__(self, name, value=0.0, vmin=0.0, vmax=1e9, **kwargs):
+        super().__init__(name, **kwargs)
+        self.value = value
+        self.vmin = vmin
+        self.vmax = vmax
+
+    def GetValue(self):
+        return min(self.value, self.GetMax())
+
+    def SetValue(self, value: float):
+        if not self.writable:
+            raise SpinnakerException(f"{self.name} is not writable", -1006)
+        if not self.GetMin() <= value <= self.GetMax():
+            raise SpinnakerException(f"{self.name}: {value} out of range [{self.GetMin()}, {self.GetMax()}]", -1009)
+        self.value = float(value)
+
+    def GetMin(self):
+        return self.vmin() if callable(self.vmin) else self.vmin
+
+    def GetMax(self):
+        return self.vmax() if callable(self.vmax) else self.vmax
+
+
+class _BoolNode(_Node):
+    def __init__(self, name, value=False, **kwargs):
+        super().__init__(name, **kwargs)
+        self.value = value
+
+    def GetValue(self):
+        return self.value
+
+    def SetValue(self, value: bool):
+        if not self.writable:
+            raise SpinnakerException(f"{self.name} is not writable", -1006)
+        self.value = bool(value)
+
+
+class _StringNode(_Node):
+    def __init__(self, name, value='', **kwargs):
+        super().__init__(name, writable=False, **kwargs)
+        self.value = value
+
+    def GetValue(self):
+        return self.value
+
+    def ToString(self):
+        return self.value
+
+
+class _CommandNode(_Node):
+    def __init__(self, name, func, **kwargs):
+        super().__init__(name, readable=False, **kwargs)
+        self.func = func
+
+    def Execute(self):
+        self.func()
+
+    def IsDone(self):
+        return True
+
+
+def CEnumerationPtr(node):
+    return node
+
+
+CIntegerPtr = CFloatPtr = CBooleanPtr = CStringPtr = CCommandPtr = CValuePtr = CEnumerationPtr
+
+
+def IsAvailable(node) -> bool:
+    return node is not None
+
+
+def IsReadable(node) -> bool:
+    return node is not None and getattr(node, 'readable', True)
+
+
+def IsWritable(node) -> bool:
+    return node is not None and getattr(node, 'writable', True)
+
+
+class NodeMap:
+    def __init__(self):
+        self._nodes = {}
+
+    def add(self, node):
+        self._nodes[node.name] = node
+        return node
+
+    def GetNode(self, name: str):
+        return self._nodes.get(name)
+
+    def __getattr__(self, name):
+        nodes = self.__dict__.get('_nodes', {})
+        if name in nodes:
+            return nodes[name]
+        raise AttributeError(name)
+
+
+# =========================================================
+# 画像
+# =========================================================
+
+
+class ImageResult:
+    def __init__(self, array, frame_id, timestamp, pixel_format, incomplete=False, data=None):
+        self._array = array
+        self._data = data  # パック形式の転送バイト列（GetData() が返す）
+        self._frame_id = frame_id
+        self._timestamp = timestamp
+        self._pixel_format = pixel_format
+        self._incomplete = incomplete
+        self._released = False
+
+    def IsIncomplete(self):
+        return self._incomplete
+
+    def GetImageStatus(self):
+        return 1 if self._incomplete else 0
+
+    def GetFrameID(self):
+        return self._frame_id
+
+    def GetTimeStamp(self):
+        return self._timestamp
+
+    def GetNDArray(self):
+        if self._released:
+            raise SpinnakerException("Image has been released", -1002)
+        return self._array
+
+    def GetData(self):
+        if self._data is not None:
+            if self._released:
+                raise SpinnakerException("Image has been released", -1002)
+            return self._data
+        return self.GetNDArray().reshape(-1).view(np.uint8)
+
+    def GetWidth(self):
+        return self._array.shape[1]
+
+    def GetHeight(self):
+        return self._array.shape[0]
+
+    def GetBufferSize(self):
+        return self._array.nbytes
+
+    def GetPixelFormatName(self):
+        return self._pixel_format
+
+    def Release(self):
+        self._released = True
+
+
+class ImageEventHandler:
+    """PySpin.ImageEventHandler 互換：継承して OnImageEvent(image) を実装する"""
+
+    def __init__(self):
+        pass
+
+    def OnImageEvent(self, image):
+        raise NotImplementedError
+
+
+# =========================================================
+# カメラ
+# =========================================================
+
+
+class Camera:
+    def __init__(self, system, config: dict):
+        self.system = system
+        self.config = config
+        self.serial = str(config['serial'])
+        self._initialized = False
+        self._streaming = False
+        self._lock = threading.Condition()
+        self._buffer = collections.deque()
+        self._thread = None
+        self._event_handler = None
+        self._event_thread = None
+        self._frame_id = 0
+        self._patterns = None
+        self._rng = random.Random(hash(self.serial))
+
+        # 独立したデバイスクロック
+        offset = config.get('clock_offset_ns')
+        drift = config.get('clock_drift_ppm')
+        self._clock_offset_ns = self._rng.randint(0, 10**12) if offset is None else int(offset)
+        self._clock_drift = (self._rng.uniform(-20, 20) if drift is None else drift) * 1e-6
+
+        self._build_nodemap()
+        self._reset_stream_stats()
+
+    # ---------------------------------------------------------
+    # ノードマップ構築
+    # ---------------------------------------------------------
+    def _build_nodemap(self):
+        c = self.config
+        nm = NodeMap()
+        sw, sh = c['sensor_width'], c['sensor_height']
+        nm.add(_StringNode('DeviceSerialNumber', self.serial))
+        nm.add(_StringNode('DeviceModelName', 'Simulated FLIR Camera'))
+        for name in ('GainAuto', 'ExposureAuto', 'BalanceWhiteAuto', 'BalanceRatioSelector',
+                     'TriggerMode', 'TriggerSelector', 'TriggerSource', 'TriggerOverlap',
+                     'TriggerActivation', 'AcquisitionMode', 'PixelFormat'):
+            nm.add(_EnumNode(name, _ENUMS[name]))
+        nm.add(_FloatNode('ExposureTime', 5000.0, 10.0, 3e7))
+        nm.add(_FloatNode('Gain', 0.0, 0.0, 47.0))
+        nm.add(_FloatNode('BalanceRatio', 1.0, 0.25, 8.0))
+        nm.add(_BoolNode('AcquisitionFrameRateEnable', False))
+        nm.add(_FloatNode('AcquisitionFrameRate', c['max_fps'], 1.0, self._max_fps))
+        nm.add(_IntNode('Width', sw, 16, lambda: sw - nm.OffsetX.value, 16))
+        nm.add(_IntNode('Height', sh, 16, lambda: sh - nm.OffsetY.value, 2))
+        nm.add(_IntNode('OffsetX', 0, 0, lambda: sw - nm.Width.value, 4))
+        nm.add(_IntNode('OffsetY', 0, 0, lambda: sh - nm.Height.value, 2))
+        nm.add(_BoolNode('ReverseX', False))
+        nm.add(_BoolNode('ReverseY', False))
+        nm.add(_IntNode('TimestampLatchValue', 0, writable=False, vmax=2**63))
+        nm.add(_CommandNode('TimestampLatch', self._latch_timestamp))
+        nm.add(_CommandNode('TriggerSoftware', self._software_trigger))
+        self._nodemap = nm
+
+        tl = NodeMap()
+        tl.add(_EnumNode('StreamBufferHandlingMode', _ENUMS['StreamBufferHandlingMode']))
+        tl.add(_EnumNode('StreamBufferCountMode', _ENUMS['StreamBufferCountMode'],
+                         value=StreamBufferCountMode_Auto))
+        tl.add(_IntNode('StreamBufferCountManual', c['default_buffer_count'], 1, 10000))
+        tl.add(_IntNode('StreamBufferCountMax', 10000, writable=False, vmax=10000))
+        for name in ('StreamDeliveredFrameCount', 'StreamLostFrameCount', 'StreamDroppedFrameCount',
+                     'StreamBufferUnderrunCount', 'StreamIncompleteFrameCount'):
+            tl.add(_IntNode(name, 0, writable=False, vmax=2**63))
+        self._tl_stream = tl
+
+    def _max_fps(self) -> float:
+        height = self._nodemap.Height.value
+        fps = self.config['max_fps'] * self.config['sensor_height'] / max(height, 1)
+        return min(fps, self.config['max_fps_limit'])
+
+    def _reset_stream_stats(self):
+        for name in ('StreamDeliveredFrameCount', 'StreamLostFrameCount', 'StreamDroppedFrameCount',
+                     'StreamBufferUnderrunCount', 'StreamIncompleteFrameCount'):
+            self._tl_stream.GetNode(name).value = 0
+
+    # ---------------------------------------------------------
+    # PySpin CameraPtr 互換 API
+    # ---------------------------------------------------------
+    def __getattr__(self, name):
+        # camera.AcquisitionFrameRate のような QuickSpin 形式のアクセス
+        nodemap = self.__dict__.get('_nodemap')
+        if nodemap is not None and name in nodemap._nodes:
+            return nodemap._nodes[name]
+        raise AttributeError(name)
+
+    @property
+    def TLStream(self):
+        return self._tl_stream
+
+    def GetTLStreamNodeMap(self):
+        return self._tl_stream
+
+    def GetNodeMap(self):
+        if not self._initialized:
+            raise SpinnakerException("Camera is not initialized", -1002)
+        return self._nodemap
+
+    def GetTLDeviceNodeMap(self):
+        return self._nodemap
+
+    def Init(self):
+        self._initialized = True
+
+    def DeInit(self):
+        if self._streaming:
+            self.EndAcquisition()
+        self._initialized = False
+
+    def IsInitialized(self):
+        return self._initialized
+
+    def IsValid(self):
+        return True
+
+    def IsStreaming(self):
+        return self._streaming
+
+    def GetUniqueID(self):
+        return self.serial
+
+    def BeginAcquisition(self):
+        if not self._initialized:
+            raise SpinnakerException("Camera is not initialized", -1002)
+        if self._streaming:
+            raise SpinnakerException("Camera is already streaming", -1004)
+        with self._lock:
+            self._buffer.clear()
+            self._reset_stream_stats()
+            self._patterns = self._make_patterns()
+            self._frame_id = 0
+            self._streaming = True
+        if self._is_free_running():
+            self._thread = threading.Thread(target=self._free_run_loop, name=f"SimCam-{self.serial}", daemon=True)
+            self._thread.start()
+
+    def EndAcquisition(self):
+        if not self._streaming:
+            raise SpinnakerException("Camera is not streaming", -1002)
+        with self._lock:
+            self._streaming = False
+            self._lock.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def GetNextImage(self, timeout=EVENT_TIMEOUT_INFINITE):
+        if not self._streaming:
+            raise SpinnakerException("Camera is not started", -1002)
+        deadline = None if timeout in (None, EVENT_TIMEOUT_INFINITE) else time.perf_counter() + timeout / 1000.0
+        handling = self._tl_stream.StreamBufferHandlingMode.symbolic
+        with self._lock:
+            while not self._buffer:
+                remaining = None if deadline is None else deadline - time.perf_counter()
+                if (remaining is not None and remaining <= 0) or not self._streaming:
+                    raise SpinnakerException("Failed waiting for EventData on NEW_BUFFER_DATA event.",
+                                             SPINNAKER_ERR_TIMEOUT)
+                self._lock.wait(remaining)
+            if handling == 'NewestFirst':
+                return self._buffer.pop()
+            return self._buffer.popleft()
+
+    def RegisterEventHandler(self, handler):
+        if not isinstance(handler, ImageEventHandler):
+            raise SpinnakerException("Only image event handlers are simulated", -1009)
+        if self._event_handler is not None:
+            raise SpinnakerException("An image event handler is already registered", -1004)
+        self._event_handler = handler
+        self._event_thread = threading.Thread(target=self._dispatch_events, args=(handler,),
+                                              name=f"SimCamEvents-{self.serial}", daemon=True)
+        self._event_thread.start()
+
+    def UnregisterEventHandler(self, handler):
+        if handler is None or handler is not self._event_handler:
+            raise SpinnakerException("Event handler is not registered", -1002)
+        with self._lock:
+            self._event_handler = None
+            self._lock.notify_all()
+        if self._event_thread is not threading.current_thread():
+            self._event_thread.join()
+        self._event_thread = None
+
+    def _dispatch_events(self, handler):
+        # 実機と同じく、届いたバッファをカメラごとのイベントスレッドから順にコールバックへ渡す
+        # コールバックが遅ければバッファが溜まり、ハンドリングモードに従って欠落する
+        handling = self._tl_stream.StreamBufferHandlingMode
+        while True:
+            with self._lock:
+                while self._event_handler is handler and not self._buffer:
+                    self._lock.wait(0.1)
+                if self._event_handler is not handler:
+                    return
+                image = self._buffer.pop() if handling.symbolic == 'NewestFirst' else self._buffer.popleft()
+            try:
+                handler.OnImageEvent(image)
+            except Exception as e:
+                print(f"[SimPySpin] OnImageEvent error: {e}")
+            finally:
+                image.Release()
+
+    # ---------------------------------------------------------
+    # フレーム生成
+    # ---------------------------------------------------------
+    def _is_free_running(self) -> bool:
+        return self._nodemap.TriggerMode.symbolic == 'Off'
+
+    def _trigger_source(self) -> str:
+        return self._nodemap.TriggerSource.symbolic
+
+    def _frame_period(self) -> float:
+        nm = self._nodemap
+        fps = nm.AcquisitionFrameRate.GetValue() if nm.AcquisitionFrameRateEnable.value else self._max_fps()
+        return 1.0 / max(fps, 1e-3)
+
+    def _free_run_loop(self):
+        cfg = self.config
+        next_t = time.perf_counter()
+        while self._streaming:
+            next_t += self._frame_period()
+            jitter = self._rng.gauss(0.0, cfg['jitter_us'] * 1e-6) if cfg['jitter_us'] else 0.0
+            delay = next_t + jitter - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            elif delay < -self._frame_period():
+                # 実機は遅れを取り戻すために連写しないので、スケジュールを現在時刻に合わせ直す
+                next_t = time.perf_counter()
+            if not self._streaming:
+                break
+            if cfg['stall_rate'] and self._rng.random() < cfg['stall_rate']:
+                # ホスト側の取りこぼしを再現するため、その間のフレームは転送されず欠番になる
+                stall = cfg['stall_ms'] / 1000.0
+                time.sleep(stall)
+                lost = int(stall / self._frame_period())
+                self._frame_id += lost
+                self._add_stat('StreamLostFrameCount', lost)
+                next_t = time.perf_counter()
+            self._expose()
+
+    def _expose(self):
+        """1フレーム撮影してストリームバッファへ入れ、Line出力で同期カメラをトリガする"""
+        self._produce_frame()
+        self.system._fire_line(self)
+
+    def _on_line_trigger(self, source: str):
+        if self._streaming and not self._is_free_running() and self._trigger_source() == source:
+            # 伝搬遅延はタイムスタンプにだけ反映する（送信側カメラのスレッドを止めない）
+            self._produce_frame(int(self.config['line_latency_us'] * 1000))
+
+    def _software_trigger(self):
+        if self._streaming and not self._is_free_running() and self._trigger_source() == 'Software':
+            self._expose()
+
+    def _device_time_ns(self) -> int:
+        host = time.perf_counter_ns()
+        return int(host * (1.0 + self._clock_drift)) + self._clock_offset_ns
+
+    def _latch_timestamp(self):
+        self._nodemap.TimestampLatchValue.value = self._device_time_ns()
+
+    def _make_patterns(self):
+        nm = self._nodemap
+        fmt = nm.PixelFormat.symbolic
+        channels, dtype, bits = _SIM_PIXEL_LAYOUT.get(fmt, (1, np.uint8, 8))
+        h, w = nm.Height.value, nm.Width.value
+        maxval = (1 << bits) - 1
+        gradient = np.add.outer(np.arange(h, dtype=np.int32), np.arange(w, dtype=np.int32))
+        gradient = gradient * maxval // max(w + h, 1)
+        patterns = []
+        for k in range(4):
+            base = ((gradient + k * 17) % (maxval + 1)).astype(dtype)
+            if channels > 1:
+                base = np.repeat(base[:, :, None], channels, axis=2)
+                for ch in range(channels):
+                    base[:, :, ch] = (base[:, :, ch].astype(np.int64) * (ch + 2) // (channels + 1)).astype(dtype)
+            base = np.ascontiguousarray(base)
+            # パック形式は実機と同じく GetData() がパック済みのバイト列を返す
+            patterns.append((base, pack(base, fmt) if is_packed(fmt) else None))
+        return fmt, patterns
+
+    def _produce_frame(self, delay_ns: int = 0):
+        fmt, patterns = self._patterns
+        frame_id = self._frame_id
+        self._frame_id += 1
+        base, packed = patterns[frame_id % len(patterns)]
+        img = base.copy()
+        data = packed.copy() if packed is not None else None
+        incomplete = bool(self.config['incomplete_rate']) and self._rng.random() < self.config['incomplete_rate']
+        result = ImageResult(img, frame_id, self._device_time_ns() + delay_ns, fmt, incomplete, data)
+        self._deliver(result)
+
+    def _buffer_capacity(self) -> int:
+        tl = self._tl_stream
+        if tl.StreamBufferCountMode.symbolic == 'Manual':
+            return tl.StreamBufferCountManual.value
+        return self.config['default_buffer_count']
+
+    def _add_stat(self, name: str, n: int = 1):
+        self._tl_stream.GetNode(name).value += n
+
+    def _deliver(self, result: ImageResult):
+        handling = self._tl_stream.StreamBufferHandlingMode.symbolic
+        capacity = self._buffer_capacity()
+        with self._lock:
+            if not self._streaming:
+                return
+            if result.IsIncomplete():
+                self._add_stat('StreamIncompleteFrameCount')
+            if handling == 'NewestOnly':
+                self._add_stat('StreamDroppedFrameCount', len(self._buffer))
+                self._buffer.clear()
+            elif len(self._buffer) >= capacity:
+                if handling == 'OldestFirst':
+                    # 空きバッファがない → 新しいフレームは受け取れずに失われる
+                    self._add_stat('StreamLostFrameCount')
+                    self._add_stat('StreamBufferUnderrunCount')
+                    return
+                self._buffer.popleft()
+                self._add_stat('StreamDroppedFrameCount')
+            self._buffer.append(result)
+            self._add_stat('StreamDeliveredFrameCount')
+            self._lock.notify_all()
+
+
+# =========================================================
+# System / CameraList
+# =========================================================
+
+
+class CameraList:
+    def __init__(self, cameras):
+        self._cameras = list(cameras)
+
+    def GetSize(self):
+        return len(self._cameras)
+
+    def GetByIndex(self, index: int):
+        return self._cameras[index]
+
+    def GetBySerial(self, serial: str):
+        for cam in self._cameras:
+            if cam.serial == str(serial):
+                return cam
+        raise SpinnakerException(f"Camera with serial {serial} not found", -1015)
+
+    def Clear(self):
+        self._cameras = []
+
+    def __len__(self):
+        return len(self._cameras)
+
+    def __iter__(self):
+        return iter(self._cameras)
+
+    def __getitem__(self, index):
+        return self._cameras[index]
+
+
+class System:
+    _instance = None
+
+    def __init__(self):
+        self._cameras = []
+        self._build_devices()
+
+    @classmethod
+    def GetInstance(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def ReleaseInstance(self):
+        for cam in self._cameras:
+            if cam.IsStreaming():
+                cam.EndAcquisition()
+        System._instance = None
+
+    def _build_devices(self):
+        defaults = {**DEFAULT_CAMERA_CONFIG, **_sim_config['defaults']}
+        self._cameras = [Camera(self, {**defaults, **cfg}) for cfg in _sim_config['cameras']]
+
+    def GetCameras(self):
+        return CameraList(self._cameras)
+
+    def _fire_line(self, source_cam):
+        """フリーラン／ソフトウェアトリガのカメラの露光出力を Line3 で他カメラへ伝える"""
+        for cam in self._cameras:
+            if cam is not source_cam:
+                cam._on_line_trigger('Line3')
@@ -0,0 +1,69 @@
+import math
+
+from util.pixel_format import frame_nbytes
+from util.spin_backend import PySpin
+
+HANDLING_MODES = ('OldestFirst', 'OldestFirstOverwrite', 'NewestOnly', 'NewestFirst')
+
+MIN_BUFFER_COUNT = 3
+BUFFER_MARGIN = 4
+DEFAULT_WRITER_LATENCY_MS = 100.0
+DEFAULT_BUFFER_BUDGET_BYTES = 512 * 2**20
+
+
+def auto_buffer_count(fps: float, nbytes: int, writer_latency_ms: float = DEFAULT_WRITER_LATENCY_MS,
+                      budget_bytes: int = DEFAULT_BUFFER_BUDGET_BYTES) -> int:
+    """
+    ホスト側が writer_latency_ms の間フレームを受け取れなくても落とさないバッファ数
+    （fps × 停止時間 + 余裕分、ただし budget_bytes を超えない）
+    """
+    count = math.ceil(fps * writer_latency_ms / 1000.0) + BUFFER_MARGIN
+    if nbytes > 0:
+        count = min(count, budget_bytes // nbytes)
+    return max(MIN_BUFFER_COUNT, count)
+
+
+def resolve_buffer_count(buffer_count, fps: float, width: int, height: int, pixel_format: str,
+                         writer_latency_ms: float = DEFAULT_WRITER_LATENCY_MS):
+    """
+    buffer_count の指定を実際の本数にする
+    None → ドライバ任せ（Auto）、'auto' → FPS・フレームサイズ・想定書き込み遅延から計算、整数 → その本数
+    """
+    if buffer_count is None:
+        return None
+    if buffer_count == 'auto':
+        return auto_buffer_count(fps, frame_nbytes(width, height, pixel_format), writer_latency_ms)
+    if isinstance(buffer_count, int) and buffer_count >= 1:
+        return buffer_count
+    raise ValueError(f"Invalid stream buffer count: {buffer_count!r} (None, 'auto' or a positive int)")
+
+
+def configure_stream_buffers(cam, handling_mode: str, buffer_count: int = None) -> int:
+    """
+    TLStream のバッファハンドリングモードとバッファ数を設定する（cam は PySpin の CameraPtr）
+    buffer_count=None ならバッファ数はドライバ任せ。実際に設定したバッファ数（None 可）を返す
+    """
+    if handling_mode not in HANDLING_MODES:
+        raise ValueError(f"Invalid stream buffer handling mode: {handling_mode} ({', '.join(HANDLING_MODES)})")
+
+    nodemap = cam.GetTLStreamNodeMap()
+    mode_node = PySpin.CEnumerationPtr(nodemap.GetNode('StreamBufferHandlingMode'))
+    if PySpin.IsAvailable(mode_node) and PySpin.IsWritable(mode_node):
+        mode_node.SetIntValue(mode_node.GetEntryByName(handling_mode).GetValue())
+
+    count_mode_node = PySpin.CEnumerationPtr(nodemap.GetNode('StreamBufferCountMode'))
+    if buffer_count is None:
+        if PySpin.IsAvailable(count_mode_node) and PySpin.IsWritable(count_mode_node):
+            entry = count_mode_node.GetEntryByName('Auto')
+            if PySpin.IsAvailable(entry):
+                count_mode_node.SetIntValue(entry.GetValue())
+        return None
+
+    if PySpin.IsAvailable(count_mode_node) and PySpin.IsWritable(count_mode_node):
+        count_mode_node.SetIntValue(count_mode_node.GetEntryByName('Manual').GetValue())
+    count_node = PySpin.CIntegerPtr(nodemap.GetNode('StreamBufferCountManual'))
+    if not (PySpin.IsAvailable(count_node) and PySpin.IsWritable(count_node)):
+        return None
+    applied = max(count_node.GetMin(), min(int(buffer_count), count_node.GetMax()))
+    count_node.SetValue(applied)
+    return applied
@@ -0,0 +1,135 @@
+import os
+import time
+
+import cv2
+import numpy as np
+
+from camera_control.frame_container import CONTAINER_EXTENSION, write_single_frame_container
+from camera_control.video_sink import is_video_format
+
+
+class SyncBurstCapture:
+    """
+    ハード同期の単発・連続撮影を、カメラを設定し直さずに繰り返す
+    arm() で Cam1 をソフトウェアトリガ、Cam2 を Line3 トリガにして両方とも取得を開始しておき、
+    capture(n) では「Cam1 の TriggerSoftware → 両カメラから1枚ずつ受け取る」を n 回繰り返す
+    （Cam2 は Cam1 の露光出力でトリガされるので、1回のトリガで必ず1組になる）
+    """
+
+    def __init__(self, cam1, cam2, timeout_ms: int = 1000):
+        self.cam1 = cam1
+        self.cam2 = cam2
+        self.timeout_ms = timeout_ms
+        self._armed = False
+
+    @property
+    def armed(self) -> bool:
+        # 別の処理（録画・LiveView の prime など）で取得が止まっていれば待機状態ではない
+        return self._armed and all(cam._primed and cam.camera.IsStreaming() for cam in (self.cam1, self.cam2))
+
+    def arm(self):
+        for cam in (self.cam1, self.cam2):
+            if not cam._primed:
+                raise RuntimeError(f"{cam.name} must be primed before arming")
+            if cam.camera.IsStreaming():
+                cam.camera.EndAcquisition()
+        self.cam1.set_software_trigger(True)
+        # Cam2 は Cam1 の Line3 トリガ待ちなので先に開始する
+        for cam in (self.cam2, self.cam1):
+            cam.camera.BeginAcquisition()
+            cam.trigger_event = True
+        self._armed = True
+        print(f"[SyncBurst] Armed: {self.cam1.name} software trigger → {self.cam2.name} Line3")
+
+    def disarm(self):
+        """取得を止め、Cam1 をフリーランに戻す（設定は残るので、再度 arm() できる）"""
+        for cam in (self.cam1, self.cam2):
+            if cam.camera.IsStreaming():
+                cam.camera.EndAcquisition()
+            cam.trigger_event = False
+        self.cam1.set_software_trigger(False)
+        self._armed = False
+
+    def _drain(self):
+        # 前回の取り残し（タイムアウト後に届いたフレームなど）を捨てて、組がずれないようにする
+        for cam in (self.cam1, self.cam2):
+            while cam.grab_frame(timeout_ms=0)[1] is not None:
+                pass
+
+    def capture(self, count: int = 1, save: bool = False, filenames: tuple = None) -> dict:
+        """
+        count 組を撮影し、NumPy 配列のまま返す（save=True のときだけ各カメラのフォルダへ保存する）
+        filenames=(Cam1 のファイル名, Cam2 のファイル名) で保存名を指定できる（count=1 のときだけ。省略時は frame_<番号>）
+        戻り値：{'cam1': [img, ...], 'cam2': [...], 'cam1_info': [...], 'cam2_info': [...],
+                'captured', 'failed', 'elapsed_sec', 'pairs_per_sec', 'skew_us'（クロック校正済みのとき）}
+        """
+        if not self.armed:
+            raise RuntimeError("Sync burst is not armed")
+        if filenames is not None and count != 1:
+            raise ValueError("filenames can only be given for a single pair")
+        cams = (self.cam1, self.cam2)
+        frames, infos = ([], []), ([], [])
+        skews = []
+        failed = 0
+
+        self._drain()
+        start = time.perf_counter()
+        for _ in range(count):
+            self.cam1.fire_software_trigger()
+            shot = [cam.grab_frame(timeout_ms=self.timeout_ms) for cam in cams]
+            if any(img_np is None for img_np, _ in shot):
+                # 片方でも欠けたら組にしない（遅れて届いたフレームは次のトリガ前に捨てる）
+                failed += 1
+                self._drain()
+                continue
+            for k, (img_np, info) in enumerate(shot):
+                frames[k].append(img_np)
+                infos[k].append(info)
+            if 'host_timestamp' in shot[0][1] and 'host_timestamp' in shot[1][1]:
+                skews.append(shot[1][1]['host_timestamp'] - shot[0][1]['host_timestamp'])
+        elapsed = time.perf_counter() - start
+
+        result = {
+            'cam1': frames[0],
+            'cam2': frames[1],
+            'cam1_info': infos[0],
+            'cam2_info': infos[1],
+            'requested': count,
+            'captured': len(frames[0]),
+            'failed': failed,
+            'elapsed_sec': elapsed,
+            'pairs_per_sec': len(frames[0]) / elapsed if elapsed > 0 else 0.0,
+        }
+        if skews:
+            skew_us = np.asarray(skews, dtype=np.float64) / 1e3
+            result['skew_us'] = {'mean': float(skew_us.mean()), 'max_abs': float(np.abs(skew_us).max())}
+        if save:
+            # 保存は撮影がすべて終わってから行う（撮影間隔に影響させない）
+            names = filenames or (None, None)
+            result['files'] = {f"cam{k + 1}": [save_frame(cam, img_np, info, names[k])
+                                               for img_np, info in zip(frames[k], infos[k])]
+                               for k, cam in enumerate(cams)}
+        return result
+
+
+def save_frame(camera, img_np, info: dict, filename: str = None) -> str:
+    """camera.capture_frame と同じ規則で1枚保存する（既定は frame_<番号>.<拡張子>、動画形式は PNG）"""
+    filename = os.path.join(camera.folder, filename or f"frame_{camera.frame_counter}.{camera.image_format}")
+    if is_video_format(camera.image_format):
+        filename = os.path.splitext(filename)[0] + '.png'
+    if camera.image_format == CONTAINER_EXTENSION:
+        write_single_frame_container(filename, img_np, info, roi=camera.roi_info, pixel_format=camera.pixel_format_name)
+    elif not cv2.imwrite(filename, img_np):
+        raise IOError(f"cv2.imwrite failed: {filename}")
+    camera.frame_counter += 1
+    return filename
+
+
+def format_sync_burst(result: dict) -> str:
+    """同期バーストの結果をログ出力用の1行に整形する"""
+    line = (f"pairs={result['captured']}/{result['requested']}  failed={result['failed']}  "
+            f"{result['elapsed_sec'] * 1e3:.1f}ms ({result['pairs_per_sec']:.1f} pairs/s)")
+    skew = result.get('skew_us')
+    if skew:
+        line += f"  skew mean={skew['mean']:.1f}us max={skew['max_abs']:.1f}us"
+    return line
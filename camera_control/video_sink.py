@@ -0,0 +1,120 @@
+import csv
+import os
+
+import cv2
+import numpy as np
+
+from util.demosaic import demosaic, is_bayer
+from util.pixel_format import pixel_format_info
+
+# =========================================================
+# 長時間録画用の動画シンク
+#
+# フレームを1本の動画ファイル（recording.mkv など）へエンコードし、
+# フレームごとのフレームID・タイムスタンプは recording.timestamps.csv に書き出す
+# 動画は 8bit（Mono はグレー、Bayer・カラーは BGR）。10/12/16bit は上位 8bit にする
+# =========================================================
+
+# 拡張子 → OpenCV の FourCC（mkv の FFV1 は可逆、avi / mp4 は非可逆）
+VIDEO_FORMATS = {
+    'mkv': 'FFV1',
+    'avi': 'MJPG',
+    'mp4': 'mp4v',
+}
+
+VIDEO_BASENAME = 'recording'
+TIMESTAMPS_SUFFIX = '.timestamps.csv'
+
+
+def is_video_format(image_format: str) -> bool:
+    return image_format in VIDEO_FORMATS
+
+
+def video_paths(folder: str, video_format: str) -> tuple:
+    """(動画ファイル, タイムスタンプの CSV) のパス"""
+    return (os.path.join(folder, f"{VIDEO_BASENAME}.{video_format}"),
+            os.path.join(folder, f"{VIDEO_BASENAME}{TIMESTAMPS_SUFFIX}"))
+
+
+def to_video_frame(img_np: np.ndarray, pixel_format: str = '') -> np.ndarray:
+    """VideoWriter に渡せる 8bit のグレー / BGR 画像にする（Bayer は OpenCV の線形補間で色を付ける）"""
+    if is_bayer(pixel_format) and img_np.ndim == 2:
+        img_np = demosaic(img_np, pixel_format, 'bilinear')
+    if img_np.ndim == 3 and img_np.shape[2] == 4:
+        img_np = cv2.cvtColor(img_np, cv2.COLOR_BGRA2BGR)
+    if img_np.ndim == 3 and img_np.shape[2] != 3:
+        raise ValueError(f"Unsupported frame for video: shape={img_np.shape}")
+    if img_np.dtype == np.uint16:
+        bit_depth = pixel_format_info(pixel_format)[2] if pixel_format else 16
+        img_np = (img_np >> max(bit_depth - 8, 0)).astype(np.uint8)
+    elif img_np.dtype != np.uint8:
+        raise ValueError(f"Unsupported frame dtype for video: {img_np.dtype}")
+    return img_np
+
+
+class VideoSink:
+    """
+    FrameWriterPool 用の動画書き込みシンク（エンコードは書き込みスレッド1本で順番に行う）
+    動画ファイルはフレームサイズが分かる最初のフレームで開く
+    """
+
+    parallel = False
+
+    def __init__(self, folder: str, video_format: str, fps: float, pixel_format: str = '', fourcc: str = None):
+        if video_format not in VIDEO_FORMATS:
+            raise ValueError(f"Unsupported video format: {video_format} (choose from {', '.join(VIDEO_FORMATS)})")
+        self.video_path, self.timestamps_path = video_paths(folder, video_format)
+        self.fourcc = fourcc or VIDEO_FORMATS[video_format]
+        self.fps = fps
+        self.pixel_format = pixel_format
+        self._writer = None
+        self._csv_file = None
+        self._csv = None
+        self.frames = 0
+
+    def _open(self, frame: np.ndarray):
+        h, w = frame.shape[:2]
+        self._writer = cv2.VideoWriter(self.video_path, cv2.VideoWriter_fourcc(*self.fourcc),
+                                       self.fps, (w, h), frame.ndim == 3)
+        if not self._writer.isOpened():
+            self._writer = None
+            raise IOError(f"cv2.VideoWriter could not open {self.video_path} ({self.fourcc})")
+        self._csv_file = open(self.timestamps_path, 'w', newline='')
+        self._csv = csv.writer(self._csv_file)
+        self._csv.writerow(['video_frame', 'index', 'frame_id', 'timestamp'])
+
+    def write(self, index: int, img_np, info: dict):
+        frame = to_video_frame(img_np, self.pixel_format)
+        if self._writer is None:
+            self._open(frame)
+        self._writer.write(frame)
+        info = info or {}
+        self._csv.writerow([self.frames, index, info.get('frame_id', index), info.get('timestamp', 0)])
+        self.frames += 1
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.release()
+            self._writer = None
+        if self._csv_file is not None:
+            self._csv_file.close()
+            self._csv_file = None
+
+    @property
+    def stats(self) -> dict:
+        size = os.path.getsize(self.video_path) if os.path.exists(self.video_path) else 0
+        return {
+            'video_path': self.video_path,
+            'fourcc': self.fourcc,
+            'frames': self.frames,
+            'file_bytes': size,
+            'bytes_per_frame': size / self.frames if self.frames else 0.0,
+        }
+
+
+def format_video_stats(stats: dict) -> str:
+    """動画シンクの統計をログ出力用の1行に整形する"""
+    if not stats:
+        return "(no stats)"
+    return (f"{os.path.basename(stats['video_path'])} ({stats['fourcc']})  frames={stats['frames']}  "
+            f"{stats['file_bytes'] / 2**20:.1f} MiB ({stats['bytes_per_frame'] / 1024:.1f} KiB/frame)")
@@ -1,16 +1,27 @@
 import sys
 import os
-from PySide6.QtGui import QImage, QPixmap
+import time
+from PySide6.QtGui import QImage
 from PySide6.QtWidgets import QApplication, QMainWindow, QFileDialog
 from PySide6.QtCore import QThread
 from ui.ui_mainwindow import Ui_MainWindow
 from camera_control.camera_controller import CameraController
-from camera_control.camera_worker import CameraWorker
-from camera_control.camera_live_worker import CameraLiveWorker
-from ui.gl_image_widget import ImageGLWidget
+from camera_control.camera_worker import CameraWorker, SyncRecordWorker
+from camera_control.camera_live_worker import CameraLiveWorker, format_live_stats
+from camera_control.frame_writer import format_writer_stats
+from camera_control.record_loop import format_record_stats
+from camera_control.frame_ring_buffer import format_burst_stats
+from camera_control.instrumentation import format_instrumentation
+from camera_control.drop_report import format_drop_report
+from camera_control.frame_container import format_compression_stats
+from camera_control.frame_pairing import format_pairing_stats
+from camera_control.sync_burst import format_sync_burst
+from camera_control.video_sink import format_video_stats
+from ui.gl_image_widget import ImageGLWidget, use_software_opengl
 from ui.histogram_dialog import show_histogram_window
 from ui.histogram_dialog import HistogramDialog
-import PySpin
+from util.demosaic import live_pixel_format
+from util.spin_backend import PySpin
 import numpy as np
 
 class MainWindow(QMainWindow):
@@ -30,6 +41,7 @@ class MainWindow(QMainWindow):
         self.live_worker_cam2 = None
         self.liveview_running_cam1 = False
         self.liveview_running_cam2 = False
+        self._sync_burst_settings = None
 
         self.ui.pushButtonConnectCam1.clicked.connect(self.connect_camera1)
         self.ui.pushButtonConnectCam2.clicked.connect(self.connect_camera2)
@@ -215,6 +227,7 @@ class MainWindow(QMainWindow):
         self.worker1.finished.connect(self.worker1.deleteLater)
         self.thread1.finished.connect(self.thread1.deleteLater)
         self.worker1.error_occurred.connect(self.ui.textEditLogCam1.append)
+        self.worker1.record_stats.connect(lambda stats: self.log_record_stats(self.ui.textEditLogCam1, "Cam1", stats))
         self.worker1.finished.connect(lambda: self.ui.textEditLogCam1.append("[Cam1] Recording finished."))
 
         # 録画終了後にLiveView復元（必要な場合だけ）
@@ -279,6 +292,7 @@ class MainWindow(QMainWindow):
         self.worker2.finished.connect(self.worker2.deleteLater)
         self.thread2.finished.connect(self.thread2.deleteLater)
         self.worker2.error_occurred.connect(self.ui.textEditLogCam2.append)
+        self.worker2.record_stats.connect(lambda stats: self.log_record_stats(self.ui.textEditLogCam2, "Cam2", stats))
         self.worker2.finished.connect(lambda: self.ui.textEditLogCam2.append("[Cam2] Recording finished."))
 
         # 録画終了後にLiveView復元（必要な場合だけ）
@@ -306,7 +320,7 @@ class MainWindow(QMainWindow):
 
         try:
             # Cam1（Primary）設定：ハード同期（TriggerMode=On）
-            self.controller.configure_cam1(
+            settings1 = dict(
                 folder=self.ui.lineEditSaveFolderCam1.text(),
                 fps=self.ui.doubleSpinBoxFpsCam1.value(),
                 exposure_time=self.ui.doubleSpinBoxExposureCam1.value(),
@@ -328,7 +342,7 @@ class MainWindow(QMainWindow):
             )
 
             # Cam2（Secondary）設定：ハード同期（TriggerMode=On）
-            self.controller.configure_cam2(
+            settings2 = dict(
                 folder=self.ui.lineEditSaveFolderCam2.text(),
                 fps=self.ui.doubleSpinBoxFpsCam2.value(),
                 exposure_time=self.ui.doubleSpinBoxExposureCam2.value(),
@@ -349,14 +363,24 @@ class MainWindow(QMainWindow):
                 wb_blue=self.ui.doubleSpinBoxBalanceRatioBlueCam2.value()
             )
 
-            # 外部トリガ1発 → 完全ハード同期撮影！
-            frame1, frame2 = self.controller.capture_single_frame(
-                custom_filename1=f"Cam1.{self.controller.cam1.image_format}",
-                custom_filename2=f"Cam2.{self.controller.cam2.image_format}"
+            # 設定が前回と同じで待機状態が続いていれば、設定し直さずにそのまま撮る
+            if not self.controller.sync_burst_armed or self._sync_burst_settings != (settings1, settings2):
+                self.controller.configure_cam1(**settings1)
+                self.controller.configure_cam2(**settings2)
+                self.controller.arm_sync_burst()
+                self._sync_burst_settings = (settings1, settings2)
+
+            # Cam1 のソフトウェアトリガ1発 → Line3 で Cam2 も同時に露光
+            result = self.controller.capture_sync_burst(
+                1, save=True,
+                filenames=(f"Cam1.{self.controller.cam1.image_format}", f"Cam2.{self.controller.cam2.image_format}")
             )
+            if not result['captured']:
+                raise RuntimeError("同期撮影がタイムアウトしました")
 
-            self.ui.textEditLogCam1.append(f"[Cam1] 1枚撮影 → {frame1}")
-            self.ui.textEditLogCam2.append(f"[Cam2] 1枚撮影 → {frame2}")
+            self.ui.textEditLogCam1.append(f"[Cam1] 1枚撮影 → {result['files']['cam1'][0]}")
+            self.ui.textEditLogCam2.append(f"[Cam2] 1枚撮影 → {result['files']['cam2'][0]}")
+            self.ui.textEditLogCam1.append(f"[Sync Capture] {format_sync_burst(result)}")
 
         except Exception as e:
             self.ui.textEditLogCam1.append(f"[Sync Capture] エラー: {str(e)}")
@@ -459,36 +483,58 @@ class MainWindow(QMainWindow):
             wb_blue=wb_blue2,
         )
 
+        # 2台を1つのワーカーで録画し、タイムスタンプで組にしたフレームを同じ番号で保存する（録画時間は Cam1 に合わせる）
+        if dur2 != dur1:
+            self.ui.textEditLogCam2.append(f"[Cam2] Sync recording uses Cam1 duration ({dur1:.1f}s).")
         self.thread1 = QThread()
-        self.worker1 = CameraWorker(self.controller, dur1, cam_id=1)
+        self.worker1 = SyncRecordWorker(self.controller, dur1)
         self.worker1.moveToThread(self.thread1)
         self.thread1.started.connect(self.worker1.run)
         self.worker1.finished.connect(self.thread1.quit)
         self.worker1.finished.connect(self.worker1.deleteLater)
         self.thread1.finished.connect(self.thread1.deleteLater)
         self.worker1.error_occurred.connect(self.ui.textEditLogCam1.append)
+        self.worker1.record_stats.connect(self.log_sync_record_stats)
         self.worker1.finished.connect(lambda: self.ui.textEditLogCam1.append("[Cam1] Sync Recording finished."))
+        self.worker1.finished.connect(lambda: self.ui.textEditLogCam2.append("[Cam2] Sync Recording finished."))
 
-        self.thread2 = QThread()
-        self.worker2 = CameraWorker(self.controller, dur2, cam_id=2)
-        self.worker2.moveToThread(self.thread2)
-        self.thread2.started.connect(self.worker2.run)
-        self.worker2.finished.connect(self.thread2.quit)
-        self.worker2.finished.connect(self.worker2.deleteLater)
-        self.thread2.finished.connect(self.thread2.deleteLater)
-        self.worker2.error_occurred.connect(self.ui.textEditLogCam2.append)
-        self.worker2.finished.connect(lambda: self.ui.textEditLogCam2.append("[Cam2] Sync Recording finished."))
-
-        # 両方終了後にLiveView再開（必要なら）
+        # 終了後にLiveView再開（必要なら）
         self.worker1.finished.connect(lambda: self.resume_liveviews_if_needed(was_cam1_live, was_cam2_live))
-        self.worker2.finished.connect(lambda: None)  # Cam2はCam1と一緒に resume されるのでここでは何もしない
 
         self.thread1.start()
-        self.thread2.start()
 
         self.ui.textEditLogCam1.append("[Cam1] Sync recording started...")
         self.ui.textEditLogCam2.append("[Cam2] Sync recording started...")
 
+    def log_record_stats(self, log_widget, tag: str, stats: dict):
+        """録画終了時の統計をログ欄に出力"""
+        log_widget.append(f"[{tag}] Capture: {format_record_stats(stats)}")
+        log_widget.append(f"[{tag}] Writer: {format_writer_stats(stats)}")
+        if 'ram_buffer_bytes' in stats:
+            log_widget.append(f"[{tag}] RAM burst: {format_burst_stats(stats)}")
+        if 'video' in stats:
+            log_widget.append(f"[{tag}] Video: {format_video_stats(stats['video'])}")
+        if 'compression' in stats:
+            log_widget.append(f"[{tag}] Compression: {format_compression_stats(stats['compression'])}")
+        if 'drop_report' in stats:
+            log_widget.append(f"[{tag}] Drops: {format_drop_report(stats['drop_report'])}")
+        if 'instrumentation' in stats:
+            log_widget.append(f"[{tag}] Stages: {format_instrumentation(stats['instrumentation'])}")
+
+    def log_sync_record_stats(self, stats: dict):
+        """同時録画の統計：カメラごとの統計と、フレームの組・ずれの統計"""
+        self.log_record_stats(self.ui.textEditLogCam1, "Cam1", stats.get('cam1', {}))
+        self.log_record_stats(self.ui.textEditLogCam2, "Cam2", stats.get('cam2', {}))
+        if 'sync' in stats:
+            self.ui.textEditLogCam1.append(f"[Sync] Pairs: {format_pairing_stats(stats['sync'])}")
+
+    def log_live_instrumentation(self, log_widget, tag: str, worker):
+        """LiveView停止時に取得数・表示数と、ステージ計測結果（計測が有効な場合のみ）をログ欄に出力"""
+        log_widget.append(f"[{tag}] Live: {format_live_stats(worker.live_stats())}")
+        for inst in (worker.camera.instrumentation, worker.instrumentation):
+            if inst.enabled:
+                log_widget.append(f"[{tag}] Live stages ({inst.name}): {format_instrumentation(inst.snapshot())}")
+
     def closeEvent(self, event):
         self.controller.release_cam1()
         self.controller.release_cam2()
@@ -555,6 +601,7 @@ class MainWindow(QMainWindow):
                         pass
                 self.live_worker_cam1.stop()
                 self.live_worker_cam1.wait()
+                self.log_live_instrumentation(self.ui.textEditLogCam1, "Cam1", self.live_worker_cam1)
                 self.live_worker_cam1 = None
 
             self.liveview_running_cam1 = False
@@ -606,6 +653,7 @@ class MainWindow(QMainWindow):
                         pass
                 self.live_worker_cam2.stop()
                 self.live_worker_cam2.wait()
+                self.log_live_instrumentation(self.ui.textEditLogCam2, "Cam2", self.live_worker_cam2)
                 self.live_worker_cam2 = None
 
             self.liveview_running_cam2 = False
@@ -613,45 +661,36 @@ class MainWindow(QMainWindow):
             self.ui.textEditLogCam2.append("[Cam2] LiveView停止")
 
     def update_liveview_cam1(self, img_np):
+        worker = self.live_worker_cam1
+        if worker is None:
+            return
         try:
-            h, w = img_np.shape[:2]  # グレースケール・カラー両対応！
-
-            # ======== グレースケール処理 ========
-            if img_np.ndim == 2:
-                qimg = QImage(img_np.data, w, h, QImage.Format_Grayscale8)
-
-            # ======== カラー処理（BGR→RGB変換） ========
-            elif img_np.ndim == 3 and img_np.shape[2] == 3:
-                # BGR → RGB に変換（FLIRはBGRが多い）
-                img_rgb = img_np[:, :, ::-1].copy()
-                qimg = QImage(img_rgb.data, w, h, 3 * w, QImage.Format_RGB888)
-
-            else:
-                raise ValueError("Unsupported image format")
-
-            pixmap = QPixmap.fromImage(qimg)
-            self.ui.openGLWidgetImageCam1.setPixmap(pixmap)
+            # シグナルの引数ではなく mailbox の最新フレームを表示（前フレームはウィジェットがプールへ返す）
+            t0 = time.perf_counter()
+            frame = worker.take_frame()
+            if frame is None:
+                return
+            widget = self.ui.openGLWidgetImageCam1
+            widget.setFrame(frame, worker.frame_pool.release)
+            worker.report_display_cost(time.perf_counter() - t0 + widget.last_paint_sec)
 
         except Exception as e:
             self.ui.textEditLogCam1.append(f"[Cam1] 表示エラー: {e}")
 
 
     def update_liveview_cam2(self, img_np):
+        worker = self.live_worker_cam2
+        if worker is None:
+            return
         try:
-            h, w = img_np.shape[:2]
-
-            if img_np.ndim == 2:
-                qimg = QImage(img_np.data, w, h, QImage.Format_Grayscale8)
-
-            elif img_np.ndim == 3 and img_np.shape[2] == 3:
-                img_rgb = img_np[:, :, ::-1].copy()  # BGR→RGB
-                qimg = QImage(img_rgb.data, w, h, 3 * w, QImage.Format_RGB888)
-
-            else:
-                raise ValueError("Unsupported image format")
-
-            pixmap = QPixmap.fromImage(qimg)
-            self.ui.openGLWidgetImageCam2.setPixmap(pixmap)
+            # シグナルの引数ではなく mailbox の最新フレームを表示（前フレームはウィジェットがプールへ返す）
+            t0 = time.perf_counter()
+            frame = worker.take_frame()
+            if frame is None:
+                return
+            widget = self.ui.openGLWidgetImageCam2
+            widget.setFrame(frame, worker.frame_pool.release)
+            worker.report_display_cost(time.perf_counter() - t0 + widget.last_paint_sec)
 
         except Exception as e:
             self.ui.textEditLogCam2.append(f"[Cam2] 表示エラー: {e}")
@@ -757,6 +796,9 @@ class MainWindow(QMainWindow):
         self.hist_dialog_cam1.show()
 
         if self.live_worker_cam1:
+            # ライブ画像の PixelFormat でヒストグラムを取る（10/12bit は LiveView で 16bit の全範囲に広げてある）
+            # Bayer は LiveView で半分解能の 8bit BGR になっているので BGR8 として扱う
+            self.hist_dialog_cam1.set_pixel_format(live_pixel_format(self.ui.comboBoxPixelFormatCam1.currentText()))
             try:
                 self.live_worker_cam1.new_frame.connect(self.hist_dialog_cam1.update_image)
                 print("✅ Cam1 histogram connected to live feed")
@@ -766,6 +808,7 @@ class MainWindow(QMainWindow):
             pixmap = self.ui.openGLWidgetImageCam1.pixmap
             if pixmap:
                 gray_np = self.qpixmap_to_numpy(pixmap)
+                self.hist_dialog_cam1.set_pixel_format('BGR8')  # 表示画像は 8bit BGR に変換済み
                 self.hist_dialog_cam1.update_image(gray_np)
             else:
                 print("⚠️ Cam1: Live画像がありません")
@@ -779,6 +822,9 @@ class MainWindow(QMainWindow):
         self.hist_dialog_cam2.show()
 
         if self.live_worker_cam2:
+            # ライブ画像の PixelFormat でヒストグラムを取る（10/12bit は LiveView で 16bit の全範囲に広げてある）
+            # Bayer は LiveView で半分解能の 8bit BGR になっているので BGR8 として扱う
+            self.hist_dialog_cam2.set_pixel_format(live_pixel_format(self.ui.comboBoxPixelFormatCam2.currentText()))
             try:
                 self.live_worker_cam2.new_frame.connect(self.hist_dialog_cam2.update_image)
                 print("✅ Cam2 histogram connected to live feed")
@@ -788,6 +834,7 @@ class MainWindow(QMainWindow):
             pixmap = self.ui.openGLWidgetImageCam2.pixmap
             if pixmap:
                 gray_np = self.qpixmap_to_numpy(pixmap)
+                self.hist_dialog_cam2.set_pixel_format('BGR8')  # 表示画像は 8bit BGR に変換済み
                 self.hist_dialog_cam2.update_image(gray_np)
             else:
                 print("⚠️ Cam2: Live画像がありません")
@@ -829,6 +876,7 @@ class MainWindow(QMainWindow):
 
 
 if __name__ == "__main__":
+    use_software_opengl()  # FLIR_SOFTWARE_GL=1 でソフトウェア OpenGL（GPU の無い環境向け）
     app = QApplication(sys.argv)
     window = MainWindow()
     window.show()
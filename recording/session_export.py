@@ -0,0 +1,157 @@
+# recording/session_export.py
+
+import argparse
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from camera_control.video_sink import VIDEO_FORMATS
+from recording.session_reader import RecordingSession
+from util.demosaic import demosaic, is_bayer
+from util.pixel_format import pixel_format_info
+
+IMAGE_FORMATS = ('png', 'tif', 'tiff', 'bmp', 'jpg', 'jpeg')
+
+_session_cache = {}
+
+
+def _worker_session(path: str) -> RecordingSession:
+    # プロセスごとに1回だけ開く（メモリマップなので開くコストはほぼゼロ）
+    session = _session_cache.get(path)
+    if session is None:
+        session = RecordingSession(path)
+        _session_cache[path] = session
+    return session
+
+
+def _develop(img: np.ndarray, pixel_format: str, quality: str) -> np.ndarray:
+    """Bayer の生データならフル解像度で色補間する（quality=None なら生データのまま）"""
+    if quality and is_bayer(pixel_format) and img.ndim == 2:
+        return demosaic(img, pixel_format, quality)
+    return img
+
+
+def _iter_developed(session, pixel_format: str, quality: str, workers: int = None):
+    """
+    フレームを順番通りに返しながら、先の数フレームの色補間をスレッドで並行して進める
+    （OpenCV の cvtColor は GIL を解放する。先読みは workers * 2 フレームまで）
+    """
+    if not (quality and is_bayer(pixel_format)):
+        yield from session
+        return
+    workers = workers or os.cpu_count() or 1
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for img in session:
+            pending.append(pool.submit(_develop, img, pixel_format, quality))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _export_chunk(path: str, source_indices, out_dir: str, fmt: str,
+                  pixel_format: str = '', quality: str = None) -> int:
+    session = _worker_session(path)
+    for i in source_indices:
+        img = _develop(session.source_frame(i), pixel_format, quality)
+        filename = os.path.join(out_dir, f"frame_{int(i)}.{fmt}")
+        if not cv2.imwrite(filename, img):
+            raise IOError(f"cv2.imwrite failed: {filename}")
+    return len(source_indices)
+
+
+def _to_uint8(img: np.ndarray, pixel_format: str = '') -> np.ndarray:
+    if img.dtype == np.uint8:
+        return img
+    # 10/12bit は uint16 の下位ビットに入っているので、PixelFormat のビット深度で落とす
+    bit_depth = pixel_format_info(pixel_format)[2] if pixel_format else 0
+    if bit_depth <= 8:
+        bit_depth = 8 * img.dtype.itemsize
+    return (img >> (bit_depth - 8)).astype(np.uint8)
+
+
+def export_session(session, out_dir: str, fmt: str = 'png', workers: int = None,
+                   chunk_size: int = 64, fps: float = 30.0, demosaic_quality: str = 'ea',
+                   pixel_format: str = None) -> dict:
+    """
+    録画セッション（パスまたは RecordingSession）を画像連番または動画へ書き出す
+    画像はプロセスプールで並列に書き出し、動画は1本のストリームなので順番に書き出す
+    Bayer で録画したセッションはここでフル解像度の色補間を行う（demosaic_quality=None なら生データのまま）
+    pixel_format を渡すと録画時の情報より優先する（PixelFormat が残っていない古い録画用）
+    """
+    if isinstance(session, str):
+        session = RecordingSession(session)
+    pixel_format = pixel_format or session.pixel_format
+    os.makedirs(out_dir, exist_ok=True)
+    fmt = fmt.lower()
+    start = time.perf_counter()
+
+    if fmt in IMAGE_FORMATS:
+        indices = session.source_indices
+        chunks = [indices[i:i + chunk_size] for i in range(0, len(indices), chunk_size)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_export_chunk, session.path, chunk, out_dir, fmt, pixel_format, demosaic_quality)
+                       for chunk in chunks]
+            exported = sum(f.result() for f in futures)
+    elif fmt in VIDEO_FORMATS:
+        exported = 0
+        writer = None
+        filename = os.path.join(out_dir, f"{os.path.basename(os.path.normpath(session.path))}.{fmt}")
+        try:
+            for img in _iter_developed(session, pixel_format, demosaic_quality, workers):
+                img = _to_uint8(img, pixel_format)
+                if writer is None:
+                    h, w = img.shape[:2]
+                    writer = cv2.VideoWriter(filename, cv2.VideoWriter_fourcc(*VIDEO_FORMATS[fmt]),
+                                             fps, (w, h), img.ndim == 3)
+                    if not writer.isOpened():
+                        raise IOError(f"cv2.VideoWriter could not open {filename} ({VIDEO_FORMATS[fmt]})")
+                writer.write(img)
+                exported += 1
+        finally:
+            if writer is not None:
+                writer.release()
+    else:
+        raise ValueError(f"Unsupported export format: {fmt}")
+
+    elapsed = time.perf_counter() - start
+    return {
+        'frames': exported,
+        'elapsed_sec': elapsed,
+        'fps': exported / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="録画セッション（.fcr / 画像フォルダ）を画像連番・動画へ書き出す")
+    parser.add_argument('source', help="録画フォルダまたは .fcr ファイル")
+    parser.add_argument('out_dir', help="出力先フォルダ")
+    parser.add_argument('--format', default='png', help="png / tiff / bmp / jpg / mp4 / avi / mkv")
+    parser.add_argument('--start', type=int, default=None, help="開始フレーム番号")
+    parser.add_argument('--stop', type=int, default=None, help="終了フレーム番号（含まない）")
+    parser.add_argument('--start-sec', type=float, default=None, help="開始時刻（先頭フレームからの秒）")
+    parser.add_argument('--end-sec', type=float, default=None, help="終了時刻（先頭フレームからの秒）")
+    parser.add_argument('--workers', type=int, default=None, help="並列プロセス数")
+    parser.add_argument('--fps', type=float, default=30.0, help="動画出力時のFPS")
+    parser.add_argument('--demosaic', default='ea', choices=['ea', 'bilinear', 'vng', 'none'],
+                        help="Bayer 録画の色補間（none なら生データのまま書き出す）")
+    parser.add_argument('--pixel-format', default=None, help="録画時の PixelFormat（記録が無い古い録画用）")
+    args = parser.parse_args()
+
+    session = RecordingSession(args.source).slice_frames(args.start, args.stop)
+    if args.start_sec is not None or args.end_sec is not None:
+        session = session.slice_time(args.start_sec, args.end_sec)
+
+    stats = export_session(session, args.out_dir, fmt=args.format, workers=args.workers, fps=args.fps,
+                           demosaic_quality=None if args.demosaic == 'none' else args.demosaic,
+                           pixel_format=args.pixel_format)
+    print(f"[Export] {stats['frames']} frames in {stats['elapsed_sec']:.2f}s ({stats['fps']:.1f} fps)")
+
+
+if __name__ == '__main__':
+    main()
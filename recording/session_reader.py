@@ -0,0 +1,244 @@
+# recording/session_reader.py
+
+import csv
+import json
+import os
+import re
+
+import cv2
+import numpy as np
+
+from camera_control.drop_report import DROP_REPORT_FILENAME
+from camera_control.frame_container import CONTAINER_EXTENSION, FrameContainerReader, chunk_paths
+from camera_control.frame_writer import FRAME_INDEX_FILENAME
+from camera_control.video_sink import TIMESTAMPS_SUFFIX, VIDEO_FORMATS, video_paths
+from util.demosaic import is_bayer
+from util.pixel_format import pixel_format_info
+
+
+def _recorded_pixel_format(folder: str) -> str:
+    # 画像・動画ファイルには PixelFormat が残らないので、録画時の欠落レポートから読む（無ければ不明）
+    try:
+        with open(os.path.join(folder, DROP_REPORT_FILENAME), encoding='utf-8') as f:
+            return json.load(f).get('pixel_format', '')
+    except (OSError, ValueError):
+        return ''
+
+
+class _ContainerSource:
+    """.fcr コンテナ（メモリマップ、ゼロコピー）"""
+
+    kind = 'container'
+
+    def __init__(self, path: str):
+        self.reader = FrameContainerReader(path, prefix='recording')
+        self.frame_ids = np.asarray(self.reader.frame_ids, dtype=np.int64)
+        self.timestamps = np.asarray(self.reader.timestamps, dtype=np.int64)
+        self.pixel_format = self.reader.header(0)['pixel_format'] if len(self.reader) else ''
+
+    def __len__(self):
+        return len(self.reader)
+
+    def frame(self, i: int) -> np.ndarray:
+        return self.reader.frame(i)
+
+
+class _ImageFolderSource:
+    """
+    frame_{n}.{ext} 形式の画像フォルダ（frames.csv があればディレクトリ走査しない）
+    単発撮影の frame_{n}.fcr（1フレームだけのコンテナ）もここで読む
+    """
+
+    kind = 'images'
+
+    def __init__(self, folder: str):
+        self.folder = folder
+        index_path = os.path.join(folder, FRAME_INDEX_FILENAME)
+        if os.path.exists(index_path):
+            with open(index_path, newline='') as f:
+                rows = list(csv.DictReader(f))
+            self.filenames = [row['filename'] for row in rows]
+            self.frame_ids = np.array([int(row['frame_id']) for row in rows], dtype=np.int64)
+            self.timestamps = np.array([int(row['timestamp']) for row in rows], dtype=np.int64)
+        else:
+            # 旧形式の録画：ファイル名の連番でソートし、タイムスタンプは無し
+            pattern = re.compile(r'frame_(\d+)\.\w+$')
+            numbered = []
+            for name in os.listdir(folder):
+                m = pattern.match(name)
+                if m:
+                    numbered.append((int(m.group(1)), name))
+            numbered.sort()
+            self.filenames = [name for _, name in numbered]
+            self.frame_ids = np.array([n for n, _ in numbered], dtype=np.int64)
+            self.timestamps = np.zeros(len(numbered), dtype=np.int64)
+        self.pixel_format = _recorded_pixel_format(folder)
+
+    def __len__(self):
+        return len(self.filenames)
+
+    def frame(self, i: int) -> np.ndarray:
+        path = os.path.join(self.folder, self.filenames[i])
+        if path.endswith(f".{CONTAINER_EXTENSION}"):
+            reader = FrameContainerReader(path)
+            try:
+                return np.array(reader.frame(0))
+            finally:
+                reader.close()
+        img = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+        if img is None:
+            raise IOError(f"Failed to read frame: {path}")
+        return img
+
+
+class _VideoSource:
+    """
+    動画シンクで録画した recording.{mkv,avi,mp4} と recording.timestamps.csv
+    順番に読む場合はデコードを続けるだけで、飛び飛びに読む場合だけシークする
+    フレームは録画時に 8bit へ変換済み（Bayer も色補間済み）
+    """
+
+    kind = 'video'
+    pixel_format = ''
+
+    def __init__(self, video_path: str, timestamps_path: str):
+        self.video_path = video_path
+        with open(timestamps_path, newline='') as f:
+            rows = list(csv.DictReader(f))
+        self.frame_ids = np.array([int(row['frame_id']) for row in rows], dtype=np.int64)
+        self.timestamps = np.array([int(row['timestamp']) for row in rows], dtype=np.int64)
+        self._capture = None
+        self._next = 0
+        # VideoCapture は常に BGR で返すので、Mono で録画したもの（録画時の PixelFormat で判断）は1チャンネルに戻す
+        recorded = _recorded_pixel_format(os.path.dirname(video_path))
+        self._gray = bool(recorded) and not is_bayer(recorded) and pixel_format_info(recorded)[0] == 1
+
+    def __len__(self):
+        return len(self.frame_ids)
+
+    def frame(self, i: int) -> np.ndarray:
+        if self._capture is None:
+            self._capture = cv2.VideoCapture(self.video_path)
+        if i != self._next:
+            self._capture.set(cv2.CAP_PROP_POS_FRAMES, i)
+        ok, img = self._capture.read()
+        if not ok:
+            raise IOError(f"Failed to read frame {i}: {self.video_path}")
+        self._next = i + 1
+        if self._gray and img.ndim == 3:
+            img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        return img
+
+
+def _find_video(path: str):
+    """録画フォルダ（または動画ファイル）から (動画, タイムスタンプ CSV) を探す（無ければ None）"""
+    if os.path.isfile(path):
+        base, ext = os.path.splitext(path)
+        timestamps = base + TIMESTAMPS_SUFFIX
+        if ext[1:] in VIDEO_FORMATS and os.path.exists(timestamps):
+            return path, timestamps
+        return None
+    for fmt in VIDEO_FORMATS:
+        video, timestamps = video_paths(path, fmt)
+        if os.path.exists(video) and os.path.exists(timestamps):
+            return video, timestamps
+    return None
+
+
+def _open_source(path: str):
+    video = _find_video(path)
+    if video is not None:
+        return _VideoSource(*video)
+    if os.path.isfile(path):
+        ext = os.path.splitext(path)[1][1:]
+        if ext == CONTAINER_EXTENSION:
+            return _ContainerSource(path)
+        if ext in VIDEO_FORMATS:
+            raise FileNotFoundError(f"Timestamps file not found for video: "
+                                    f"{os.path.splitext(path)[0] + TIMESTAMPS_SUFFIX}")
+        raise ValueError(f"Unsupported recording file: {path}")
+    # 録画のチャンク（recording_00000.fcr …）があるフォルダだけをコンテナとして開く
+    if chunk_paths(path):
+        return _ContainerSource(path)
+    return _ImageFolderSource(path)
+
+
+class RecordingSession:
+    """
+    録画セッション（.fcr コンテナまたは画像フォルダ）を遅延読み込みで扱うリーダ
+    フレームはアクセスされた時点で読み込まれ、コンテナの場合はメモリマップ上のゼロコピービューになる
+    スライスしても新しいフレームは読み込まず、インデックスだけを持つ部分セッションを返す
+    """
+
+    def __init__(self, path: str, _source=None, _indices=None):
+        self.path = path
+        self._source = _source if _source is not None else _open_source(path)
+        self._indices = np.arange(len(self._source)) if _indices is None else _indices
+
+    @property
+    def kind(self) -> str:
+        return self._source.kind
+
+    @property
+    def pixel_format(self) -> str:
+        """録画時の PixelFormat（Bayer なら生データのまま保存されている。不明なら ''）"""
+        return self._source.pixel_format
+
+    @property
+    def source_indices(self) -> np.ndarray:
+        """セッション内の各フレームが元の録画の何番目か"""
+        return self._indices
+
+    @property
+    def frame_ids(self) -> np.ndarray:
+        return self._source.frame_ids[self._indices]
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self._source.timestamps[self._indices]
+
+    def __len__(self):
+        return len(self._indices)
+
+    def frame(self, i: int) -> np.ndarray:
+        return self._source.frame(int(self._indices[i]))
+
+    def source_frame(self, source_index: int) -> np.ndarray:
+        """元の録画での番号を指定してフレームを返す"""
+        return self._source.frame(int(source_index))
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return self._subset(self._indices[key])
+        return self.frame(key)
+
+    def __iter__(self):
+        for i in self._indices:
+            yield self._source.frame(int(i))
+
+    def _subset(self, indices) -> "RecordingSession":
+        return RecordingSession(self.path, _source=self._source, _indices=np.asarray(indices))
+
+    # ---------------------------------------------------------
+    # 範囲指定
+    # ---------------------------------------------------------
+    def slice_frames(self, start: int = None, stop: int = None, step: int = None) -> "RecordingSession":
+        """フレーム番号の範囲で部分セッションを返す"""
+        return self._subset(self._indices[start:stop:step])
+
+    def slice_time(self, start_sec: float = None, end_sec: float = None) -> "RecordingSession":
+        """
+        先頭フレームからの経過時間（カメラタイムスタンプ基準、秒）の範囲で部分セッションを返す
+        end_sec は含まない
+        """
+        ts = self.timestamps
+        if len(ts) == 0:
+            return self._subset(self._indices[:0])
+        rel = ts - ts[0]
+        lo = 0 if start_sec is None else np.searchsorted(rel, int(start_sec * 1e9), side='left')
+        hi = len(rel) if end_sec is None else np.searchsorted(rel, int(end_sec * 1e9), side='left')
+        return self._subset(self._indices[lo:hi])
+
+
+def open_session(path: str) -> RecordingSession:
+    return RecordingSession(path)
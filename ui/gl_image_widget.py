@@ -1,39 +1,230 @@
+import os
+import time
+
+import numpy as np
 from PySide6.QtOpenGLWidgets import QOpenGLWidget
-from PySide6.QtGui import QPainter, QPixmap, QPaintEvent
-from PySide6.QtCore import Qt
+from PySide6.QtGui import QPainter, QPixmap, QImage
+from PySide6.QtCore import Qt, QRect, QCoreApplication
+
+try:
+    from OpenGL import GL
+except ImportError:  # PyOpenGL が無い環境では QPainter 描画にフォールバック
+    GL = None
+
+
+def use_software_opengl(force: bool = None):
+    """
+    GPU の無い環境（ヘッドレスのテスト機など）向けにソフトウェア OpenGL（Mesa llvmpipe / opengl32sw）を使う
+    QApplication を作る前に呼ぶこと。force=None なら FLIR_SOFTWARE_GL=1 のときだけ有効
+    """
+    if force is None:
+        force = os.environ.get('FLIR_SOFTWARE_GL', '0').lower() in ('1', 'true', 'yes')
+    if not force:
+        return False
+    os.environ.setdefault('LIBGL_ALWAYS_SOFTWARE', '1')
+    QCoreApplication.setAttribute(Qt.AA_UseSoftwareOpenGL)
+    return True
+
+
+def frame_to_qimage(frame: np.ndarray) -> QImage:
+    """
+    NumPy 配列をコピーせずに包む QImage を作る（QImage は frame のメモリを参照するだけ）
+    Mono8 → Grayscale8 / Mono16 → Grayscale16 / BGR8 → BGR888
+    """
+    if frame.ndim == 2 and frame.dtype == np.uint8:
+        fmt = QImage.Format_Grayscale8
+    elif frame.ndim == 2 and frame.dtype == np.uint16:
+        fmt = QImage.Format_Grayscale16
+    elif frame.ndim == 3 and frame.shape[2] == 3 and frame.dtype == np.uint8:
+        fmt = QImage.Format_BGR888
+    else:
+        raise ValueError(f"Unsupported image format: shape={frame.shape}, dtype={frame.dtype}")
+    if frame.strides[-1] != frame.itemsize or (frame.ndim == 3 and frame.strides[1] != 3):
+        raise ValueError("Frame rows must be contiguous")
+    h, w = frame.shape[:2]
+    return QImage(frame.data, w, h, frame.strides[0], fmt)
+
+
+def _texture_format(frame: np.ndarray):
+    """(internal format, format, type) — Mono は LUMINANCE なのでシェーダ無しでグレー表示になる"""
+    if frame.ndim == 2 and frame.dtype == np.uint8:
+        return GL.GL_LUMINANCE8, GL.GL_LUMINANCE, GL.GL_UNSIGNED_BYTE
+    if frame.ndim == 2 and frame.dtype == np.uint16:
+        return GL.GL_LUMINANCE16, GL.GL_LUMINANCE, GL.GL_UNSIGNED_SHORT
+    return GL.GL_RGB8, GL.GL_BGR, GL.GL_UNSIGNED_BYTE
+
 
 class ImageGLWidget(QOpenGLWidget):
     """
-    QPixmap を受け取って OpenGL 上に描画するカスタムWidget
+    QPixmap / NumPy フレームを受け取って OpenGL 上に描画するカスタムWidget
     Qt Designer で QOpenGLWidget を配置し、
     promote してこのクラスを割り当てることで使える。
+
+    フレームは常駐テクスチャへアップロードし（同じサイズなら glTexSubImage2D で上書き）、
+    拡大縮小・レターボックスは GL のビューポートとテクスチャの線形補間で行うので、
+    再描画のコストはセンサー解像度に依存しない。
+    PyOpenGL が無い・GL の初期化に失敗した場合は QPainter.drawImage にフォールバックする
     """
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.pixmap = None
+        self._frame = None
+        self._release = None
+        self._target = QRect()
+        self._use_texture = GL is not None
+        self._texture = None
+        self._texture_key = None
+        self._dirty = False
+        self.uploads = 0
+        self.last_paint_sec = 0.0  # 直近の描画時間（LiveView の表示間隔の調整に使う）
+
+    @property
+    def pixmap(self):
+        """表示中の画像（ヒストグラムなど表示外の用途向け。呼ぶたびに変換が入る）"""
+        if self._frame is None:
+            return None
+        return QPixmap.fromImage(frame_to_qimage(self._frame))
 
     def setPixmap(self, pixmap: QPixmap):
-        self.pixmap = pixmap
+        image = pixmap.toImage().convertToFormat(QImage.Format_BGR888)
+        ptr = image.constBits()
+        frame = np.frombuffer(ptr, np.uint8, count=image.sizeInBytes())
+        frame = frame.reshape((image.height(), image.bytesPerLine()))[:, :image.width() * 3]
+        self._set_frame(np.ascontiguousarray(frame).reshape((image.height(), image.width(), 3)), None)
+
+    def setFrame(self, frame: np.ndarray, release=None):
+        """
+        NumPy フレームを表示する。frame は次のフレームが来るまで参照し続けるので書き換えないこと
+        release を渡すと、表示を差し替えたときに前のフレームを release(frame) で返す（LiveFramePool.release など）
+        """
+        frame_to_qimage(frame)  # 対応フォーマットの確認
+        self._set_frame(frame, release)
+
+    def clearFrame(self):
+        self._set_frame(None, None)
+
+    def _set_frame(self, frame, release):
+        prev_frame, prev_release = self._frame, self._release
+        resized = (frame is None or prev_frame is None or frame.shape[:2] != prev_frame.shape[:2])
+        self._frame, self._release = frame, release
+        self._dirty = True
+        if resized:
+            self._update_target()
         self.update()
+        if prev_release is not None and prev_frame is not None and prev_frame is not frame:
+            prev_release(prev_frame)
 
-    def paintEvent(self, event: QPaintEvent):
-        if self.pixmap:
-            painter = QPainter(self)
-            painter.fillRect(self.rect(), Qt.black)
-            painter.setRenderHint(QPainter.SmoothPixmapTransform)
+    def _update_target(self):
+        """アスペクト比を保ったまま中央に fit させる描画先（フレームサイズかウィジェットサイズが変わったときだけ計算）"""
+        if self._frame is None:
+            self._target = QRect()
+            return
+        h, w = self._frame.shape[:2]
+        scale = min(self.width() / w, self.height() / h)
+        tw, th = int(w * scale), int(h * scale)
+        self._target = QRect((self.width() - tw) // 2, (self.height() - th) // 2, tw, th)
+
+    # ---------------------------------------------------------
+    # GL
+    # ---------------------------------------------------------
+    def initializeGL(self):
+        if not self._use_texture:
+            print("[ImageGLWidget] PyOpenGL not available, using QPainter rendering")
+            return
+        try:
+            self._texture = GL.glGenTextures(1)
+            GL.glBindTexture(GL.GL_TEXTURE_2D, self._texture)
+            GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MIN_FILTER, GL.GL_LINEAR)
+            GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MAG_FILTER, GL.GL_LINEAR)
+            GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_WRAP_S, GL.GL_CLAMP_TO_EDGE)
+            GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_WRAP_T, GL.GL_CLAMP_TO_EDGE)
+            GL.glBindTexture(GL.GL_TEXTURE_2D, 0)
+            self._texture_key = None
+            self._dirty = True
+            self.context().aboutToBeDestroyed.connect(self._cleanup_gl)
+        except Exception as e:
+            print(f"[ImageGLWidget] GL texture init failed, using QPainter rendering: {e}")
+            self._use_texture = False
+            self._texture = None
 
-            # ウィジェットサイズ
-            widget_rect = self.rect()
+    def _cleanup_gl(self):
+        if self._texture is None:
+            return
+        self.makeCurrent()
+        GL.glDeleteTextures([self._texture])
+        self._texture = None
+        self._texture_key = None
+        self.doneCurrent()
 
-            # pixmap のアスペクト比を保ったまま fit させたサイズを計算
-            scaled_pixmap = self.pixmap.scaled(
-                widget_rect.size(),
-                Qt.KeepAspectRatio,
-                Qt.SmoothTransformation
-            )
+    def resizeGL(self, w: int, h: int):
+        self._update_target()
 
-            # 中央に配置する位置を計算
-            x = (widget_rect.width() - scaled_pixmap.width()) // 2
-            y = (widget_rect.height() - scaled_pixmap.height()) // 2
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._update_target()
 
-            painter.drawPixmap(x, y, scaled_pixmap)
+    def paintGL(self):
+        t0 = time.perf_counter()
+        if not self._use_texture:
+            self._paint_fallback()
+        else:
+            try:
+                self._paint_texture()
+            except Exception as e:
+                print(f"[ImageGLWidget] GL draw failed, using QPainter rendering: {e}")
+                self._use_texture = False
+                self._paint_fallback()
+        self.last_paint_sec = time.perf_counter() - t0
+
+    def _upload(self, frame: np.ndarray):
+        h, w = frame.shape[:2]
+        internal, fmt, gl_type = _texture_format(frame)
+        key = (w, h, internal)
+        GL.glPixelStorei(GL.GL_UNPACK_ALIGNMENT, 1)
+        GL.glPixelStorei(GL.GL_UNPACK_ROW_LENGTH, frame.strides[0] // frame.strides[1])
+        if key == self._texture_key:
+            GL.glTexSubImage2D(GL.GL_TEXTURE_2D, 0, 0, 0, w, h, fmt, gl_type, frame)
+        else:
+            GL.glTexImage2D(GL.GL_TEXTURE_2D, 0, internal, w, h, 0, fmt, gl_type, frame)
+            self._texture_key = key
+        GL.glPixelStorei(GL.GL_UNPACK_ROW_LENGTH, 0)
+        self.uploads += 1
+
+    def _paint_texture(self):
+        ratio = self.devicePixelRatio()
+        GL.glViewport(0, 0, int(self.width() * ratio), int(self.height() * ratio))
+        GL.glClearColor(0.0, 0.0, 0.0, 1.0)
+        GL.glClear(GL.GL_COLOR_BUFFER_BIT)
+        if self._frame is None or self._target.isEmpty():
+            return
+
+        GL.glBindTexture(GL.GL_TEXTURE_2D, self._texture)
+        if self._dirty:
+            self._upload(self._frame)
+            self._dirty = False
+
+        # レターボックス：描画先の矩形だけをビューポートにして全面の四角形を貼る（GL は左下原点）
+        t = self._target
+        GL.glViewport(int(t.x() * ratio), int((self.height() - t.y() - t.height()) * ratio),
+                      int(t.width() * ratio), int(t.height() * ratio))
+        GL.glMatrixMode(GL.GL_PROJECTION)
+        GL.glLoadIdentity()
+        GL.glMatrixMode(GL.GL_MODELVIEW)
+        GL.glLoadIdentity()
+        GL.glEnable(GL.GL_TEXTURE_2D)
+        GL.glColor4f(1.0, 1.0, 1.0, 1.0)
+        GL.glBegin(GL.GL_TRIANGLE_STRIP)
+        GL.glTexCoord2f(0.0, 1.0); GL.glVertex2f(-1.0, -1.0)
+        GL.glTexCoord2f(1.0, 1.0); GL.glVertex2f(1.0, -1.0)
+        GL.glTexCoord2f(0.0, 0.0); GL.glVertex2f(-1.0, 1.0)
+        GL.glTexCoord2f(1.0, 0.0); GL.glVertex2f(1.0, 1.0)
+        GL.glEnd()
+        GL.glDisable(GL.GL_TEXTURE_2D)
+        GL.glBindTexture(GL.GL_TEXTURE_2D, 0)
+
+    def _paint_fallback(self):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), Qt.black)
+        if self._frame is not None:
+            painter.setRenderHint(QPainter.SmoothPixmapTransform)
+            painter.drawImage(self._target, frame_to_qimage(self._frame))
+        painter.end()
@@ -1,17 +1,30 @@
 import numpy as np
-from PySide6.QtCore import QTimer
 from PySide6.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QLabel, QCheckBox
 import pyqtgraph as pg
 
+from ui.histogram_worker import HistogramWorker
+
+# ライブ表示中にこの画素数を超えるフレームは間引いてヒストグラムを求める
+LIVE_MAX_PIXELS = 2_000_000
+
 
 class HistogramDialog(QDialog):
-    def __init__(self, image: np.ndarray = None, title: str = "Histogram", parent=None):
+    """
+    ヒストグラム・統計値の表示
+    計算は HistogramWorker（別スレッド）が行い、このダイアログは結果の描画だけを行う
+    """
+    def __init__(self, image: np.ndarray = None, title: str = "Histogram", parent=None,
+                 max_refresh_hz: float = 10.0, max_pixels: int = LIVE_MAX_PIXELS):
         super().__init__(parent)
         self.setWindowTitle(title)
         self.setMinimumSize(640, 500)
 
         self.image = image
         self.log_scale = False
+        self.result = None
+        self.curves = {}
+        self.worker = HistogramWorker(max_refresh_hz=max_refresh_hz, max_pixels=max_pixels, parent=self)
+        self.worker.result_ready.connect(self.on_result)
 
         # ======== メインレイアウト ========
         layout = QVBoxLayout()
@@ -52,15 +65,8 @@ class HistogramDialog(QDialog):
             "b": (70, 70, 220, 80),
         }
 
-        # ======== タイマー（1秒ごとに更新） ========
-        self.timer = QTimer(self)
-        self.timer.setInterval(1000)
-        self.timer.timeout.connect(self.refresh_display)
-        self.timer.start()
-
         if self.image is not None:
-            self.plot_histogram()
-            self.update_stats()
+            self.worker.submit(self.image)
 
     # ======== Matplotlib風スタイル ========
     def apply_matplotlib_style(self, plot_widget: pg.PlotWidget):
@@ -80,134 +86,124 @@ class HistogramDialog(QDialog):
 
     # ======== LiveView更新 ========
     def update_image(self, image: np.ndarray):
+        """最新フレームをワーカーへ渡すだけ（計算・描画は max_refresh_hz 以下の頻度で非同期に行う）"""
         self.image = image
+        self.worker.submit(image)
+
+    def set_max_refresh_hz(self, hz: float):
+        self.worker.set_max_refresh_hz(hz)
+
+    def set_pixel_format(self, pixel_format: str, bins: int = None):
+        """ヒストグラムのビット深度（飽和判定の最大値）とビン数を PixelFormat に合わせる（例：Mono12p → 0–4095, 4096ビン）"""
+        self.worker.set_pixel_format(pixel_format, bins)
+
+    def on_result(self, result: dict):
+        self.result = result
+        self.refresh_display()
 
     def refresh_display(self):
-        if self.image is not None:
-            self.plot_histogram()
-            self.update_stats()
+        if self.result is None:
+            return
+        self.plot_histogram()
+        self.update_stats()
+
+    # ======== ワーカーの開始・停止（表示中だけ動かす） ========
+    def showEvent(self, event):
+        if not self.worker.isRunning():
+            self.worker.start()
+            if self.image is not None:
+                self.worker.submit(self.image)
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.worker.stop()
+        super().hideEvent(event)
+
+    def closeEvent(self, event):
+        self.worker.stop()
+        super().closeEvent(event)
 
     def toggle_log_scale(self):
         self.log_scale = self.cb_log.isChecked()
         self.plot_histogram()
 
-    def check_saturation(self, img):
+    def check_saturation(self, result: dict) -> str:
+        """最大値（PixelFormat のビット深度から決まる）・0 に張り付いた画素から飽和・暗部飽和を判定した1行"""
         sat_info = []
-
-        # === グレースケール ===
-        if img.ndim == 2:
-            max_val = img.max()
-            min_val = img.min()
-            if max_val == 255:
-                sat_info.append("Gray: 飽和あり（max=255）")
-            elif min_val == 0:
-                sat_info.append("Gray: 暗部飽和あり（min=0）")
+        top = result['max_value']
+        for name, sat in result['saturation'].items():
+            if name == 'Gray(L)':
+                continue
+            stats = result['stats'][name]
+            if sat['high']:
+                sat_info.append(f"{name}: 飽和あり（max={top}, {sat['high']}px）")
+            elif sat['low']:
+                sat_info.append(f"{name}: 暗部飽和あり（min=0, {sat['low']}px）")
             else:
-                sat_info.append(f"Gray: OK（min={min_val}, max={max_val}）")
-
-        # === カラー画像（BGRまたはRGB） ===
-        elif img.ndim == 3 and img.shape[2] == 3:
-            channels = {"R": 2, "G": 1, "B": 0}
-            for name, idx in channels.items():
-                ch = img[:, :, idx]
-                max_val = ch.max()
-                min_val = ch.min()
-                if max_val == 255:
-                    sat_info.append(f"{name}: 飽和あり（max=255）")
-                elif min_val == 0:
-                    sat_info.append(f"{name}: 暗部飽和あり（min=0）")
-                else:
-                    sat_info.append(f"{name}: OK（min={min_val}, max={max_val}）")
-
-        print("［飽和チェック］ " + " / ".join(sat_info))
+                sat_info.append(f"{name}: OK（min={stats['min']}, max={stats['max']}）")
+        return "［飽和チェック］ " + " / ".join(sat_info)
 
     # ======== ヒストグラム描画 ========
+    def _checkbox_for(self, name: str) -> QCheckBox:
+        return {'R': self.cb_r, 'G': self.cb_g, 'B': self.cb_b}.get(name, self.cb_gray)
+
+    def _curve(self, name: str):
+        """チャンネルごとの PlotDataItem（初回だけ作り、以降は setData で更新）"""
+        curve = self.curves.get(name)
+        if curve is None:
+            color = self.colors.get(name.lower(), self.colors["gray"])
+            curve = self.plot_widget.plot(
+                pen=pg.mkPen(color[:3], width=1.5),
+                brush=pg.mkBrush(color),
+                fillLevel=0,
+                name=name,
+            )
+            self.curves[name] = curve
+        return curve
+
     def plot_histogram(self):
-        if self.image is None:
+        if self.result is None:
             return
 
-        img = self.image
-        self.check_saturation(img)
-
-        self.plot_widget.clear()
         self.plot_widget.setLogMode(False, self.log_scale)
-
-        def safe_hist(data):
-            hist, bins = np.histogram(data, bins=256, range=(0, 255))
-            if self.log_scale:
-                hist = np.clip(hist, 1, None)
-            return hist, bins
-
-        # ==== グレースケール ====
-        if img.ndim == 2:
-            if self.cb_gray.isChecked():
-                hist, bins = safe_hist(img)
-                self.plot_widget.plot(
-                    bins[:-1],
-                    hist,
-                    pen=pg.mkPen(self.colors["gray"][:3], width=1.5),
-                    brush=pg.mkBrush(self.colors["gray"]),
-                    fillLevel=0,
-                    name="Gray",
-                )
-
-        # ==== カラー（BGR対応） ====
-        elif img.ndim == 3 and img.shape[2] == 3:
-            if self.cb_r.isChecked():
-                hist, bins = safe_hist(img[:, :, 2])  # R
-                self.plot_widget.plot(bins[:-1], hist, pen=pg.mkPen(self.colors["r"][:3], width=1.5),
-                                      brush=pg.mkBrush(self.colors["r"]), fillLevel=0, name="R")
-            if self.cb_g.isChecked():
-                hist, bins = safe_hist(img[:, :, 1])  # G
-                self.plot_widget.plot(bins[:-1], hist, pen=pg.mkPen(self.colors["g"][:3], width=1.5),
-                                      brush=pg.mkBrush(self.colors["g"]), fillLevel=0, name="G")
-            if self.cb_b.isChecked():
-                hist, bins = safe_hist(img[:, :, 0])  # B
-                self.plot_widget.plot(bins[:-1], hist, pen=pg.mkPen(self.colors["b"][:3], width=1.5),
-                                      brush=pg.mkBrush(self.colors["b"]), fillLevel=0, name="B")
-
-            if self.cb_gray.isChecked():
-                gray = 0.299 * img[:, :, 2] + 0.587 * img[:, :, 1] + 0.114 * img[:, :, 0]
-                hist, bins = safe_hist(gray)
-                self.plot_widget.plot(bins[:-1], hist, pen=pg.mkPen(self.colors["gray"][:3], width=1.5),
-                                      brush=pg.mkBrush(self.colors["gray"]), fillLevel=0, name="Gray (L)")
+        bins = np.arange(self.result['bins']) * self.result['bin_width']
+        channels = self.result['channels']
+
+        for name, curve in self.curves.items():
+            if name not in channels:
+                curve.setVisible(False)
+
+        for name, hist in channels.items():
+            curve = self._curve(name)
+            visible = self._checkbox_for(name).isChecked()
+            curve.setVisible(visible)
+            if visible:
+                if self.log_scale:
+                    hist = np.clip(hist, 1, None)
+                curve.setData(bins, hist)
 
     def update_histogram(self):
         self.plot_histogram()
         self.update_stats()
 
     def update_stats(self):
-        if self.image is None:
+        if self.result is None:
             self.label_stats.setText("（画像なし）")
             return
 
-        img = self.image
         text_lines = []
-
-        def stats_line(label, data):
-            data = data.astype(np.float32)
-            mean = np.mean(data)
-            median = np.median(data)
-            max_val = np.max(data)
-            min_val = np.min(data)
-            mode_val = int(np.bincount(data.astype(np.uint8).ravel()).argmax())
-            return f"{label:<7s}: μ={mean:6.2f}  med={median:6.2f}  mode={mode_val:3d}  min={min_val:3.0f}  max={max_val:3.0f}"
-
-        if img.ndim == 2:
-            if self.cb_gray.isChecked():
-                text_lines.append(stats_line("Gray", img))
-        elif img.ndim == 3 and img.shape[2] == 3:
-            if self.cb_r.isChecked():
-                text_lines.append(stats_line("R", img[:, :, 2]))  # R
-            if self.cb_g.isChecked():
-                text_lines.append(stats_line("G", img[:, :, 1]))  # G
-            if self.cb_b.isChecked():
-                text_lines.append(stats_line("B", img[:, :, 0]))  # B
-            if self.cb_gray.isChecked():
-                gray = 0.299 * img[:, :, 2] + 0.587 * img[:, :, 1] + 0.114 * img[:, :, 0]
-                text_lines.append(stats_line("Gray(L)", gray))
+        for name, st in self.result['stats'].items():
+            if not self._checkbox_for(name).isChecked():
+                continue
+            text_lines.append(f"{name:<7s}: μ={st['mean']:8.2f}  med={st['median']:8.2f}  mode={st['mode']:5d}  "
+                              f"min={st['min']:5d}  max={st['max']:5d}")
 
         if text_lines:
+            if self.result['step'] > 1:
+                text_lines.append(f"（1/{self.result['step']} に間引いて計算）")
+            if self.result['bit_depth'] > 8:
+                text_lines.append(f"（{self.result['bit_depth']}bit, {self.result['bins']} bins）")
+            text_lines.append(self.check_saturation(self.result))
             self.label_stats.setText("\n".join(text_lines))
         else:
             self.label_stats.setText("（表示チャンネルなし）")
@@ -0,0 +1,163 @@
+import math
+
+import numpy as np
+
+from util.pixel_format import pixel_format_info
+
+# ITU-R BT.601 の輝度係数を 8bit 固定小数点にしたもの（77 + 150 + 29 = 256）
+_LUMA_WEIGHTS = (29, 150, 77)  # B, G, R
+_LUMA_SHIFT = 8
+
+# 既定のビン数の上限（12bit までは1階調1ビン、16bit は 16階調ずつ）
+DEFAULT_MAX_BINS = 4096
+
+
+def histogram_stats(hist: np.ndarray, bin_width: int = 1) -> dict:
+    """
+    ヒストグラムから count / mean / median / mode / min / max を求める（画素を再走査しない）
+    bin_width > 1 のときは各ビンの下端の値で返す（mean はビン中央で計算した近似値）
+    """
+    total = int(hist.sum())
+    if total == 0:
+        return {'count': 0, 'mean': 0.0, 'median': 0.0, 'mode': 0, 'min': 0, 'max': 0}
+    nonzero = np.flatnonzero(hist)
+    cumsum = np.cumsum(hist)
+    # 偶数個のときは中央の2値の平均（np.median と同じ）
+    lo = int(np.searchsorted(cumsum, (total - 1) // 2 + 1))
+    hi = int(np.searchsorted(cumsum, total // 2 + 1))
+    centers = np.arange(hist.size, dtype=np.float64) * bin_width + (bin_width - 1) / 2.0
+    return {
+        'count': total,
+        'mean': float(np.dot(hist, centers) / total),
+        'median': (lo + hi) / 2.0 * bin_width,
+        'mode': int(hist.argmax()) * bin_width,
+        'min': int(nonzero[0]) * bin_width,
+        'max': int(nonzero[-1]) * bin_width,
+    }
+
+
+def saturation_info(hist: np.ndarray) -> dict:
+    """最大値・最小値に張り付いた画素数（1階調1ビンのヒストグラムの両端）"""
+    return {'high': int(hist[-1]), 'low': int(hist[0])}
+
+
+def bit_depth_for(pixel_format: str = None, dtype=None) -> int:
+    """PixelFormat 名（分かれば）か配列の dtype から有効ビット深度を決める"""
+    if pixel_format:
+        return pixel_format_info(pixel_format)[2]
+    return np.dtype(dtype).itemsize * 8 if dtype is not None else 8
+
+
+class HistogramEngine:
+    """
+    Mono / BGR 画像のチャンネル別ヒストグラムを np.bincount 1回で求める
+    - カラーは B/G/R/輝度 をビン数ずつずらした1本のインデックス配列にまとめて bincount する
+    - 10/12/16bit は bit_depth に合わせて値を右シフトしてビンに割り当てる（bins は 2 のべき乗）
+    - インデックス用のバッファはフレームサイズが変わらない限り使い回す
+    - max_pixels を指定すると、それを超える画像は縦横同じ間引き率でサブサンプリングする
+      （統計値は近似になる。min/max・飽和画素数も間引いた画素についての値）
+    統計値はヒストグラムから求めるので、フル画像の float 変換や np.median は行わない
+    bit_depth=None なら画像の dtype（uint8 → 8bit、uint16 → 16bit）から決める
+    """
+
+    def __init__(self, max_pixels: int = None, bit_depth: int = None, bins: int = None):
+        self.max_pixels = max_pixels
+        self.bit_depth = bit_depth
+        self.requested_bins = bins
+        self._index = None
+
+    @classmethod
+    def for_pixel_format(cls, pixel_format: str, max_pixels: int = None, bins: int = None):
+        return cls(max_pixels=max_pixels, bit_depth=bit_depth_for(pixel_format), bins=bins)
+
+    def layout(self, dtype) -> tuple:
+        """(bit_depth, bins, shift) — 値 v は v >> shift 番目のビンに入る"""
+        bit_depth = self.bit_depth or bit_depth_for(dtype=dtype)
+        levels = 1 << bit_depth
+        bins = self.requested_bins or min(levels, DEFAULT_MAX_BINS)
+        if bins & (bins - 1) or bins > levels:
+            raise ValueError(f"bins must be a power of two <= {levels}: {bins}")
+        return bit_depth, bins, bit_depth - bins.bit_length() + 1
+
+    def subsample(self, img: np.ndarray):
+        """max_pixels 以下になるよう縦横同じ間隔で間引いたビューと間引き率を返す"""
+        h, w = img.shape[:2]
+        if not self.max_pixels or h * w <= self.max_pixels:
+            return img, 1
+        step = math.ceil(math.sqrt(h * w / self.max_pixels))
+        return img[::step, ::step], step
+
+    def _index_buffer(self, columns: int, pixels: int, dtype) -> np.ndarray:
+        if self._index is None or self._index.shape != (columns, pixels) or self._index.dtype != dtype:
+            self._index = np.empty((columns, pixels), dtype=dtype)
+        return self._index
+
+    def compute(self, img: np.ndarray, luminance: bool = True) -> dict:
+        """
+        {'channels': {名前: ヒストグラム}, 'stats': {名前: 統計}, 'saturation': {名前: 最大値・0 の画素数},
+         'step': 間引き率, 'bit_depth', 'bins', 'bin_width', 'max_value'}
+        チャンネル名は Mono が 'Gray'、カラーが 'R' / 'G' / 'B'（+ luminance=True なら 'Gray(L)'）
+        """
+        if img.dtype not in (np.uint8, np.uint16):
+            raise ValueError(f"HistogramEngine expects uint8 / uint16 images: {img.dtype}")
+        bit_depth, bins, shift = self.layout(img.dtype)
+        max_value = (1 << bit_depth) - 1
+        # 有効ビットより上に値が入りうる（12bit を uint16 で持つなど）ときは最大値で頭打ちにする
+        padded = bit_depth < img.dtype.itemsize * 8
+        view, step = self.subsample(img)
+
+        if view.ndim == 2:
+            data = view.ravel()
+            if padded:
+                data = np.minimum(data, max_value)
+            if shift:
+                data = data >> shift
+            channels = {'Gray': np.bincount(data, minlength=bins)}
+            planes = {'Gray': view}
+
+        elif view.ndim == 3 and view.shape[2] == 3:
+            pixels = view.shape[0] * view.shape[1]
+            columns = 4 if luminance else 3
+            # 8bit は輝度の途中計算（最大 255×256）も uint16 に収まる
+            dtype = np.uint16 if bit_depth <= 8 else np.uint32
+            # チャンネルごとに連続した行にする（index[0]=B, [1]=G, [2]=R, [3]=輝度）
+            index = self._index_buffer(columns, pixels, dtype)
+            bgr = index[:3]
+            bgr[...] = view.reshape(pixels, 3).T
+            if padded:
+                np.minimum(bgr, max_value, out=bgr)
+            if luminance:
+                np.dot(np.array(_LUMA_WEIGHTS, dtype=dtype), bgr, out=index[3])
+                np.right_shift(index[3], _LUMA_SHIFT + shift, out=index[3])
+                index[3] += 3 * bins
+            if shift:
+                np.right_shift(bgr, shift, out=bgr)
+            bgr += np.array([[0], [bins], [2 * bins]], dtype=dtype)
+            hist = np.bincount(index.ravel(), minlength=columns * bins).reshape(columns, bins)
+            channels = {'R': hist[2], 'G': hist[1], 'B': hist[0]}
+            planes = {'R': view[:, :, 2], 'G': view[:, :, 1], 'B': view[:, :, 0]}
+            if luminance:
+                channels['Gray(L)'] = hist[3]
+
+        else:
+            raise ValueError(f"Unsupported image format: shape={img.shape}")
+
+        bin_width = 1 << shift
+        if bin_width == 1:
+            saturation = {name: saturation_info(h) for name, h in channels.items()}
+        else:
+            # ビンが複数階調をまとめているときは、最大値・0 の画素だけを数え直す
+            saturation = {name: {'high': int(np.count_nonzero(plane >= max_value)),
+                                 'low': int(np.count_nonzero(plane == 0))}
+                          for name, plane in planes.items()}
+
+        return {
+            'channels': channels,
+            'stats': {name: histogram_stats(h, bin_width) for name, h in channels.items()},
+            'saturation': saturation,
+            'step': step,
+            'bit_depth': bit_depth,
+            'bins': bins,
+            'bin_width': bin_width,
+            'max_value': max_value,
+        }
@@ -0,0 +1,73 @@
+import threading
+import time
+
+import numpy as np
+from PySide6.QtCore import QThread, Signal
+
+from camera_control.latest_frame_mailbox import LatestFrameMailbox
+from ui.histogram_engine import HistogramEngine
+
+
+class HistogramWorker(QThread):
+    """
+    ヒストグラム・統計値・飽和判定を GUI スレッドの外で計算するワーカー
+    submit() で渡された最新フレームだけを max_refresh_hz 以下の頻度で処理し、
+    結果（チャンネル別ヒストグラムと統計値の dict）だけを result_ready で送る
+    ライブ表示のバッファは次のフレームで上書きされるので、submit() で間引いたコピーを取ってから渡す
+    """
+    result_ready = Signal(object)
+
+    def __init__(self, max_refresh_hz: float = 10.0, max_pixels: int = None, parent=None):
+        super().__init__(parent)
+        self.engine = HistogramEngine(max_pixels=max_pixels)
+        self.mailbox = LatestFrameMailbox()
+        self.min_interval = 1.0 / max_refresh_hz if max_refresh_hz else 0.0
+        self._wakeup = threading.Event()
+        self._running = False
+        self.computed = 0
+
+    def submit(self, image: np.ndarray):
+        """最新フレームを渡す（GUI スレッドから呼んでもすぐ戻る。コピーは max_pixels まで間引いた分だけ）"""
+        view, step = self.engine.subsample(image)
+        self.mailbox.post((np.array(view, copy=True), step))
+        self._wakeup.set()
+
+    def set_pixel_format(self, pixel_format: str, bins: int = None):
+        """ビット深度・ビン数を PixelFormat に合わせる（エンジンごと差し替えるので計算中でも安全）"""
+        self.engine = HistogramEngine.for_pixel_format(pixel_format, max_pixels=self.engine.max_pixels, bins=bins)
+
+    def set_max_refresh_hz(self, hz: float):
+        self.min_interval = 1.0 / hz if hz else 0.0
+
+    def run(self):
+        self._running = True
+        last = 0.0
+        while self._running:
+            self._wakeup.wait(0.5)
+            self._wakeup.clear()
+            if not self._running:
+                break
+
+            wait = self.min_interval - (time.perf_counter() - last)
+            if wait > 0:
+                time.sleep(wait)
+            item = self.mailbox.take()
+            if item is None:
+                continue
+            image, step = item
+
+            last = time.perf_counter()
+            try:
+                result = self.engine.compute(image)
+                result['step'] *= step
+            except Exception as e:
+                print(f"[HistogramWorker] Compute error: {e}")
+                continue
+            result['compute_ms'] = (time.perf_counter() - last) * 1e3
+            self.computed += 1
+            self.result_ready.emit(result)
+
+    def stop(self):
+        self._running = False
+        self._wakeup.set()
+        self.wait()
@@ -245,6 +245,9 @@ class Ui_MainWindow(object):
         self.comboBoxExtensionCam1.addItem("")
         self.comboBoxExtensionCam1.addItem("")
         self.comboBoxExtensionCam1.addItem("")
+        self.comboBoxExtensionCam1.addItem("")
+        self.comboBoxExtensionCam1.addItem("")
+        self.comboBoxExtensionCam1.addItem("")
         self.comboBoxExtensionCam1.setObjectName(u"comboBoxExtensionCam1")
         self.comboBoxExtensionCam1.setGeometry(QRect(260, 570, 151, 21))
         self.comboBoxExtensionCam1.setFont(font)
@@ -253,6 +256,9 @@ class Ui_MainWindow(object):
         self.comboBoxExtensionCam2.addItem("")
         self.comboBoxExtensionCam2.addItem("")
         self.comboBoxExtensionCam2.addItem("")
+        self.comboBoxExtensionCam2.addItem("")
+        self.comboBoxExtensionCam2.addItem("")
+        self.comboBoxExtensionCam2.addItem("")
         self.comboBoxExtensionCam2.setObjectName(u"comboBoxExtensionCam2")
         self.comboBoxExtensionCam2.setGeometry(QRect(770, 570, 151, 21))
         self.comboBoxExtensionCam2.setFont(font)
@@ -574,11 +580,17 @@ class Ui_MainWindow(object):
         self.comboBoxExtensionCam1.setItemText(1, QCoreApplication.translate("MainWindow", u"bmp", None))
         self.comboBoxExtensionCam1.setItemText(2, QCoreApplication.translate("MainWindow", u"jpeg", None))
         self.comboBoxExtensionCam1.setItemText(3, QCoreApplication.translate("MainWindow", u"jpg", None))
+        self.comboBoxExtensionCam1.setItemText(4, QCoreApplication.translate("MainWindow", u"fcr", None))
+        self.comboBoxExtensionCam1.setItemText(5, QCoreApplication.translate("MainWindow", u"mkv", None))
+        self.comboBoxExtensionCam1.setItemText(6, QCoreApplication.translate("MainWindow", u"mp4", None))
 
         self.comboBoxExtensionCam2.setItemText(0, QCoreApplication.translate("MainWindow", u"png", None))
         self.comboBoxExtensionCam2.setItemText(1, QCoreApplication.translate("MainWindow", u"bmp", None))
         self.comboBoxExtensionCam2.setItemText(2, QCoreApplication.translate("MainWindow", u"jpeg", None))
         self.comboBoxExtensionCam2.setItemText(3, QCoreApplication.translate("MainWindow", u"jpg", None))
+        self.comboBoxExtensionCam2.setItemText(4, QCoreApplication.translate("MainWindow", u"fcr", None))
+        self.comboBoxExtensionCam2.setItemText(5, QCoreApplication.translate("MainWindow", u"mkv", None))
+        self.comboBoxExtensionCam2.setItemText(6, QCoreApplication.translate("MainWindow", u"mp4", None))
 
         self.labelExtensionCam2.setText(QCoreApplication.translate("MainWindow", u"Extension", None))
         self.pushButtonSelectSaveFolderCam1.setText(QCoreApplication.translate("MainWindow", u"Select Save Folder ", None))
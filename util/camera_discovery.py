@@ -1,7 +1,7 @@
 
 # util/camera_discovery.py
 
-import PySpin
+from util.spin_backend import PySpin
 
 def list_available_cameras(system, log_func=None):
     """接続されているFLIRカメラのシリアル番号をログ出力する"""
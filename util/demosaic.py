@@ -0,0 +1,114 @@
+# util/demosaic.py
+
+import cv2
+import numpy as np
+
+from util.pixel_format import pixel_format_info
+
+# =========================================================
+# Bayer → BGR の色補間（デモザイク）
+#
+# 録画は Bayer の生データ（BGR8 の 1/3 のバイト数）のまま保存し、色補間は必要な所でだけ行う
+#   demosaic_half : 2x2 ブロックを1画素にまとめる半分解能の補間（LiveView・ヒストグラム用、補間計算なし）
+#   demosaic      : OpenCV によるフル解像度の補間（書き出し用、既定はエッジ考慮の EA）
+#
+# GenICam の BayerXY は左上 2x2 の1行目が X,Y。OpenCV の COLOR_BayerXY2BGR は2行目の
+# 2,3画素目で命名されているため、GenICam の BayerGR は OpenCV の BayerGB にあたる
+# =========================================================
+
+# GenICam のパターン名 → 左上 2x2 の並び（行優先）
+BAYER_LAYOUTS = {
+    'GR': 'GRBG',
+    'RG': 'RGGB',
+    'GB': 'GBRG',
+    'BG': 'BGGR',
+}
+
+# GenICam のパターン名 → OpenCV の変換コード名（末尾に品質の接尾辞が付く）
+_CV_CODES = {
+    'GR': 'COLOR_BayerGB2BGR',
+    'RG': 'COLOR_BayerBG2BGR',
+    'GB': 'COLOR_BayerGR2BGR',
+    'BG': 'COLOR_BayerRG2BGR',
+}
+
+# quality → OpenCV の接尾辞（VNG は 8bit のみ対応）
+_QUALITY_SUFFIX = {
+    'bilinear': '',
+    'ea': '_EA',
+    'vng': '_VNG',
+}
+
+
+def bayer_pattern(pixel_format: str):
+    """PixelFormat 名から Bayer パターン（'GR' など）を返す（Bayer でなければ None）"""
+    if not pixel_format or not pixel_format.startswith('Bayer'):
+        return None
+    pattern = pixel_format[5:7]
+    return pattern if pattern in BAYER_LAYOUTS else None
+
+
+def is_bayer(pixel_format: str) -> bool:
+    return bayer_pattern(pixel_format) is not None
+
+
+def live_pixel_format(pixel_format: str) -> str:
+    """
+    LiveView に届くフレームの PixelFormat
+    Bayer は demosaic_half で 8bit BGR、10/12bit は 16bit の全範囲に広げてあるので Mono16 になる
+    """
+    if is_bayer(pixel_format):
+        return 'BGR8'
+    _, dtype, bit_depth, _ = pixel_format_info(pixel_format)
+    return 'Mono16' if dtype == np.uint16 and bit_depth < 16 else pixel_format
+
+
+def half_shape(height: int, width: int) -> tuple:
+    """demosaic_half の出力形状（奇数行・列の端は切り捨て）"""
+    return height // 2, width // 2, 3
+
+
+def demosaic_half(raw: np.ndarray, pixel_format: str, out: np.ndarray = None, to_8bit: bool = False) -> np.ndarray:
+    """
+    2x2 ブロック（R, G, G, B）を1画素の BGR にまとめる（G は2画素の平均）。出力は縦横 1/2
+    to_8bit=True なら PixelFormat のビット深度から 8bit に落とす（表示用）
+    out に half_shape() の配列を渡すとそこへ書き込む（LiveView のプールバッファなど）
+    """
+    pattern = bayer_pattern(pixel_format)
+    if pattern is None:
+        raise ValueError(f"Not a Bayer pixel format: {pixel_format}")
+    if raw.ndim != 2:
+        raise ValueError(f"Bayer frame must be 2-D: shape={raw.shape}")
+    h2, w2, _ = half_shape(*raw.shape)
+    dtype = np.uint8 if to_8bit else raw.dtype
+    if out is None:
+        out = np.empty((h2, w2, 3), dtype=dtype)
+    elif out.shape != (h2, w2, 3) or out.dtype != dtype:
+        raise ValueError(f"out must be {np.dtype(dtype)} {(h2, w2, 3)}: {out.dtype} {out.shape}")
+
+    shift = max(pixel_format_info(pixel_format)[2] - 8, 0) if to_8bit else 0
+    layout = BAYER_LAYOUTS[pattern]
+    planes = [raw[i // 2:2 * h2:2, i % 2:2 * w2:2] for i in range(4)]
+    r = planes[layout.index('R')]
+    b = planes[layout.index('B')]
+    g0, g1 = (planes[i] for i, c in enumerate(layout) if c == 'G')
+
+    for channel, plane in ((0, b), (2, r)):
+        if shift:
+            np.right_shift(plane, shift, out=out[:, :, channel], casting='unsafe')
+        else:
+            out[:, :, channel] = plane
+    g = np.add(g0, g1, dtype=np.uint32)
+    np.right_shift(g, 1 + shift, out=out[:, :, 1], casting='unsafe')
+    return out
+
+
+def demosaic(raw: np.ndarray, pixel_format: str, quality: str = 'ea') -> np.ndarray:
+    """フル解像度の色補間（OpenCV）。quality は 'bilinear' / 'ea' / 'vng'（VNG は 8bit のみ）"""
+    pattern = bayer_pattern(pixel_format)
+    if pattern is None:
+        raise ValueError(f"Not a Bayer pixel format: {pixel_format}")
+    suffix = _QUALITY_SUFFIX.get(quality)
+    if suffix is None:
+        raise ValueError(f"Unknown demosaic quality: {quality}")
+    return cv2.cvtColor(raw, getattr(cv2, _CV_CODES[pattern] + suffix))
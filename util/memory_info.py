@@ -0,0 +1,21 @@
+# util/memory_info.py
+
+import sys
+
+
+def peak_rss_bytes():
+    """プロセスのピーク常駐メモリ（バイト）を返す。取得できない環境では None"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux は KiB、macOS はバイト単位
+        return peak if sys.platform == 'darwin' else peak * 1024
+    except ImportError:
+        pass
+
+    # Windows（resource が無い）：psutil のピークワーキングセット
+    try:
+        import psutil
+        return getattr(psutil.Process().memory_info(), 'peak_wset', None)
+    except ImportError:
+        return None
@@ -0,0 +1,41 @@
+# util/pixel_format.py
+
+import numpy as np
+
+# PixelFormat名 → (チャンネル数, ホスト側のdtype, 有効ビット深度, 転送時のビット/画素)
+PIXEL_FORMATS = {
+    'Mono8':           (1, np.uint8, 8, 8),
+    'BGR8':            (3, np.uint8, 8, 24),
+    'BGRa8':           (4, np.uint8, 8, 32),
+    'Mono16':          (1, np.uint16, 16, 16),
+    'RGB8Packed':      (3, np.uint8, 8, 24),
+    'BayerGR8':        (1, np.uint8, 8, 8),
+    'BayerGR16':       (1, np.uint16, 16, 16),
+    'Mono10Packed':    (1, np.uint16, 10, 12),
+    'BayerGR10Packed': (1, np.uint16, 10, 12),
+    'Mono12Packed':    (1, np.uint16, 12, 12),
+    'BayerGR12Packed': (1, np.uint16, 12, 12),
+    'YUV411Packed':    (1, np.uint8, 8, 12),
+    'YUV422Packed':    (2, np.uint8, 8, 16),
+    'YUV444Packed':    (3, np.uint8, 8, 24),
+    'Mono10p':         (1, np.uint16, 10, 10),
+    'BayerGR10p':      (1, np.uint16, 10, 10),
+    'Mono12p':         (1, np.uint16, 12, 12),
+    'BayerGR12p':      (1, np.uint16, 12, 12),
+    'YCbCr8':          (3, np.uint8, 8, 24),
+    'YCbCr422_8':      (2, np.uint8, 8, 16),
+    'YCbCr411_8':      (1, np.uint8, 8, 12),
+}
+
+
+def pixel_format_info(pixel_format: str):
+    """PixelFormat名から (channels, dtype, bit_depth, wire_bits) を返す（未知の形式は Mono8 扱い）"""
+    return PIXEL_FORMATS.get(pixel_format, PIXEL_FORMATS['Mono8'])
+
+
+def frame_nbytes(width: int, height: int, pixel_format: str) -> int:
+    """1フレームの最大バイト数（GetNDArray() のホスト側サイズと転送サイズの大きい方）"""
+    channels, dtype, _, wire_bits = pixel_format_info(pixel_format)
+    host_bytes = width * height * channels * np.dtype(dtype).itemsize
+    wire_bytes = (width * height * wire_bits + 7) // 8
+    return max(host_bytes, wire_bytes)
@@ -0,0 +1,176 @@
+# util/pixel_unpack.py
+
+import numpy as np
+
+# =========================================================
+# 10/12bit パック形式 → uint16 の展開（NumPy のベクトル演算のみ、画素ごとの Python ループなし）
+#
+#   '12p'      : Mono12p / BayerGR12p         2画素 = 3バイト（LSB 詰め）
+#                p0 = b0 | (b1 & 0x0F) << 8           p1 = b1 >> 4 | b2 << 4
+#   '12packed' : Mono12Packed / BayerGR12Packed 2画素 = 3バイト（GigE Vision 旧形式）
+#                p0 = b0 << 4 | (b1 & 0x0F)           p1 = b2 << 4 | b1 >> 4
+#   '10p'      : Mono10p / BayerGR10p         4画素 = 5バイト（LSB 詰め）
+#   '10packed' : Mono10Packed / BayerGR10Packed 2画素 = 3バイト（GigE Vision 旧形式）
+#                p0 = b0 << 2 | (b1 & 0x03)           p1 = b2 << 2 | (b1 >> 4) & 0x03
+#
+# 行の区切りにパディングは無く、画像全体が1本のビット列として詰められている
+# =========================================================
+
+PACKED_LAYOUTS = {
+    'Mono12p': '12p',
+    'BayerGR12p': '12p',
+    'Mono12Packed': '12packed',
+    'BayerGR12Packed': '12packed',
+    'Mono10p': '10p',
+    'BayerGR10p': '10p',
+    'Mono10Packed': '10packed',
+    'BayerGR10Packed': '10packed',
+}
+
+# layout → (1グループの画素数, 1グループのバイト数)
+_GROUPS = {
+    '12p': (2, 3),
+    '12packed': (2, 3),
+    '10p': (4, 5),
+    '10packed': (2, 3),
+}
+
+
+def is_packed(pixel_format: str) -> bool:
+    return pixel_format in PACKED_LAYOUTS
+
+
+def packed_nbytes(width: int, height: int, pixel_format: str) -> int:
+    """パック形式で width x height を転送したときのバイト数"""
+    pixels, nbytes = _GROUPS[PACKED_LAYOUTS[pixel_format]]
+    return -(-width * height // pixels) * nbytes
+
+
+def _groups(data, count: int, group_bytes: int) -> np.ndarray:
+    """uint8 のバイト列を (グループ数, group_bytes) の uint16 列に（端数グループは 0 で埋める）"""
+    raw = np.frombuffer(data, dtype=np.uint8) if not isinstance(data, np.ndarray) else data.reshape(-1).view(np.uint8)
+    need = count * group_bytes
+    if raw.size < need:
+        raw = np.concatenate([raw, np.zeros(need - raw.size, dtype=np.uint8)])
+    return raw[:need].reshape(count, group_bytes)
+
+
+def unpack(data, width: int, height: int, pixel_format: str, out: np.ndarray = None) -> np.ndarray:
+    """
+    パック形式のバイト列（GetData() の中身など）を (height, width) の uint16 に展開する
+    out に (height, width) の uint16 配列を渡すとそこへ書き込む（LiveView のプールバッファなど）
+    """
+    layout = PACKED_LAYOUTS.get(pixel_format)
+    if layout is None:
+        raise ValueError(f"Not a packed pixel format: {pixel_format}")
+    pixels, group_bytes = _GROUPS[layout]
+    n = width * height
+    count = -(-n // pixels)
+    g = _groups(data, count, group_bytes)
+
+    if out is None:
+        out = np.empty((height, width), dtype=np.uint16)
+    elif out.shape != (height, width) or out.dtype != np.uint16 or not out.flags.c_contiguous:
+        raise ValueError(f"out must be C-contiguous uint16 {(height, width)}: {out.dtype} {out.shape}")
+    # 端数グループがあるときだけ作業用バッファを使う
+    tail = n != count * pixels
+    flat = np.empty(count * pixels, dtype=np.uint16) if tail else out.reshape(-1)
+    dst = flat.reshape(count, pixels)
+
+    b0 = g[:, 0].astype(np.uint16)
+    b1 = g[:, 1].astype(np.uint16)
+    b2 = g[:, 2].astype(np.uint16)
+    if layout == '12p':
+        np.bitwise_or(b0, (b1 & 0x0F) << 8, out=dst[:, 0])
+        np.bitwise_or(b1 >> 4, b2 << 4, out=dst[:, 1])
+    elif layout == '12packed':
+        np.bitwise_or(b0 << 4, b1 & 0x0F, out=dst[:, 0])
+        np.bitwise_or(b2 << 4, b1 >> 4, out=dst[:, 1])
+    elif layout == '10packed':
+        np.bitwise_or(b0 << 2, b1 & 0x03, out=dst[:, 0])
+        np.bitwise_or(b2 << 2, (b1 >> 4) & 0x03, out=dst[:, 1])
+    else:  # '10p'
+        b3 = g[:, 3].astype(np.uint16)
+        b4 = g[:, 4].astype(np.uint16)
+        np.bitwise_or(b0, (b1 & 0x03) << 8, out=dst[:, 0])
+        np.bitwise_or(b1 >> 2, (b2 & 0x0F) << 6, out=dst[:, 1])
+        np.bitwise_or(b2 >> 4, (b3 & 0x3F) << 4, out=dst[:, 2])
+        np.bitwise_or(b3 >> 6, b4 << 2, out=dst[:, 3])
+
+    if tail:
+        out.reshape(-1)[:] = flat[:n]
+    return out
+
+
+def pack(img: np.ndarray, pixel_format: str) -> np.ndarray:
+    """uint16 画像をパック形式のバイト列（uint8 1次元）にする（unpack の逆。シミュレーション・検証用）"""
+    layout = PACKED_LAYOUTS.get(pixel_format)
+    if layout is None:
+        raise ValueError(f"Not a packed pixel format: {pixel_format}")
+    pixels, group_bytes = _GROUPS[layout]
+    flat = img.reshape(-1).astype(np.uint16)
+    count = -(-flat.size // pixels)
+    if flat.size < count * pixels:
+        flat = np.concatenate([flat, np.zeros(count * pixels - flat.size, dtype=np.uint16)])
+    p = flat.reshape(count, pixels)
+    g = np.empty((count, group_bytes), dtype=np.uint8)
+
+    if layout == '12p':
+        p0, p1 = p[:, 0] & 0xFFF, p[:, 1] & 0xFFF
+        g[:, 0] = p0 & 0xFF
+        g[:, 1] = (p0 >> 8) | ((p1 & 0x0F) << 4)
+        g[:, 2] = p1 >> 4
+    elif layout == '12packed':
+        p0, p1 = p[:, 0] & 0xFFF, p[:, 1] & 0xFFF
+        g[:, 0] = p0 >> 4
+        g[:, 1] = (p0 & 0x0F) | ((p1 & 0x0F) << 4)
+        g[:, 2] = p1 >> 4
+    elif layout == '10packed':
+        p0, p1 = p[:, 0] & 0x3FF, p[:, 1] & 0x3FF
+        g[:, 0] = p0 >> 2
+        g[:, 1] = (p0 & 0x03) | ((p1 & 0x03) << 4)
+        g[:, 2] = p1 >> 2
+    else:  # '10p'
+        p0, p1, p2, p3 = (p[:, i] & 0x3FF for i in range(4))
+        g[:, 0] = p0 & 0xFF
+        g[:, 1] = (p0 >> 8) | ((p1 & 0x3F) << 2)
+        g[:, 2] = (p1 >> 6) | ((p2 & 0x0F) << 4)
+        g[:, 3] = (p2 >> 4) | ((p3 & 0x03) << 6)
+        g[:, 4] = p3 >> 2
+    return g.reshape(-1)
+
+
+def scale_to_16bit(img: np.ndarray, bit_depth: int) -> np.ndarray:
+    """
+    10/12bit の uint16 を全範囲（0–65535）に広げる（表示用、img をその場で書き換えて返す）
+    上位ビットを下位に繰り返すので、最大値は 65535 のまま飽和判定に使える
+    """
+    if bit_depth >= 16:
+        return img
+    np.left_shift(img, 16 - bit_depth, out=img)
+    img |= img >> bit_depth
+    return img
+
+
+def image_to_ndarray(image_result, pixel_format: str, out: np.ndarray = None, copy: bool = False) -> np.ndarray:
+    """
+    PySpin の ImageResult から画素配列を得る
+    パック形式は GetData() の生バイト列を unpack した uint16（ドライバのバッファとは独立した配列）を返す。
+    ドライバ側で既に展開済み（バイト数がパック後のサイズと一致しない）なら GetNDArray() を使う
+    それ以外の形式は GetNDArray()（ドライバのバッファのビュー）。Release 後も使うなら copy=True か out を渡す
+    out は配列のほか、out(shape, dtype) で書き込み先を返す関数でもよい（リングバッファのスロットなど）
+    """
+    if is_packed(pixel_format):
+        width, height = image_result.GetWidth(), image_result.GetHeight()
+        data = image_result.GetData()
+        if np.asarray(data).size == packed_nbytes(width, height, pixel_format):
+            if callable(out):
+                out = out((height, width), np.dtype(np.uint16))
+            return unpack(data, width, height, pixel_format, out=out)
+    arr = image_result.GetNDArray()
+    if callable(out):
+        out = out(arr.shape, arr.dtype)
+    if out is not None:
+        np.copyto(out, arr)
+        return out
+    return np.array(arr, copy=True) if copy else arr
@@ -0,0 +1,26 @@
+# util/spin_backend.py
+
+"""
+PySpin の読み込み先を切り替える（import PySpin の代わりに from util.spin_backend import PySpin を使う）
+
+FLIR_SIMULATION=1        : 実機の代わりに camera_control.sim_pyspin を使う
+FLIR_SIM_CONFIG=<json>   : シミュレーション構成ファイル
+                           {"cameras": [{"serial": "00000001", ...}, ...], "defaults": {"max_fps": 200, ...}}
+"""
+
+import json
+import os
+
+SIMULATION = os.environ.get('FLIR_SIMULATION', '0').lower() in ('1', 'true', 'yes')
+
+if SIMULATION:
+    from camera_control import sim_pyspin as PySpin
+
+    _config_path = os.environ.get('FLIR_SIM_CONFIG')
+    if _config_path:
+        with open(_config_path, encoding='utf-8') as _f:
+            _config = json.load(_f)
+        PySpin.configure(_config.get('cameras'), **_config.get('defaults', {}))
+    print("[SpinBackend] Using simulated PySpin backend")
+else:
+    import PySpin